@@ -19,10 +19,24 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL license and that you accept its terms.
 
-# flake8: noqa
-# simpler access for external usage
-from iotlabcli.auth import get_user_credentials
-from iotlabcli.helpers import get_current_experiment
-from iotlabcli.rest import Api
+import importlib
+from typing import Any
 
 __version__ = "3.3.2-dev0"
+
+# simpler access for external usage, imported on first access so that
+# lightweight submodules can be imported without 'requests'
+_EXPORTS = {
+    "get_user_credentials": "iotlabcli.auth",
+    "get_current_experiment": "iotlabcli.helpers",
+    "Api": "iotlabcli.rest",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import package level `name` from its module on first access."""
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
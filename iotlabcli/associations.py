@@ -33,8 +33,9 @@ Dumped JSON format is:
 """
 
 import abc
+import bisect
 import collections.abc
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from typing import Any
 
 
@@ -55,6 +56,45 @@ def setattrdefault(obj: Any, attribute: str, default: Any = None) -> Any:
         return default
 
 
+def _changing(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Return list `method` marking the list as not sorted anymore."""
+
+    def _method(self, *args, **kwargs):
+        self.is_sorted = False
+        return method(self, *args, **kwargs)
+
+    _method.__name__ = method.__name__
+    _method.__doc__ = method.__doc__
+    return _method
+
+
+class _Values(list):
+    """Association values, knowing if they are still sorted.
+
+    Any in place change, even through a reference to the list, marks it
+    as not sorted.
+    """
+
+    __slots__ = ("is_sorted",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.is_sorted = False
+
+    __setitem__ = _changing(list.__setitem__)
+    __delitem__ = _changing(list.__delitem__)
+    __iadd__ = _changing(list.__iadd__)
+    __imul__ = _changing(list.__imul__)
+    append = _changing(list.append)
+    clear = _changing(list.clear)
+    extend = _changing(list.extend)
+    insert = _changing(list.insert)
+    pop = _changing(list.pop)
+    remove = _changing(list.remove)
+    reverse = _changing(list.reverse)
+    sort = _changing(list.sort)
+
+
 class _Association(
     # pylint: disable=too-many-ancestors
     collections.abc.MutableMapping,
@@ -63,6 +103,7 @@ class _Association(
     """_Association class key->value.
 
     Inherit from dict to be dumped as a dict by json.
+    Values are only sorted again when they changed since last sort.
     """
 
     __metaclass__ = abc.ABCMeta
@@ -100,20 +141,36 @@ class _Association(
         """Set value uniq and sorted."""
         setvalue = set(value)  # copy and keep uniq
 
-        # Use given `value` object for 'setdefault'
-        value = setattrdefault(self, self._valueattr(), value)
+        # Keep the same values object when set again
+        value = setattrdefault(self, self._valueattr(), _Values())
         del value[:]
 
         value.extend(setvalue)
         self._sort()
 
+    def extend(self, values: Iterable[Any]) -> None:
+        """Add `values`, insert them in place if there are only a few."""
+        value = self._value()
+        values = list(values)
+        if not value.is_sorted or len(values) > len(value):
+            # Sort everything on next access
+            value.extend(values)
+            return
+        for val in values:
+            bisect.insort(value, val, key=self.VALUE_SORT_KEY)
+        value.is_sorted = True
+
     def _value(self):
         """Get value directly, avoid loop when accessing in _sort."""
         return getattr(self, self._valueattr())
 
     def _sort(self):
-        """Sort values with key."""
-        self._value().sort(key=self.VALUE_SORT_KEY)
+        """Sort values with key if they changed."""
+        value = self._value()
+        if value.is_sorted:
+            return
+        value.sort(key=self.VALUE_SORT_KEY)
+        value.is_sorted = True
         # Sync C-level dict storage so CPython's json C encoder (which uses
         # PyDict_GET_SIZE bypassing __len__) sees the correct data (Python>=3.12)
         dict.clear(self)
@@ -134,7 +191,12 @@ class _Association(
     @classmethod
     def from_dict(cls, assocdict):
         """Init an association from an association dict."""
-        return cls(assocdict[cls._keyattr()], assocdict[cls._valueattr()])
+        return cls(*cls.key_value(assocdict))
+
+    @classmethod
+    def key_value(cls, assocdict: dict[str, Any]) -> tuple[Any, Any]:
+        """Return (key, value) from an association dict."""
+        return assocdict[cls._keyattr()], assocdict[cls._valueattr()]
 
     @staticmethod
     def staticclassattribute(function: Callable[..., Any] | None) -> Any:
@@ -224,6 +286,7 @@ class AssociationsMap(
     """Sorted Map of Associations objects.
 
     Inherit list to be json serialized to a list.
+    Keys are also kept in a sorted list to insert new associations in place.
     """
 
     def __init__(
@@ -234,13 +297,16 @@ class AssociationsMap(
         list.__init__(self)
         self.assoc_class = _Association.for_key_value(assoctype, resource, sortkey)
         self._map: dict[Any, Any] = {}
+        self._keys: list[Any] = []
 
     def __getitem__(self, key):
         return self._map[key].value
 
     def __delitem__(self, key):
-        assoc = self._map.pop(key)
-        list.remove(self, assoc)
+        self._map.pop(key)
+        index = bisect.bisect_left(self._keys, key)
+        del self._keys[index]
+        list.__delitem__(self, index)
 
     def __setitem__(self, key, value):
         try:
@@ -250,10 +316,23 @@ class AssociationsMap(
         except KeyError:
             self._add(key, value)
 
+    def setdefault(self, key: Any, default: Any = ()) -> Any:
+        """Return `key` values, set them to `default` if missing.
+
+        Returned values are the association ones, to be changed in place.
+        """
+        if key not in self._map:
+            self[key] = default
+        return self[key]
+
     def extendvalues(self, key: Any, values: Any) -> Any:
         """Extend values for `key`."""
-        self.setdefault(key, []).extend(values)
-        return self[key]
+        try:
+            assoc = self._map[key]
+        except KeyError:
+            assoc = self._add(key, [])
+        assoc.extend(values)
+        return assoc.value
 
     def _add(self, key, value):
         """Add key,value entry.
@@ -263,8 +342,33 @@ class AssociationsMap(
         assoc = self.assoc_class(key, value)
         self._map[key] = assoc
 
-        list.append(self, assoc)
-        list.sort(self, key=lambda x: x.key)
+        index = bisect.bisect(self._keys, key)
+        self._keys.insert(index, key)
+        list.insert(self, index, assoc)
+        return assoc
+
+    @classmethod
+    def from_items(
+        cls,
+        items: Iterable[tuple[Any, Any]],
+        assoctype: str,
+        resource: str,
+        sortkey: Callable[..., Any] | None = None,
+    ) -> "AssociationsMap":
+        """Create AssociationsMap from (key, values) `items`.
+
+        Values given for the same key are merged, keys are sorted once.
+        """
+        values: dict[Any, list[Any]] = {}
+        for key, value in items:
+            values.setdefault(key, []).extend(value)
+
+        assocs = cls(assoctype, resource, sortkey=sortkey)
+        assocs._keys = sorted(values)
+        for key in assocs._keys:
+            assocs._map[key] = assocs.assoc_class(key, values[key])
+        list.extend(assocs, [assocs._map[key] for key in assocs._keys])
+        return assocs
 
     @classmethod
     def from_list(
@@ -277,11 +381,9 @@ class AssociationsMap(
         """Create AssociationsMap from assoclist."""
         if assoclist is None:
             return None
-        assocs = cls(assoctype, resource, sortkey=sortkey)
-        for assoc_d in assoclist:
-            assoc = assocs.assoc_class.from_dict(assoc_d)
-            assocs[assoc.key] = assoc.value
-        return assocs
+        assoc_class = _Association.for_key_value(assoctype, resource)
+        items = (assoc_class.key_value(assoc_d) for assoc_d in assoclist)
+        return cls.from_items(items, assoctype, resource, sortkey=sortkey)
 
     def list(self):
         """Dump to a list of dicts."""
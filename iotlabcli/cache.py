@@ -0,0 +1,189 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Persistent on-disk cache of REST API read requests
+
+Entries are stored as JSON files in one directory per cached endpoint:
+
+    <cache_dir>/<endpoint>/<key_hash>.json
+
+"""
+
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+# Cache entries of the current experiment id, by user and api url
+CURRENT_EXPERIMENT = "current-experiment"
+
+# Cache entries of ELF firmwares converted to binary, by ELF md5
+ELF_BINARY = "elf-binary"
+
+# Time to live in seconds of cached endpoints, other urls are not cached
+ENDPOINTS_TTL = {
+    "sites": 24 * 3600,
+    "sites/details": 3600,
+    "nodes": 60,
+    "nodes/ids": 60,
+    "mobilities/circuits": 3600,
+    "monitoring": 300,
+    # not an url, experiment found by `helpers.get_current_experiment`
+    CURRENT_EXPERIMENT: 30,
+    # not an url, firmware converted by `elf.BinaryFirmware`
+    ELF_BINARY: 30 * 24 * 3600,
+}
+
+# Maximum size in bytes of all cache files
+MAX_SIZE = 20 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Return cache directory from IOTLAB_CACHE_DIR or user cache directory."""
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.getenv("IOTLAB_CACHE_DIR") or os.path.join(cache_home, "iotlabcli")
+
+
+def endpoint(url: str) -> str:
+    """Return url endpoint, without query string.
+
+    >>> endpoint('nodes/ids?archi=m3&site=grenoble')
+    'nodes/ids'
+    >>> endpoint('sites')
+    'sites'
+    """
+    return url.partition("?")[0]
+
+
+class DiskCache:
+    """Cache JSON responses on disk with per endpoint time to live.
+
+    Cache errors are ignored, a broken cache only means more requests.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        ttls: dict[str, float] | None = None,
+        max_size: int = MAX_SIZE,
+        refresh: bool = False,
+    ) -> None:
+        """
+        :param path: cache directory, default to `default_cache_dir()`
+        :param ttls: endpoints time to live, default to ENDPOINTS_TTL
+        :param max_size: oldest entries are evicted above this size
+        :param refresh: ignore current entries, but store new ones
+        """
+        self.path = path or default_cache_dir()
+        self.ttls = ENDPOINTS_TTL if ttls is None else ttls
+        self.max_size = max_size
+        self.refresh = refresh
+
+    def cached(
+        self,
+        key: str,
+        url: str,
+        function: Callable[[dict[str, Any] | None], dict[str, Any]],
+    ) -> Any:
+        """Return `url` content from cache or from `function` call.
+
+        :param key: unique key for this request, like api url, user and url
+        :param url: requested url, selects endpoint time to live
+        :param function: called with the expired entry, or None, returns
+            the new entry dict with `url` content in 'content'
+        """
+        ttl = self.ttls.get(endpoint(url))
+        if ttl is None:
+            return function(None)["content"]
+
+        entry = self.load(key, url)
+        if entry is not None and time.time() < entry["time"] + ttl:
+            return entry["content"]
+
+        entry = function(entry)
+        entry["time"] = time.time()
+        self.store(key, url, entry)
+        return entry["content"]
+
+    def load(self, key: str, url: str) -> dict[str, Any] | None:
+        """Return cache entry for `key` or None if missing or refreshing."""
+        if self.refresh:
+            return None
+        try:
+            with open(self._entry_path(key, url)) as entry_file:
+                return json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key: str, url: str, entry: dict[str, Any]) -> None:
+        """Atomically write cache `entry` for `key`, then evict old entries."""
+        entry_path = self._entry_path(key, url)
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", dir=os.path.dirname(entry_path), suffix=".tmp", delete=False
+            ) as tmp_file:
+                json.dump(entry, tmp_file)
+            os.replace(tmp_file.name, entry_path)
+        except (OSError, TypeError, ValueError):
+            return
+        self._evict()
+
+    def invalidate(self, url: str) -> None:
+        """Remove entries of endpoints sharing `url` first path segment."""
+        segment = endpoint(url).split("/")[0]
+        for cached in self.ttls:
+            if cached.split("/")[0] == segment:
+                shutil.rmtree(self._endpoint_dir(cached), ignore_errors=True)
+
+    def _endpoint_dir(self, url: str) -> str:
+        return os.path.join(self.path, endpoint(url).replace("/", "_"))
+
+    def _entry_path(self, key: str, url: str) -> str:
+        key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self._endpoint_dir(url), f"{key_hash}.json")
+
+    def _evict(self) -> None:
+        """Remove oldest entries until cache size is under `max_size`."""
+        entries = sorted(self._entries_stats())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, entry_path in entries:
+            if size <= self.max_size:
+                break
+            size -= entry_size
+            with contextlib.suppress(OSError):
+                os.remove(entry_path)
+
+    def _entries_stats(self) -> Iterator[tuple[float, int, str]]:
+        """Yield (mtime, size, path) for all cache entries."""
+        for entry_path in glob.glob(os.path.join(self.path, "*", "*.json")):
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            yield stat.st_mtime, stat.st_size, entry_path
@@ -0,0 +1,299 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Warm background process running iotlab commands
+
+The daemon keeps a python process with its modules imported, the Api
+keep-alive sessions and in-memory caches, listening on a per-user unix
+socket. Commands forward their arguments to it when it is running, else
+they run in their own process.
+
+Messages are JSON objects, one per line:
+
+    client: {"command": "node", "prog": "iotlab-node", "args": [], "cwd": "/",
+             "settings": {"HOME": "/home/user", ...}}
+    daemon: {"stdout": "text"} or {"stderr": "text"}, any number of times
+    daemon: {"exit": 0}
+
+Commands are run one at a time, in the client working directory. While
+a command runs, other clients get {"busy": true} and run their command
+themselves. Clients whose `settings()`, selecting the account and api
+url, differ from the daemon ones get {"local": true} and also run their
+command themselves. A command is aborted when its client disconnects.
+Only imports the standard library, as clients import it on each call.
+"""
+
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import traceback
+from collections.abc import Callable, Iterator
+from typing import Any, TextIO
+
+# Daemon control requests, answered by the daemon itself
+STATUS = {"daemon": "status"}
+STOP = {"daemon": "stop"}
+
+# Environment variables selecting the account, api url and caches
+SETTINGS_VARIABLES = ("HOME", "XDG_CACHE_HOME")
+# Custom api url file, read once by the daemon
+API_URL_FILE = "~/.iotlab.api-url"
+
+
+def socket_path() -> str:
+    """Return socket path from IOTLAB_DAEMON_SOCKET or a per-user path."""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    default = os.path.join(runtime_dir, f"iotlabcli-{os.getuid()}.sock")
+    return os.getenv("IOTLAB_DAEMON_SOCKET") or default
+
+
+def settings() -> dict[str, str | None]:
+    """Return the settings a command run by the daemon depends on.
+
+    IOTLAB_* environment variables, except the daemon socket, home and
+    cache directories, and the custom api url file content.
+    """
+    values: dict[str, str | None] = {
+        name: value
+        for name, value in os.environ.items()
+        if name.startswith("IOTLAB_") and name != "IOTLAB_DAEMON_SOCKET"
+    }
+    values.update((name, os.getenv(name)) for name in SETTINGS_VARIABLES)
+    try:
+        with open(os.path.expanduser(API_URL_FILE), encoding="utf-8") as api_url:
+            values[API_URL_FILE] = api_url.read()
+    except OSError:
+        values[API_URL_FILE] = None
+    return values
+
+
+def connect(path: str | None = None) -> socket.socket | None:
+    """Return a connection to the daemon, None if it is not running.
+
+    Sockets owned by another user are ignored.
+    """
+    path = path or socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        if os.stat(path).st_uid != os.getuid():
+            raise PermissionError(path)
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(message: dict[str, Any], path: str | None = None) -> Iterator[Any] | None:
+    """Send `message` to the daemon and return its replies iterator.
+
+    :returns: None if the daemon is not running
+    """
+    sock = connect(path)
+    if sock is None:
+        return None
+    return _replies(sock, message)
+
+
+def _replies(sock: socket.socket, message: dict[str, Any]) -> Iterator[Any]:
+    with sock, sock.makefile("rw", encoding="utf-8") as stream:
+        _send(stream, message)
+        for line in stream:
+            yield json.loads(line)
+
+
+def forward(command: str, args: list[str], path: str | None = None) -> int | None:
+    """Run `command` with `args` in the daemon, writing its output.
+
+    :returns: command exit code, None if the daemon is not running
+    """
+    message = {"command": command, "prog": sys.argv[0], "args": args}
+    message["cwd"] = os.getcwd()
+    message["settings"] = settings()
+    replies = request(message, path)
+    if replies is None:
+        return None
+    with contextlib.closing(replies):
+        return _write_replies(replies)
+
+
+def _write_replies(replies: Iterator[Any]) -> int | None:
+    """Write command output replies, return its exit code.
+
+    :returns: None if the command should be run locally
+    """
+    code = 1  # if the daemon stops before the end of the command
+    for reply in replies:
+        if reply.pop("busy", False) or reply.pop("local", False):
+            return None
+        code = reply.pop("exit", code)
+        for output, text in reply.items():
+            getattr(sys, output).write(text)
+            getattr(sys, output).flush()
+    return code
+
+
+def _send(stream: TextIO, message: dict[str, Any]) -> None:
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+
+def exit_code(function: Callable[..., Any], *args: Any) -> int:
+    """Run `function(*args)` and return the matching process exit code."""
+    try:
+        function(*args)
+    except SystemExit as err:
+        if err.code is None or isinstance(err.code, int):
+            return err.code or 0
+        print(err.code, file=sys.stderr)
+        return 1
+    except Exception:  # pylint:disable=broad-except
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+class ClientDisconnected(Exception):
+    """Client disconnected while its command was running."""
+
+
+class _Output:
+    """File-like object sending written text to the client as `name`."""
+
+    def __init__(self, handler: "_Handler", name: str) -> None:
+        self.handler = handler
+        self.name = name
+
+    def write(self, text: str) -> int:
+        """Send `text` to the client, abort the command if it disconnected."""
+        if not self.handler.disconnected and not self.handler.send({self.name: text}):
+            raise ClientDisconnected(self.name)
+        return len(text)
+
+    def flush(self) -> None:
+        """Messages are sent when written."""
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Run one client request."""
+
+    server: "Daemon"
+    disconnected = False
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:  # connection check
+            return
+        message = json.loads(line)
+        if message == STOP:
+            self.server.stopped = True
+        if message in (STATUS, STOP):
+            self.send({"pid": os.getpid(), "exit": 0})
+            return
+        self.run_one(message)
+
+    def run_one(self, message: dict[str, Any]) -> None:
+        """Run `message` command if no other command is running.
+
+        Commands with other settings than the daemon are not run, as
+        they would use the daemon account and api url.
+        """
+        if message.get("settings") != self.server.settings:
+            self.send({"local": True})
+            return
+        if not self.server.running.acquire(blocking=False):
+            self.send({"busy": True})
+            return
+        try:
+            self.send({"exit": self.run(message)})
+        finally:
+            self.server.running.release()
+
+    def run(self, message: dict[str, Any]) -> int:
+        """Run `message` command in its working directory and arguments."""
+        cwd, argv = os.getcwd(), sys.argv
+        stdout, stderr = _Output(self, "stdout"), _Output(self, "stderr")
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                sys.argv = [message["prog"], *message["args"]]
+                os.chdir(message["cwd"])
+                run = self.server.run
+                return exit_code(run, message["command"], message["args"])
+        finally:
+            os.chdir(cwd)
+            sys.argv = argv
+
+    def send(self, message: dict[str, Any]) -> bool:
+        """Send `message` to the client, return False if it disconnected."""
+        try:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except OSError:
+            self.disconnected = True
+        return not self.disconnected
+
+
+class Daemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server running commands with `run(command, args)`.
+
+    Each client is handled in its own thread, so clients are answered
+    while a command runs, but commands are run one at a time as they
+    share the process working directory and outputs.
+    Only commands sent with the same `settings()` as the daemon are run.
+    The socket is only accessible by the current user.
+    """
+
+    daemon_threads = True
+    block_on_close = False
+    timeout = 0.5  # seconds between checks of `stopped`
+
+    def __init__(
+        self, run: Callable[[str, list[str]], Any], path: str | None = None
+    ) -> None:
+        self.run = run
+        self.path = path or socket_path()
+        self.stopped = False
+        self.running = threading.Lock()
+        self.settings = settings()
+        if connect(self.path) is not None:
+            raise RuntimeError(f"iotlab daemon already running on {self.path}")
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)  # stale socket
+        umask = os.umask(0o177)
+        try:
+            super().__init__(self.path, _Handler)
+        finally:
+            os.umask(umask)
+
+    def serve(self) -> None:
+        """Handle requests until a stop request, then remove the socket."""
+        try:
+            while not self.stopped:
+                self.handle_request()
+        finally:
+            self.server_close()
+            os.unlink(self.path)
@@ -0,0 +1,185 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Convert ELF firmwares to binary firmwares, without any toolchain
+
+Only loaded sections content is kept, placed at their load address,
+like `objcopy -O binary` does. Binaries are smaller to upload than
+ELF files with their symbols and debug sections.
+"""
+
+import base64
+import os
+import struct
+from typing import Any
+
+from iotlabcli import cache, helpers
+
+ELF_MAGIC = b"\x7fELF"
+PT_LOAD = 1
+SHT_NOBITS = 8
+SHF_ALLOC = 0x2
+
+# Known flash regions (start address, size): 0x0 on nrf5x, samr21 or
+# kw41z, 0x00200000 on cc2538 (firefly), 0x08000000 on stm32.
+# Binary offset is relative to the region start.
+FLASH_REGIONS = (
+    (0x00000000, 0x00100000),
+    (0x00200000, 0x00080000),
+    (0x08000000, 0x00200000),
+)
+
+# Structures used fields formats, by EI_CLASS 32 or 64 bits:
+# header 'e_phoff', 'e_shoff', 'e_phentsize', 'e_phnum', 'e_shentsize',
+# 'e_shnum', program header 'p_type', 'p_offset', 'p_paddr', 'p_filesz'
+# and section header 'sh_type', 'sh_flags', 'sh_offset', 'sh_size'
+_FORMATS = {
+    1: ("28xII6xHHHH", "II4xII", "4xII4xII"),
+    2: ("32xQQ6xHHHH", "I4xQ8xQQ", "4xIQ8xQQ"),
+}
+_ENDIANNESS = {1: "<", 2: ">"}
+
+
+def is_elf(path: str) -> bool:
+    """Return if `path` is an ELF file"""
+    with open(os.path.expanduser(path), "rb") as _fd:
+        return _fd.read(len(ELF_MAGIC)) == ELF_MAGIC
+
+
+def load_sections(data: bytes) -> list[tuple[int, bytes]]:
+    """Return ELF `data` loaded sections (load address, content), sorted.
+
+    Sections are loaded at their segment physical address, so initialized
+    data is placed after code in flash and not at its RAM address.
+
+    :raises ValueError: if `data` is not a valid ELF file
+    """
+    if len(data) < 16 or data[: len(ELF_MAGIC)] != ELF_MAGIC:
+        raise ValueError("Not an ELF file")
+    try:
+        formats = [_ENDIANNESS[data[5]] + fmt for fmt in _FORMATS[data[4]]]
+        phoff, shoff, phsize, phnum, shsize, shnum = struct.unpack_from(
+            formats[0], data
+        )
+        segments = _table(data, formats[1], phoff, phsize, phnum)
+        sections = _table(data, formats[2], shoff, shsize, shnum)
+    except (KeyError, struct.error) as err:
+        raise ValueError(f"Invalid ELF file: {err}") from err
+    loads = [segment[1:] for segment in segments if segment[0] == PT_LOAD]
+    return sorted(
+        (_load_address(loads, offset, size), data[offset : offset + size])
+        for sh_type, flags, offset, size in sections
+        if flags & SHF_ALLOC and sh_type != SHT_NOBITS and size
+    )
+
+
+def _table(
+    data: bytes, fmt: str, offset: int, entsize: int, num: int
+) -> list[tuple[int, ...]]:
+    """Return `num` entries of `entsize` bytes at `offset`, unpacked"""
+    return [struct.unpack_from(fmt, data, offset + i * entsize) for i in range(num)]
+
+
+def _load_address(loads: list[tuple[int, ...]], offset: int, size: int) -> int:
+    """Return load address of section at file `offset`, from its segment"""
+    for p_offset, p_paddr, p_filesz in loads:
+        if p_offset <= offset and offset + size <= p_offset + p_filesz:
+            return p_paddr + offset - p_offset
+    raise ValueError(f"Section at offset {offset:#x} not in a loadable segment")
+
+
+def to_binary(data: bytes) -> tuple[int, bytes]:
+    """Return ELF `data` (offset in flash, binary content).
+
+    Gaps between sections are filled with zeros, like `objcopy -O binary`.
+
+    :raises ValueError: if `data` is not a valid ELF file, has no loaded
+        content or if its sections are not all in one known flash region
+    """
+    sections = load_sections(data)
+    if not sections:
+        raise ValueError("No loaded sections in ELF file")
+    start = sections[0][0]
+    end = max(address + len(content) for address, content in sections)
+    base, size = _flash_region(start)
+    if end > base + size:
+        raise ValueError(
+            f"ELF loaded sections span {end - start} bytes from {start:#x}, "
+            "not only flash content"
+        )
+    binary = bytearray(end - start)
+    for address, content in sections:
+        binary[address - start : address - start + len(content)] = content
+    return start - base, bytes(binary)
+
+
+def _flash_region(address: int) -> tuple[int, int]:
+    """Return the known flash region (start, size) containing `address`
+
+    >>> hex(_flash_region(0x00204000)[0])
+    '0x200000'
+    >>> _flash_region(0x00180000)
+    Traceback (most recent call last):
+    ValueError: ELF loaded sections start at 0x180000, not in a known flash region
+    """
+    for base, size in FLASH_REGIONS:
+        if base <= address < base + size:
+            return base, size
+    raise ValueError(
+        f"ELF loaded sections start at {address:#x}, not in a known flash region"
+    )
+
+
+class BinaryFirmware(helpers.FileRef):
+    """ELF firmware converted to a binary firmware, loaded in memory.
+
+    Its path is the ELF path with a '.bin' extension, to be flashed at
+    `offset`. Conversions are cached by ELF content hash in `disk_cache`.
+    """
+
+    def __init__(self, elf_path: str, disk_cache: Any = None) -> None:
+        super().__init__(elf_path)
+        elf_md5 = super().md5
+        if isinstance(disk_cache, cache.DiskCache):
+            entry = disk_cache.cached(
+                elf_md5, cache.ELF_BINARY, lambda _: self._binary_entry()
+            )
+        else:
+            entry = self._binary_entry()["content"]
+        self.offset = entry["offset"]
+        self.content = base64.b64decode(entry["binary"])
+        self.size = len(self.content)
+        self.path = os.path.splitext(self.path)[0] + ".bin"
+        self.key = (f"{self.key[0]}:{elf_md5}.bin", 0, self.size)
+
+    @property
+    def md5(self) -> str:
+        """md5 hash of the binary content"""
+        return helpers.md5(self.content)
+
+    def _binary_entry(self) -> dict[str, Any]:
+        offset, binary = to_binary(self.read())
+        binary_str = base64.b64encode(binary).decode("ascii")
+        return {"content": {"offset": offset, "binary": binary_str}}
+
+    def __repr__(self) -> str:
+        return f"BinaryFirmware({self.path!r}, offset={self.offset:#x})"
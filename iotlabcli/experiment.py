@@ -21,12 +21,17 @@
 
 """Implement the 'experiment' requests"""
 
+# pylint: disable=too-many-lines
+
 from __future__ import annotations
 
 import json
+import random
 import time
-from collections.abc import Callable, Sequence
-from dataclasses import dataclass
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from os.path import basename
 from typing import Any
 
@@ -50,6 +55,9 @@ SITE_ASSOCIATIONS_FILE_ASSOCS = ("script", "scriptconfig")
 # Default wait timeout when waiting for an experiment to be in Running state
 WAIT_TIMEOUT_DEFAULT = float("+inf")
 
+# Experiments listed per request when iterating over experiments
+PAGE_SIZE = 100
+
 
 def submit_experiment(  # pylint:disable=too-many-arguments,too-many-positional-arguments
     api: Any,
@@ -121,7 +129,37 @@ def get_experiments_list(api: Any, state: str | None, limit: int, offset: int) -
     return api.get_experiments(state, limit, offset)
 
 
-def get_experiment(api: Any, exp_id: int, option: str = "") -> Any:
+def iter_experiments(
+    api: Any, state: str | None = None, page_size: int = PAGE_SIZE
+) -> Iterator[dict[str, Any]]:
+    """Iterate over the experiment list, fetched by pages of `page_size`.
+
+    Pages are fetched lazily, the next page being fetched in background
+    while the current one is consumed.
+
+    :param state: State of the experiment
+    :param page_size: number of experiments per request
+    """
+    assert page_size > 0
+    state = helpers.check_experiment_state(state)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        offset = 0
+        page = executor.submit(api.get_experiments, state, page_size, offset)
+        while page is not None:
+            items = page.result()["items"]
+            offset += page_size
+            page = None
+            if len(items) == page_size:  # prefetch next page
+                page = executor.submit(api.get_experiments, state, page_size, offset)
+            yield from items
+
+
+def get_experiment(
+    api: Any,
+    exp_id: int,
+    option: str = "",
+    progress: Callable[[int, int | None], None] | None = None,
+) -> Any:
     """Get user experiment's description :
 
     :param api: API Rest api object
@@ -134,13 +172,14 @@ def get_experiment(api: Any, exp_id: int, option: str = "") -> Any:
             * 'data':        experiment tar.gz with description and firmwares
             * 'start':       expected start time
             * 'deployment':  deployment info
+    :param progress: 'data' download progress callback, see `rest.Api.download`
     """
-    result = api.get_experiment_info(exp_id, option)
     if option == "data":
-        _write_experiment_archive(exp_id, result)
-        result = "Written"
+        # streamed to the file, archives may be big
+        api.get_experiment_archive(exp_id, f"{exp_id}.tar.gz", progress)
+        return "Written"
 
-    return result
+    return api.get_experiment_info(exp_id, option)
 
 
 def get_active_experiments(api: Any, running_only: bool = True) -> dict[str, list[int]]:
@@ -178,8 +217,8 @@ def load_experiment(
     # Construct experiment files
     exp_files = helpers.FilesDict()
     exp_files[EXP_FILENAME] = helpers.json_dumps(experiment)
-    for exp_file in files:
-        exp_files.add_file(exp_file)
+    for exp_file in files:  # referenced by name in the description
+        exp_files.add_file(exp_file, dedupe=False)
     return api.submit_experiment(exp_files)
 
 
@@ -338,6 +377,84 @@ def _check_sites_uniq(*site_associations: SiteAssociationTuple) -> None:
         raise ValueError(f"Sites may only be given once: {duplicates}")
 
 
+@dataclass
+class PollingStrategy:
+    """Wait a fixed `step` between experiment states checks.
+
+    `polls` counts the states checks and `slept` the time waited between.
+    `start_date` is the experiment scheduled start timestamp, when known.
+
+    :param step: time to wait between each server check
+    """
+
+    step: float = 5
+    polls: int = field(default=0, init=False)
+    slept: float = field(default=0.0, init=False)
+    start_date: float | None = field(default=None, init=False)
+
+    def delay(self, state: str) -> float:  # pylint:disable=unused-argument
+        """Time to wait before checking again an experiment in `state`."""
+        return self.step
+
+    def sleep(self, state: str, remaining: float) -> None:
+        """Sleep before next check, not longer than `remaining` time."""
+        delay = max(0.0, min(self.delay(state), remaining))
+        self.slept += delay
+        time.sleep(delay)
+
+
+@dataclass
+class AdaptivePollingStrategy(PollingStrategy):
+    """Poll fast while launching and back off while waiting.
+
+    Launching experiments are checked every `fast_step`. Waiting ones are
+    checked with an exponential backoff from `step` to `max_step`, or
+    `margin` seconds before their scheduled start if it is later.
+
+    :param fast_step: time to wait in toLaunch and Launching states
+    :param max_step: maximum time to wait in Waiting state
+    :param margin: wake up this time before the scheduled start
+    :param jitter: randomize Waiting delays between half and full value
+    """
+
+    fast_step: float = 1
+    max_step: float = 300
+    margin: float = 30
+    jitter: bool = True
+    waiting_polls: int = field(default=0, init=False)
+
+    FAST_STATES = ("toLaunch", "Launching")
+
+    def delay(self, state: str) -> float:
+        if state != "Waiting":
+            self.waiting_polls = 0
+            return self.fast_step if state in self.FAST_STATES else self.step
+        self.waiting_polls += 1
+        return max(self._backoff(), self._until_start())
+
+    def _backoff(self) -> float:
+        """Exponential backoff delay for current `waiting_polls`.
+
+        >>> strategy = AdaptivePollingStrategy(step=5, max_step=30, jitter=False)
+        >>> [strategy.delay('Waiting') for _ in range(5)]
+        [5, 10, 20, 30, 30]
+        """
+        delay = min(self.max_step, self.step * 2 ** (self.waiting_polls - 1))
+        return random.uniform(delay / 2, delay) if self.jitter else delay
+
+    def _until_start(self) -> float:
+        """Time until `margin` before the scheduled start, 0 if unknown"""
+        if self.start_date is None:
+            return 0
+        return self.start_date - self.margin - time.time()
+
+
+POLLING_STRATEGIES: dict[str, type[PollingStrategy]] = {
+    "fixed": PollingStrategy,
+    "adaptive": AdaptivePollingStrategy,
+}
+
+
 def wait_experiment(  # pylint: disable=too-many-arguments,too-many-positional-arguments
     api: Any,
     exp_id: int,
@@ -345,6 +462,7 @@ def wait_experiment(  # pylint: disable=too-many-arguments,too-many-positional-a
     step: int = 5,
     timeout: float = WAIT_TIMEOUT_DEFAULT,
     cancel_on_timeout: bool = False,
+    strategy: PollingStrategy | None = None,
 ) -> str | None:
     """Wait for the experiment to be in `states`.
 
@@ -356,11 +474,15 @@ def wait_experiment(  # pylint: disable=too-many-arguments,too-many-positional-a
     :param step: time to wait between each server check
     :param timeout: timeout if wait takes too long
     :param cancel_on_timeout: cancel the experiment if the timeout is reached
+    :param strategy: polling strategy, default to `PollingStrategy(step)`
     """
+    strategy = strategy or PollingStrategy(step)
 
     def _state_function():
-        """Get current user experiment state."""
-        return get_experiment(api, exp_id, "")["state"]
+        """Get current user experiment state, and its scheduled start."""
+        exp = get_experiment(api, exp_id, "")
+        strategy.start_date = _start_timestamp(exp.get("start_date"))
+        return exp["state"]
 
     def _stop_function():
         """Cancel submitted user experiment."""
@@ -376,9 +498,24 @@ def wait_experiment(  # pylint: disable=too-many-arguments,too-many-positional-a
         step,
         timeout,
         cancel_on_timeout,
+        strategy,
     )
 
 
+def _start_timestamp(start_date: str | None) -> float | None:
+    """Return experiment `start_date` timestamp, None if unknown.
+
+    >>> _start_timestamp('2018-01-19T14:54:15Z')
+    1516373655.0
+    >>> _start_timestamp('1970-01-01T00:00:00Z') is None
+    True
+    """
+    if start_date is None:
+        return None
+    utc_date = datetime.strptime(start_date, "%Y-%m-%dT%H:%M:%SZ")
+    return utc_date.replace(tzinfo=timezone.utc).timestamp() or None
+
+
 def _states_from_str(states_str: str) -> list[str]:
     """Return list of states from comma separated string.
 
@@ -388,6 +525,9 @@ def _states_from_str(states_str: str) -> list[str]:
 
 
 STOPPED_STATES = set(_states_from_str("Terminated,Error"))
+# States of experiments that are not active anymore
+ENDED_STATES = set(_states_from_str("Terminated,Stopped,Error"))
+OAR_STATES_ORDER = {state: order for order, state in enumerate(helpers.OAR_STATES)}
 
 
 def _raise_timeout_msg(
@@ -409,6 +549,7 @@ def wait_state(  # pylint: disable=too-many-arguments,too-many-positional-argume
     step: int = 5,
     timeout: float = WAIT_TIMEOUT_DEFAULT,
     cancel_on_timeout: bool = False,
+    strategy: PollingStrategy | None = None,
 ) -> str | None:
     """Wait until `state_fct` returns a state in `states`
     and also Terminated or Error
@@ -417,12 +558,15 @@ def wait_state(  # pylint: disable=too-many-arguments,too-many-positional-argume
     :param states: Comma separated string of states to wait for
     :param step: time to wait between each server check
     :param timeout: timeout if wait takes too long
+    :param strategy: polling strategy, default to `PollingStrategy(step)`
     """
     expected_states = set(_states_from_str(states))
+    strategy = strategy or PollingStrategy(step)
     start_time = time.time()
 
     while not _timeout(start_time, timeout):
         state = state_fct()
+        strategy.polls += 1
 
         if state in expected_states:
             return state
@@ -433,7 +577,7 @@ def wait_state(  # pylint: disable=too-many-arguments,too-many-positional-argume
             raise RuntimeError(err.format(exp_str, state))
 
         # Still wait
-        time.sleep(step)
+        strategy.sleep(state, start_time + timeout - time.time())
 
     _raise_timeout_msg(exp_str, stop_fct, cancel_on_timeout)
     return None  # pragma: no cover
@@ -449,6 +593,141 @@ def _timeout(start_time: float, timeout: float) -> bool:
     return time.time() > start_time + timeout
 
 
+def wait_experiments(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    api: Any,
+    exp_ids: Iterable[int],
+    states: str = "Running",
+    step: int = 5,
+    timeout: float = WAIT_TIMEOUT_DEFAULT,
+    cancel_on_timeout: bool = False,
+    strategy: PollingStrategy | None = None,
+    report: Callable[[int, str], None] | None = None,
+) -> dict[str, list[int]]:
+    """Wait for all `exp_ids` experiments to be in `states`.
+
+    All experiments are checked with one experiments list request.
+    Experiments that are not listed, as they have ended, are then checked
+    individually. Experiments also stop being waited for when Terminated
+    or Error.
+
+    :param api: API Rest api object
+    :param exp_ids: scheduler OAR ids submission
+    :param states: Comma separated string of states to wait for
+    :param step: time to wait between each server check
+    :param timeout: timeout if wait takes too long
+    :param cancel_on_timeout: cancel the experiments still waited for
+        if the timeout is reached
+    :param strategy: polling strategy, default to `PollingStrategy(step)`
+    :param report: called with (exp_id, state) when an experiment is done
+    :returns: experiments ids per final state, with 'Timeout' for the ones
+        still waited for at timeout: {'Running': [123, 124], 'Error': [125]}
+    """
+    expected_states = set(_states_from_str(states))
+    strategy = strategy or PollingStrategy(step)
+    pending = list(dict.fromkeys(exp_ids))
+    summary: dict[str, list[int]] = {}
+    start_time = time.time()
+
+    while pending and not _timeout(start_time, timeout):
+        exps = _poll_experiments(api, pending, expected_states)
+        strategy.polls += 1
+        pending = _pending_experiments(exps, expected_states, summary, report)
+        pending_exps = [exps[exp_id] for exp_id in pending]
+        _sleep_strategy(strategy, pending_exps, start_time + timeout - time.time())
+
+    _timeout_experiments(api, pending, summary, cancel_on_timeout)
+    return summary
+
+
+def unexpected_states(
+    summary: dict[str, list[int]], states: str = "Running"
+) -> dict[str, list[int]]:
+    """Return `wait_experiments` summary entries that are not in `states`.
+
+    >>> unexpected_states({"Running": [1], "Error": [2], "Timeout": [3]})
+    {'Error': [2], 'Timeout': [3]}
+    >>> unexpected_states({"Terminated": [1]}, "Terminated,Error")
+    {}
+    """
+    expected_states = set(_states_from_str(states))
+    return {
+        state: ids for state, ids in summary.items() if state not in expected_states
+    }
+
+
+def _timeout_experiments(
+    api: Any, exp_ids: list[int], summary: dict[str, list[int]], cancel: bool
+) -> None:
+    """Add `exp_ids` still waited for to `summary`, and cancel them if `cancel`"""
+    if not exp_ids:
+        return
+    summary["Timeout"] = exp_ids
+    if cancel:
+        for exp_id in exp_ids:
+            stop_experiment(api, exp_id)
+
+
+def _sleep_strategy(
+    strategy: PollingStrategy, exps: list[dict[str, Any]], remaining: float
+) -> None:
+    """Sleep `strategy` delay for the most advanced of `exps`, if any"""
+    if not exps:
+        return
+    start_dates = [_start_timestamp(exp.get("start_date")) for exp in exps]
+    strategy.start_date = min((d for d in start_dates if d is not None), default=None)
+    strategy.sleep(_next_state(exp["state"] for exp in exps), remaining)
+
+
+def _poll_experiments(
+    api: Any, exp_ids: list[int], expected_states: set[str]
+) -> dict[int, dict[str, Any]]:
+    """Return `exp_ids` experiments info, listed with one request.
+
+    The list request is restricted to active and not ended expected states.
+    Experiments missing from the list are requested individually.
+    """
+    list_states = set(helpers.ACTIVE_STATES) | (expected_states - ENDED_STATES)
+    list_states_str = ",".join(s for s in helpers.OAR_STATES if s in list_states)
+    waited = set(exp_ids)
+    exps = {
+        exp["id"]: exp
+        for exp in api.get_experiments(state=list_states_str)["items"]
+        if exp["id"] in waited
+    }
+    for exp_id in exp_ids:
+        if exp_id not in exps:
+            exps[exp_id] = get_experiment(api, exp_id, "")
+    return exps
+
+
+def _pending_experiments(
+    exps: dict[int, dict[str, Any]],
+    expected_states: set[str],
+    summary: dict[str, list[int]],
+    report: Callable[[int, str], None] | None = None,
+) -> list[int]:
+    """Add done experiments to `summary` and return the still pending ones."""
+    pending = []
+    for exp_id, exp in exps.items():
+        state = exp["state"]
+        if state not in expected_states | STOPPED_STATES:
+            pending.append(exp_id)
+            continue
+        summary.setdefault(state, []).append(exp_id)
+        if report is not None:
+            report(exp_id, state)
+    return pending
+
+
+def _next_state(states: Iterable[str]) -> str:
+    """Return the most advanced state, the next one to change.
+
+    >>> _next_state(['Waiting', 'Launching', 'Waiting'])
+    'Launching'
+    """
+    return max(states, key=OAR_STATES_ORDER.__getitem__)
+
+
 def exp_resources(
     nodes: list[str] | "AliasNodes",
     firmware_path: str | None = None,
@@ -469,6 +748,7 @@ def exp_resources(
         exp_type = "alias"
     else:
         exp_type = "physical"
+        nodes = [helpers.NodeId(node) for node in nodes]
 
     resources = {
         "type": exp_type,
@@ -574,7 +854,7 @@ class AliasNodes:  # pylint: disable=too-few-public-methods
 # # # # # # # # # #
 
 # Kwargs to initialize 'AssociationsMap' for nodes sorted.
-_NODESMAPKWARGS = {"resource": "nodes", "sortkey": helpers.node_url_sort_key}
+_NODESMAPKWARGS = {"resource": "nodes", "sortkey": helpers.node_sort_key}
 
 
 class _Experiment:  # pylint:disable=too-many-instance-attributes
@@ -730,7 +1010,7 @@ class _Experiment:  # pylint:disable=too-many-instance-attributes
 
         self.nodes.extend(nodes_list)
         # Keep unique values and sorted
-        self.nodes = sorted(list(set(self.nodes)), key=helpers.node_url_sort_key)
+        self.nodes = helpers.sorted_nodes(set(self.nodes))
 
     def set_alias_nodes(self, alias_nodes):
         """Set alias nodes list"""
@@ -773,12 +1053,6 @@ def setattr_if_none(obj: Any, attr: str, default: Any) -> Any:
     return getattr(obj, attr)
 
 
-def _write_experiment_archive(exp_id: int, data: bytes) -> None:
-    """Write experiment archive contained in 'data' to 'exp_id.tar.gz'"""
-    with open(f"{exp_id}.tar.gz", "wb") as archive:
-        archive.write(data)
-
-
 def nodes_association_name(assoctype: str, assocname: str) -> str:
     """Adapt assocname depending of assoctype.
 
@@ -21,15 +21,18 @@
 
 """Helpers methods"""
 
+import contextlib
 import hashlib
 import itertools
 import json
 import os
 import sys
 import warnings
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Iterable, Iterator
 from typing import Any, cast
 
+from iotlabcli import cache
+
 OAR_STATES = [
     "Waiting",
     "toLaunch",
@@ -48,6 +51,24 @@ DEPRECATION_MESSAGE = (
     "instead\033[0m.\n\n"
 )
 
+# Current experiments found by `get_current_experiment`, by user, api url
+# and states, only kept in `shared_current_experiment` blocks
+_SHARED_EXPERIMENTS: dict[tuple[Any, ...], int] | None = None
+
+
+@contextlib.contextmanager
+def shared_current_experiment() -> Iterator[None]:
+    """Look up the current experiment only once for the block commands.
+
+    Until `forget_current_experiment` is called.
+    """
+    global _SHARED_EXPERIMENTS  # pylint:disable=global-statement
+    previous, _SHARED_EXPERIMENTS = _SHARED_EXPERIMENTS, {}
+    try:
+        yield
+    finally:
+        _SHARED_EXPERIMENTS = previous
+
 
 def get_current_experiment(
     api: Any, experiment_id: int | None = None, running_only: bool = True
@@ -65,11 +86,46 @@ def get_current_experiment(
         # or experiment that are starting (from waiting to Running')
         states = ACTIVE_STATES
 
+    return _current_experiment(api, states)
+
+
+def _current_experiment(api: Any, states: list[str]) -> int:
+    if _SHARED_EXPERIMENTS is None:
+        return _cached_current_experiment(api, states)
+    key = (api.auth.username, api.url, tuple(states))
+    if key not in _SHARED_EXPERIMENTS:
+        _SHARED_EXPERIMENTS[key] = _cached_current_experiment(api, states)
+    return _SHARED_EXPERIMENTS[key]
+
+
+def _cached_current_experiment(api: Any, states: list[str]) -> int:
+    """Look up the current experiment through `api.disk_cache` if set."""
+    disk_cache = getattr(api, "disk_cache", None)
+    if not isinstance(disk_cache, cache.DiskCache):
+        return _lookup_current_experiment(api, states)
+    key = f"{api.url} {api.auth.username} {','.join(states)}"
+    return disk_cache.cached(
+        key,
+        cache.CURRENT_EXPERIMENT,
+        lambda _: {"content": _lookup_current_experiment(api, states)},
+    )
+
+
+def _lookup_current_experiment(api: Any, states: list[str]) -> int:
     exp_by_states = exps_by_states_dict(api, states)
+    return get_current_exp(exp_by_states, states)
 
-    exp_id = get_current_exp(exp_by_states, states)
 
-    return exp_id
+def forget_current_experiment(api: Any) -> None:
+    """Forget current experiments found by `get_current_experiment`.
+
+    To call when they may have changed, or were rejected by the server.
+    """
+    if _SHARED_EXPERIMENTS is not None:
+        _SHARED_EXPERIMENTS.clear()
+    disk_cache = getattr(api, "disk_cache", None)
+    if isinstance(disk_cache, cache.DiskCache):
+        disk_cache.invalidate(cache.CURRENT_EXPERIMENT)
 
 
 def exps_by_states_dict(api: Any, states: list[str]) -> dict[str, list[int]]:
@@ -139,6 +195,75 @@ def get_current_exp(exp_by_states: dict[str, list[int]], states: list[str]) -> i
     return res
 
 
+# Maximum number of interned NodeId, the table is emptied when full
+NODES_INTERNED_SIZE = 100000
+
+
+def _url_sort_key(node_url: str) -> str:
+    """Return `node_url` sort key, a string ordered as (site, archi, number).
+
+    >>> _url_sort_key("m3-10.grenoble.iot-lab.info") > _url_sort_key("m3-9")
+    True
+    >>> _url_sort_key("node-a8-2")
+    '\\x00node-a8\\x0000000000000000000002'
+    >>> _url_sort_key("3")  # for alias nodes
+    '\\x00\\x0000000000000000000003'
+    >>> _url_sort_key("m3-x.grenoble.iot-lab.info")
+    Traceback (most recent call last):
+    ValueError: Invalid node url 'm3-x.grenoble.iot-lab.info'
+    """
+    if node_url.isdigit():
+        return "\0\0" + node_url.zfill(20)
+    _node, _, domain = node_url.partition(".")
+    archi, num_str = _node.rsplit("-", 1)
+    if not num_str.isdigit():
+        raise ValueError(f"Invalid node url {node_url!r}")
+    # str.zfill is twice faster than a '020d' format
+    return f"{domain.partition('.')[0]}\0{archi}\0{num_str.zfill(20)}"
+
+
+class NodeId(str):
+    """Node url, as a string, with its parsed fields and sort key.
+
+    Nodes are interned, parsing is done once per url, up to
+    NODES_INTERNED_SIZE urls.
+    `sort_key` is a string ordered as (site, archi, number) tuples, strings
+    comparisons are much faster when sorting.
+
+    >>> node = NodeId("m3-2.grenoble.iot-lab.info")
+    >>> node, node.site, node.archi, node.number, node.domain
+    ('m3-2.grenoble.iot-lab.info', 'grenoble', 'm3', 2, 'iot-lab.info')
+    >>> node is NodeId("m3-2.grenoble.iot-lab.info")
+    True
+
+    >>> NodeId("m3-10.grenoble.iot-lab.info").sort_key > node.sort_key
+    True
+    >>> NodeId("3").number  # for alias nodes
+    3
+    """
+
+    __slots__ = ("site", "archi", "number", "domain", "sort_key")
+    _interned: dict[str, "NodeId"] = {}
+
+    def __new__(cls, node_url: str) -> "NodeId":
+        node = cls._interned.get(node_url)
+        if node is None:
+            node = super().__new__(cls, node_url)
+            node.sort_key = _url_sort_key(node_url)
+            if node_url.isdigit():
+                node.site = node.archi = node.domain = ""
+                node.number = int(node_url)
+            else:
+                _node, _, domain = node_url.partition(".")
+                node.site, _, node.domain = domain.partition(".")
+                node.archi, num_str = _node.rsplit("-", 1)
+                node.number = int(num_str)
+            if len(cls._interned) >= NODES_INTERNED_SIZE:
+                cls._interned.clear()  # bounded in long running processes
+            node = cls._interned.setdefault(node, node)
+        return node
+
+
 def node_url_sort_key(node_url: str) -> int | tuple[str, str, int]:
     """
     >>> node_url_sort_key("m3-2.grenoble.iot-lab.info")
@@ -159,13 +284,38 @@ def node_url_sort_key(node_url: str) -> int | tuple[str, str, int]:
     ('', 'node-a8', 2)
 
     """
-    if node_url.isdigit():
-        return int(node_url)
-    _node, _, domain = node_url.partition(".")
-    site = domain.split(".")[0]
+    node = NodeId(node_url)
+    if not node.archi:
+        return node.number
+    return node.site, node.archi, node.number
+
+
+def node_sort_key(node_url: str) -> str:
+    """Return `node_url` sort key, faster to compare than tuples.
+
+    NodeId keys are already computed, other urls are not interned, as
+    parsing them costs less than creating their NodeId.
+
+    >>> node_sort_key("m3-2.grenoble.iot-lab.info") < node_sort_key("m3-10")
+    False
+    >>> node_sort_key("2") < node_sort_key("10")
+    True
+    """
+    if isinstance(node_url, NodeId):
+        return node_url.sort_key
+    return _url_sort_key(node_url)
 
-    node_type, num_str = _node.rsplit("-", 1)
-    return site, node_type, int(num_str)
+
+def sorted_nodes(nodes: Iterable[str]) -> list[str]:
+    """Return `nodes` sorted as (site, archi, number).
+
+    >>> sorted_nodes(["m3-10.grenoble.iot-lab.info", "a8-1.lille.iot-lab.info",
+    ...               "m3-9.grenoble.iot-lab.info"])
+    ...  # doctest: +NORMALIZE_WHITESPACE
+    ['m3-9.grenoble.iot-lab.info', 'm3-10.grenoble.iot-lab.info',
+     'a8-1.lille.iot-lab.info']
+    """
+    return sorted(nodes, key=node_sort_key)
 
 
 def md5(data: bytes) -> str:
@@ -175,6 +325,70 @@ def md5(data: bytes) -> str:
     return hash_md5.hexdigest()
 
 
+class FileRef:
+    """Lazy reference to a file content, read by chunks only when needed.
+
+    A reference is equal to another reference, or to bytes, with the same
+    content: content is only hashed when sizes match.
+
+    Digests are indexed by file (path, mtime, size) so each file content is
+    hashed once, whatever the number of references to it.
+    """
+
+    chunk_size = 64 * 1024
+    # (realpath, mtime_ns, size) -> md5 digest
+    _digests: dict[tuple[str, int, int], str] = {}
+    # whole content, once loaded
+    content: bytes | None = None
+
+    def __init__(self, file_path: str) -> None:
+        self.path = os.path.expanduser(file_path)  # expand '~'
+        stat = os.stat(self.path)  # fail early on missing files
+        self.size = stat.st_size
+        self.key = (os.path.realpath(self.path), stat.st_mtime_ns, stat.st_size)
+
+    @property
+    def md5(self) -> str:
+        """md5 hash of the file content, hashed by chunks once per file"""
+        try:
+            return self._digests[self.key]
+        except KeyError:
+            hash_md5 = hashlib.md5()
+            for chunk in self.chunks():
+                hash_md5.update(chunk)
+            return self._digests.setdefault(self.key, hash_md5.hexdigest())
+
+    def load(self) -> "FileRef":
+        """Read the file content once, to be sent several times"""
+        self.content = self.read()
+        self.size = len(self.content)
+        return self
+
+    def chunks(self) -> Iterator[bytes]:
+        """Iterate over the file content"""
+        if self.content is not None:
+            yield self.content
+            return
+        with open(self.path, "rb") as _fd:
+            yield from iter(lambda: _fd.read(self.chunk_size), b"")
+
+    def read(self) -> bytes:
+        """Return the whole file content"""
+        return b"".join(self.chunks())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, FileRef):
+            if self.key == other.key:  # same file, no need to read it
+                return True
+            return self.size == other.size and self.md5 == other.md5
+        if isinstance(other, bytes):
+            return self.size == len(other) and self.md5 == md5(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"FileRef({self.path!r})"
+
+
 class FilesDict(dict):
     """Dictionary to store experiment files.
     We don't want adding two different values for the same key,
@@ -183,34 +397,66 @@ class FilesDict(dict):
 
     def __init__(self) -> None:
         dict.__init__(self)
+        # FileRef.key -> dict key, files added once whatever their references
+        self._files: dict[tuple[str, int, int], str] = {}
+        # size -> dict keys of added files, identical contents added once
+        self._sizes: dict[int, list[str]] = {}
 
-    def __setitem__(self, key: str, val: str | bytes) -> None:
+    def __setitem__(self, key: str, val: str | bytes | FileRef) -> None:
         """Prevent adding a new different value to an existing key"""
         if key not in self:
             dict.__setitem__(self, key, val)
         elif self[key] != val:
             raise ValueError(f"Has different values for same key {key!r}")
 
-    def add_file(self, file_path: str | None) -> str | None:
+    def add_file(
+        self, file_path: str | FileRef | None, dedupe: bool = True
+    ) -> str | None:
         """Add a file to the dictionary.
-        :param file_path the path of the file to add
+        :param file_path the path of the file to add, or its FileRef
+        :param dedupe: return the id of an added file with the same content,
+            callers must then reference the file with the returned id
         :returns the id of the file in the dict
         If a file with the same basename already exists inside,
         then prefix with short hash is used
         if None do nothing
+
+        The file is added as a lazy FileRef, its content is only read
+        to compare it or when streaming it.
+        An already added file is not compared again, and a file with the
+        same content as an added one returns its id, to be sent once.
         """
         if file_path is None:
             return None
-        key = os.path.basename(file_path)
-        value = cast(bytes, read_file(file_path, "b"))
+        value = file_path if isinstance(file_path, FileRef) else FileRef(file_path)
+        if value.key not in self._files:
+            add = self._add_content if dedupe else self._add_file_ref
+            self._files[value.key] = add(value)
+        return self._files[value.key]
+
+    def _add_content(self, value: FileRef) -> str:
+        """Return the key of an added file with `value` content, or add it.
+
+        Contents are only hashed when another file has the same size.
+        """
+        same_size = self._sizes.setdefault(value.size, [])
+        for key in same_size:
+            if self[key] == value:
+                return key
+        key = self._add_file_ref(value)
+        same_size.append(key)
+        return key
+
+    def _add_file_ref(self, value: FileRef) -> str:
+        """Add `value` under its basename, return its key"""
+        key = os.path.basename(value.path)
         try:
             self[key] = value
         except ValueError:
             # use md5 hash as prefix to handle duplicated basenames
             # with different contents
-            key = f"{md5(value)}_{key}"
+            key = f"{value.md5}_{key}"
             self[key] = value
-
         return key
 
     def add_files_from_dict(
@@ -281,16 +527,25 @@ def check_experiment_state(state_str: str | None = None) -> str:
     return state_str
 
 
+class _Encoder(json.JSONEncoder):  # pylint: disable=too-few-public-methods
+    """Encoder for serialization object python to JSON format"""
+
+    def default(self, o):  # pylint: disable=method-hidden
+        return o.__dict__
+
+
 def json_dumps(obj: Any) -> str:
     """Dumps data to json"""
+    return json.dumps(obj, cls=_Encoder, sort_keys=True, indent=4)
 
-    class _Encoder(json.JSONEncoder):  # pylint: disable=too-few-public-methods
-        """Encoder for serialization object python to JSON format"""
 
-        def default(self, o):  # pylint: disable=method-hidden
-            return o.__dict__
+def json_line(obj: Any) -> str:
+    """Dumps data to json on a single line, for JSON lines outputs
 
-    return json.dumps(obj, cls=_Encoder, sort_keys=True, indent=4)
+    >>> json_line({'id': 1, 'state': 'Running'})
+    '{"id": 1, "state": "Running"}'
+    """
+    return json.dumps(obj, cls=_Encoder, sort_keys=True)
 
 
 def flatten_list_list(list_list: Iterable[Iterable[Any]]) -> list[Any]:
@@ -0,0 +1,294 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Interval sets of nodes ids, in the '1-34+72' short format
+
+Nodes selections are stored as sorted ranges of ids by (site, archi), they
+are only expanded to nodes urls when needed.
+
+    >>> nodes = NodesSet.from_info("grenoble", "m3", "1-100")
+    >>> nodes -= NodesSet.from_urls(["m3-20.grenoble.iot-lab.info"])
+    >>> nodes.short_lists()
+    ['grenoble,m3,1-19+21-100']
+    >>> len(nodes)
+    99
+
+"""
+
+import bisect
+import itertools
+import operator
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+from iotlabcli import helpers
+
+DOMAIN_DNS = "iot-lab.info"
+
+
+class IntervalSet:
+    """Immutable set of integers stored as sorted (first, last) ranges.
+
+    >>> ids = IntervalSet.from_short("1-4+6+7-8")
+    >>> ids
+    IntervalSet('1-4+6-8')
+    >>> list(ids | IntervalSet.from_short("5")), 5 in ids
+    ([1, 2, 3, 4, 5, 6, 7, 8], False)
+    >>> str(ids - IntervalSet.from_ints([2, 3, 7])), str(ids & IntervalSet([(3, 6)]))
+    ('1+4+6+8', '3-4+6')
+
+    >>> IntervalSet.from_short('1-4-5')
+    Traceback (most recent call last):
+    ValueError: Invalid nodes list: 1-4-5 ([0-9+-])
+    """
+
+    __slots__ = ("ranges",)
+
+    def __init__(self, ranges: Iterable[tuple[int, int]] = ()) -> None:
+        self.ranges = self._merged(sorted(ranges))
+
+    @staticmethod
+    def _merged(ranges: list[tuple[int, int]]) -> tuple[tuple[int, int], ...]:
+        """Merge sorted `ranges` overlapping or following each other."""
+        merged: list[tuple[int, int]] = []
+        for first, last in ranges:
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(last, merged[-1][1]))
+            else:
+                merged.append((first, last))
+        return tuple(merged)
+
+    @classmethod
+    def from_short(cls, nodes_str: str) -> "IntervalSet":
+        """Parse short nodes list '1-5+6+8-12'."""
+        try:
+            return cls(_short_range(range_str) for range_str in nodes_str.split("+"))
+        except ValueError:
+            # invalid: 6-3 or 6-7-8 or non int values
+            raise ValueError(f"Invalid nodes list: {nodes_str} ([0-9+-])")
+
+    @classmethod
+    def from_ints(cls, numbers: Iterable[int]) -> "IntervalSet":
+        """Create from integers in any order."""
+        return cls((num, num) for num in numbers)
+
+    def __str__(self) -> str:
+        return "+".join(
+            str(first) if first == last else f"{first}-{last}"
+            for first, last in self.ranges
+        )
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({str(self)!r})"
+
+    def __iter__(self) -> Iterator[int]:
+        for first, last in self.ranges:
+            yield from range(first, last + 1)
+
+    def __len__(self) -> int:
+        return sum(last - first + 1 for first, last in self.ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self.ranges)
+
+    def __contains__(self, number: object) -> bool:
+        if not isinstance(number, int):
+            return False
+        index = bisect.bisect(self.ranges, number, key=_FIRST)
+        return bool(index) and self.ranges[index - 1][1] >= number
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IntervalSet):
+            return NotImplemented
+        return self.ranges == other.ranges
+
+    def __hash__(self) -> int:
+        return hash(self.ranges)
+
+    def __or__(self, other: "IntervalSet") -> "IntervalSet":
+        return IntervalSet(self.ranges + other.ranges)
+
+    def __and__(self, other: "IntervalSet") -> "IntervalSet":
+        result = []
+        ranges, others = self.ranges, other.ranges
+        index = other_index = 0
+        while index < len(ranges) and other_index < len(others):
+            (first, last), (other_first, other_last) = (
+                ranges[index],
+                others[other_index],
+            )
+            if max(first, other_first) <= min(last, other_last):
+                result.append((max(first, other_first), min(last, other_last)))
+            # move forward the range ending first
+            if last < other_last:
+                index += 1
+            else:
+                other_index += 1
+        return IntervalSet(result)
+
+    def __sub__(self, other: "IntervalSet") -> "IntervalSet":
+        return self & other.complement(*self.bounds())
+
+    def bounds(self) -> tuple[int, int]:
+        """Return (first, last) values, (0, -1) when empty."""
+        if not self.ranges:
+            return 0, -1
+        return self.ranges[0][0], self.ranges[-1][1]
+
+    def complement(self, first: int, last: int) -> "IntervalSet":
+        """Return values from `first` to `last` not in this set."""
+        edges = [(first - 1, first - 1), *self.ranges, (last + 1, last + 1)]
+        return IntervalSet(
+            (prev[1] + 1, nxt[0] - 1)
+            for prev, nxt in itertools.pairwise(edges)
+            if prev[1] + 1 < nxt[0]
+        )
+
+
+_FIRST = operator.itemgetter(0)
+
+
+def _short_range(range_str: str) -> tuple[int, int]:
+    """Return (first, last) from a '1-5' or '6' string.
+    :raises: ValueError on invalid values
+    """
+    values = [int(value) for value in range_str.split("-")]
+    if len(values) == 1:
+        return values[0], values[0]
+    first, last = values  # ValueError on '6-7-8'
+    if first >= last:
+        raise ValueError
+    return first, last
+
+
+class NodesSet:
+    """Set of nodes, stored as IntervalSet of ids by (site, archi).
+
+    `archi` is the nodes hostname prefix, like 'm3' or 'a8'.
+    """
+
+    __slots__ = ("ids",)
+
+    def __init__(self, ids: dict[tuple[str, str], IntervalSet] | None = None) -> None:
+        self.ids = {key: value for key, value in (ids or {}).items() if value}
+
+    @classmethod
+    def from_info(cls, site: str, archi: str, nodes_str: str) -> "NodesSet":
+        """Create from a short nodes list 'site', 'archi', '1-5+6+8-12'."""
+        return cls({(site, archi): IntervalSet.from_short(nodes_str)})
+
+    @classmethod
+    def from_urls(cls, urls: Iterable[str]) -> "NodesSet":
+        """Create from nodes urls.
+
+        >>> NodesSet.from_urls(['m3-2.lille.iot-lab.info', 'a8'])
+        Traceback (most recent call last):
+        ValueError: Invalid node url: 'a8'
+        """
+        numbers: dict[tuple[str, str], list[int]] = {}
+        for url in urls:
+            try:
+                node = helpers.NodeId(url)
+            except ValueError:
+                node = None
+            if node is None or not node.archi:
+                raise ValueError(f"Invalid node url: {url!r}")
+            numbers.setdefault((node.site, node.archi), []).append(node.number)
+        return cls({key: IntervalSet.from_ints(ids) for key, ids in numbers.items()})
+
+    @classmethod
+    def from_nodes_ids(cls, items: Iterable[dict[str, Any]]) -> "NodesSet":
+        """Create from an experiment 'nodes_ids' items.
+
+        Items are {site: {archi: '1-34+72'}} dicts, archi may be given with
+        its radio like 'm3:at86rf231'.
+
+        >>> NodesSet.from_nodes_ids([{"grenoble": {"m3:at86rf231": "1-3"},
+        ...                           "lille": {"a8": "2"}}])
+        NodesSet(['grenoble,m3,1-3', 'lille,a8,2'])
+        """
+        nodes = cls()
+        for item in items:
+            for site, archis in item.items():
+                for archi, nodes_str in archis.items():
+                    archi = archi.partition(":")[0]
+                    nodes |= cls.from_info(site, archi, nodes_str)
+        return nodes
+
+    def _combine(
+        self, other: "NodesSet", function: Callable[..., IntervalSet], keys: Any
+    ) -> "NodesSet":
+        """Combine IntervalSet of `keys` with `function`."""
+        empty = IntervalSet()
+        return NodesSet(
+            {
+                key: function(self.ids.get(key, empty), other.ids.get(key, empty))
+                for key in keys
+            }
+        )
+
+    def __or__(self, other: "NodesSet") -> "NodesSet":
+        return self._combine(other, IntervalSet.__or__, self.ids.keys() | other.ids)
+
+    def __and__(self, other: "NodesSet") -> "NodesSet":
+        return self._combine(other, IntervalSet.__and__, self.ids.keys() & other.ids)
+
+    def __sub__(self, other: "NodesSet") -> "NodesSet":
+        return self._combine(other, IntervalSet.__sub__, self.ids)
+
+    def __contains__(self, url: object) -> bool:
+        node = helpers.NodeId(str(url))
+        return node.number in self.ids.get((node.site, node.archi), ())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, NodesSet):
+            return NotImplemented
+        return self.ids == other.ids
+
+    __hash__ = None
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self.ids.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.ids)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.short_lists()!r})"
+
+    def short_lists(self) -> list[str]:
+        """Return sorted 'site,archi,1-34+72' nodes lists."""
+        return [
+            f"{site},{archi},{self.ids[site, archi]}" for site, archi in self.keys()
+        ]
+
+    def keys(self) -> list[tuple[str, str]]:
+        """Return sorted (site, archi)."""
+        return sorted(self.ids)
+
+    def urls(self, domain: str = DOMAIN_DNS) -> list[helpers.NodeId]:
+        """Expand to nodes urls, sorted as `helpers.sorted_nodes`."""
+        return [
+            helpers.NodeId(f"{archi}-{num}.{site}.{domain}")
+            for site, archi in self.keys()
+            for num in self.ids[site, archi]
+        ]
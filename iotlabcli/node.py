@@ -22,23 +22,40 @@
 """Implement the 'node' requests"""
 
 import json
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
-from iotlabcli import helpers
+from iotlabcli import elf, helpers, intervals, rest
 
 NODE_FILENAME = "nodes.json"
 EXPERIMENT = "experiment.json"
 
+# Default number of sites requests sent concurrently with `parallel_sites`
+PARALLEL_SITES = 8
+
+# Default number of firmwares flashed concurrently by `flash_plan`
+PARALLEL_FLASHES = 4
+
+# Delay in seconds before the first retry of failed nodes, doubled each round
+RETRY_DELAY = 1.0
+
+# Code of retried nodes whose request failed, unreachable server or site
+REQUEST_ERROR = "error"
+
 
 def _node_command_flash(
-    api: Any, exp_id: int, nodes_list: list[str], cmd_opt: str
+    api: Any, exp_id: int, nodes_list: list[str], cmd_opt: str | helpers.FileRef
 ) -> Any:
     assert cmd_opt is not None, "`cmd_opt` required for update"
     files = helpers.FilesDict()
 
     files.add_file(cmd_opt)
-    if cmd_opt.endswith(".bin"):
-        files[EXPERIMENT] = json.dumps({"nodes": nodes_list, "offset": 0})
+    path = cmd_opt.path if isinstance(cmd_opt, helpers.FileRef) else cmd_opt
+    if path.endswith(".bin"):
+        offset = getattr(cmd_opt, "offset", 0)
+        files[EXPERIMENT] = json.dumps({"nodes": nodes_list, "offset": offset})
         return api.node_update(exp_id, files, binary=True)
 
     files[NODE_FILENAME] = json.dumps(nodes_list)
@@ -56,12 +73,16 @@ def _node_command_profile_load(
     return api.node_profile_load(exp_id, files)
 
 
-def node_command(
+def node_command(  # pylint:disable=too-many-arguments
     api: Any,
     command: str,
     exp_id: int,
     nodes_list: list[str] | tuple[()] = (),
-    cmd_opt: str | None = None,
+    cmd_opt: str | helpers.FileRef | None = None,
+    *,
+    parallel_sites: int = 0,
+    retries: int = 0,
+    strip_elf: bool = False,
 ) -> Any:
     """Launch commands (start, stop, reset, update)
     on nodes (JSONArray) user experiment
@@ -72,6 +93,15 @@ def node_command(
     :param nodes_list: List of nodes where to run command.
                        Empty list runs on all nodes
     :param cmd_opt: Firmware path for update, profile name for profile
+    :param parallel_sites: Send one request per site, up to `parallel_sites`
+                           concurrently. Sites durations and errors are
+                           returned in result 'sites'
+    :param retries: Run command again up to `retries` times on nodes that
+                    returned a non zero code. Result lists each node last
+                    code, REQUEST_ERROR if its request failed, 'attempts'
+                    of nodes run more than once and retries 'errors'
+    :param strip_elf: Flash ELF firmwares loaded sections as a binary
+                      firmware, converted locally, to upload less data
     """
     assert command in (
         "flash",
@@ -86,6 +116,35 @@ def node_command(
         "debug-stop",
     )
 
+    if strip_elf and command == "flash":
+        cmd_opt = _binary_firmware(api, cmd_opt)
+    if retries:
+        return _retried_command(
+            api, command, exp_id, nodes_list, cmd_opt, parallel_sites, retries
+        )
+    if parallel_sites:
+        return _sites_command(api, command, exp_id, nodes_list, cmd_opt, parallel_sites)
+    return _node_command(api, command, exp_id, nodes_list, cmd_opt)
+
+
+def _binary_firmware(api: Any, firmware: Any) -> Any:
+    """Return `firmware` converted to a binary firmware if it is an ELF file"""
+    if isinstance(firmware, elf.BinaryFirmware):
+        return firmware
+    path = firmware.path if isinstance(firmware, helpers.FileRef) else firmware
+    if not elf.is_elf(path):
+        return firmware
+    return elf.BinaryFirmware(path, getattr(api, "disk_cache", None))
+
+
+def _node_command(
+    api: Any,
+    command: str,
+    exp_id: int,
+    nodes_list: list[str] | tuple[()],
+    cmd_opt: str | helpers.FileRef | None,
+) -> Any:
+    """Run `command` with one request."""
     result = None
     if command == "flash":
         result = _node_command_flash(api, exp_id, nodes_list, cmd_opt)
@@ -97,3 +156,291 @@ def node_command(
         result = api.node_command(command, exp_id, nodes_list)
 
     return result
+
+
+def _sites_command(  # pylint:disable=too-many-arguments,too-many-positional-arguments
+    api: Any,
+    command: str,
+    exp_id: int,
+    nodes_list: list[str] | tuple[()],
+    cmd_opt: str | helpers.FileRef | None,
+    parallel_sites: int,
+) -> dict[str, Any]:
+    """Run `command` with one request per site, sent concurrently."""
+    sites = _nodes_by_site(nodes_list or _experiment_nodes(api, exp_id))
+
+    def _site_command(nodes: list[str]) -> dict[str, Any]:
+        return _timed(_node_command, api, command, exp_id, nodes, cmd_opt)
+
+    workers = max(1, min(parallel_sites, len(sites)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(sites, pool.map(_site_command, sites.values())))
+    return _merge_requests(results, "sites")
+
+
+def _experiment_nodes(api: Any, exp_id: int) -> list[helpers.NodeId]:
+    """Return experiment nodes urls."""
+    nodes_ids = api.get_experiment_info(exp_id, "nodes_ids")
+    return intervals.NodesSet.from_nodes_ids(nodes_ids["items"]).urls()
+
+
+def _nodes_by_site(nodes_list: list[str] | tuple[()]) -> dict[str, list[str]]:
+    """Return sorted nodes grouped by site."""
+    sites: dict[str, list[str]] = {}
+    for node in helpers.sorted_nodes(map(helpers.NodeId, nodes_list)):
+        sites.setdefault(node.site, []).append(node)
+    return sites
+
+
+def _timed(function: Callable[..., Any], *args: Any, **kwargs: Any) -> dict[str, Any]:
+    """Run a node command `function`, return its result or error and duration."""
+    start = time.monotonic()
+    request: dict[str, Any] = {}
+    try:
+        request["result"] = function(*args, **kwargs)
+    except (OSError, rest.TransportError) as err:  # HTTPError, unreachable server
+        request["error"] = err
+    request["duration"] = round(time.monotonic() - start, 3)
+    return request
+
+
+def _merge_requests(requests: dict[str, dict[str, Any]], name: str) -> dict[str, Any]:
+    """Merge `requests` results by return code, add their durations and errors
+    as `name`.
+
+    >>> _merge_requests({
+    ...     "grenoble": {"result": {"0": ["m3-1.grenoble"]}, "duration": 0.5},
+    ...     "lille": {"result": {"0": ["m3-1.lille"], "1": ["m3-2.lille"]},
+    ...               "duration": 2.0},
+    ...     "paris": {"error": OSError("timeout"), "duration": 30.0},
+    ... }, "sites")  # doctest: +NORMALIZE_WHITESPACE
+    {'0': ['m3-1.grenoble', 'm3-1.lille'], '1': ['m3-2.lille'],
+     'sites': {'grenoble': {'duration': 0.5}, 'lille': {'duration': 2.0},
+               'paris': {'duration': 30.0, 'error': 'timeout'}}}
+    """
+    errors = [request["error"] for request in requests.values() if "error" in request]
+    if errors and len(errors) == len(requests):
+        raise errors[0]
+
+    result: dict[str, Any] = {}
+    for request in requests.values():
+        _merge_result(result, request.get("result", {}))
+    result[name] = {key: _request_report(value) for key, value in requests.items()}
+    return result
+
+
+def _merge_result(result: dict[str, Any], other: dict[str, Any]) -> None:
+    """Extend `result` nodes lists and update its dicts with `other` ones."""
+    for key, value in other.items():
+        if isinstance(value, list):
+            result.setdefault(key, []).extend(value)
+        elif isinstance(value, dict):
+            result.setdefault(key, {}).update(value)
+
+
+def _request_report(request: dict[str, Any]) -> dict[str, Any]:
+    """Return request duration and error message if any."""
+    report = {"duration": request["duration"]}
+    if "error" in request:
+        report["error"] = str(request["error"])
+    return report
+
+
+def _retried_command(  # pylint:disable=too-many-arguments,too-many-positional-arguments
+    api: Any,
+    command: str,
+    exp_id: int,
+    nodes_list: list[str] | tuple[()],
+    cmd_opt: str | helpers.FileRef | None,
+    parallel_sites: int,
+    retries: int,
+) -> dict[str, Any]:
+    """Run `command` again on failed nodes, with an increasing delay.
+
+    A failed retry request does not drop previous rounds results, its
+    nodes get the REQUEST_ERROR code and its error is in 'errors'.
+    """
+    cmd_opt = _loaded_firmware(command, cmd_opt)
+    if parallel_sites and not nodes_list:  # to find nodes of failed sites
+        nodes_list = _experiment_nodes(api, exp_id)
+
+    def _run(nodes: list[str] | tuple[()]) -> dict[str, Any]:
+        return node_command(
+            api, command, exp_id, nodes, cmd_opt, parallel_sites=parallel_sites
+        )
+
+    codes: dict[str, str] = {}
+    attempts: dict[str, int] = {}
+    result = _run(nodes_list)  # keep first round other values
+    failed = _update_codes(codes, attempts, result, nodes_list)
+    errors = _retry_failed(_run, codes, attempts, failed, retries)
+    consolidated = _consolidated(result, codes, attempts)
+    if errors:
+        consolidated["errors"] = errors
+    return consolidated
+
+
+def _retry_failed(
+    run: Callable[[list[str]], dict[str, Any]],
+    codes: dict[str, str],
+    attempts: dict[str, int],
+    failed: list[str],
+    retries: int,
+) -> dict[int, str]:
+    """Run `failed` nodes again up to `retries` times, return requests errors
+    by retry number."""
+    errors: dict[int, str] = {}
+    for retry in range(retries):
+        if not failed:
+            break
+        time.sleep(RETRY_DELAY * 2**retry)
+        try:
+            result = run(failed)
+        except (OSError, rest.TransportError) as err:  # HTTPError, unreachable
+            errors[retry + 1] = str(err)
+            result = {}
+        failed = _update_codes(codes, attempts, result, failed)
+    return errors
+
+
+def _loaded_firmware(command: str, cmd_opt: Any) -> Any:
+    """Return flashed firmware content read once, to flash it several times."""
+    if command != "flash" or cmd_opt is None or isinstance(cmd_opt, helpers.FileRef):
+        return cmd_opt
+    return helpers.FileRef(cmd_opt).load()
+
+
+def _update_codes(
+    codes: dict[str, str],
+    attempts: dict[str, int],
+    result: dict[str, Any],
+    nodes_list: list[str] | tuple[()],
+) -> list[str]:
+    """Update nodes `codes` and `attempts` from `result`, return failed nodes.
+
+    `nodes_list` nodes missing from `result`, as their request failed,
+    get the REQUEST_ERROR code.
+    """
+    results = {node: code for code, nodes in _nodes_results(result) for node in nodes}
+    for node in nodes_list:
+        results.setdefault(node, REQUEST_ERROR)
+    for node, code in results.items():
+        codes[node] = code
+        attempts[node] = attempts.get(node, 0) + 1
+    return [node for node, code in results.items() if code != "0"]
+
+
+def _nodes_results(result: dict[str, Any]) -> list[tuple[str, list[str]]]:
+    """Return (code, nodes) from a node command `result`."""
+    return [(code, nodes) for code, nodes in result.items() if isinstance(nodes, list)]
+
+
+def _consolidated(
+    result: dict[str, Any], codes: dict[str, str], attempts: dict[str, int]
+) -> dict[str, Any]:
+    """Return `result` with each node last code and retried nodes attempts.
+
+    Nodes are sorted by code.
+
+    >>> _consolidated({"0": ["m3-1"], "1": ["m3-2", "m3-3"], "sites": {}},
+    ...               {"m3-1": "0", "m3-2": "0", "m3-3": "1"},
+    ...               {"m3-1": 1, "m3-2": 3, "m3-3": 3})
+    ...  # doctest: +NORMALIZE_WHITESPACE
+    {'sites': {}, '0': ['m3-1', 'm3-2'], '1': ['m3-3'],
+     'attempts': {'m3-2': 3, 'm3-3': 3}}
+    """
+    consolidated = {
+        key: value for key, value in result.items() if not isinstance(value, list)
+    }
+    for node, code in codes.items():
+        consolidated.setdefault(code, []).append(node)
+    for code in set(codes.values()):
+        consolidated[code] = helpers.sorted_nodes(consolidated[code])
+    consolidated["attempts"] = {
+        node: count for node, count in attempts.items() if count > 1
+    }
+    return consolidated
+
+
+# Firmware plan path, firmware to flash and its nodes
+_FlashGroup = tuple[str, helpers.FileRef, intervals.NodesSet]
+
+
+def flash_plan(  # pylint:disable=too-many-arguments
+    api: Any,
+    exp_id: int,
+    plan: dict[str, list[str] | str],
+    *,
+    parallel: int = PARALLEL_FLASHES,
+    retries: int = 0,
+    strip_elf: bool = False,
+) -> dict[str, Any]:
+    """Flash several firmwares, each one on its nodes
+
+    :param api: API Rest api object
+    :param exp_id: Target experiment id
+    :param plan: Nodes selection by firmware path. A selection is a list of
+                 nodes urls or 'site,archi,1-34+72' short nodes lists
+    :param parallel: Number of firmwares flashed concurrently
+    :param retries: See `node_command`
+    :param strip_elf: See `node_command`
+    :returns: Nodes by return code, firmwares durations and errors in
+              'firmwares'
+    """
+    groups = _flash_groups(api, plan, strip_elf)
+
+    def _flash(group: _FlashGroup) -> dict[str, Any]:
+        _, firmware, nodes = group
+        return _timed(
+            node_command, api, "flash", exp_id, nodes.urls(), firmware, retries=retries
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(groups)))) as pool:
+        results = pool.map(_flash, groups)
+        results = dict(zip((path for path, _, _ in groups), results))
+    return _merge_requests(results, "firmwares")
+
+
+def _flash_groups(
+    api: Any, plan: dict[str, list[str] | str], strip_elf: bool
+) -> list[_FlashGroup]:
+    """Return plan firmwares paths, loaded once, with their nodes.
+
+    Nodes of firmwares with the same content are grouped in one request.
+    :raises ValueError: when a node is selected for several firmwares
+    """
+    groups: dict[str, _FlashGroup] = {}
+    selected = intervals.NodesSet()
+    for path, selection in plan.items():
+        nodes = _plan_nodes(path, selection)
+        if selected & nodes:
+            raise ValueError(
+                f"Nodes selected for several firmwares: {(selected & nodes)!r}"
+            )
+        selected |= nodes
+
+        firmware = helpers.FileRef(path)
+        if strip_elf:
+            firmware = _binary_firmware(api, firmware)
+        firmware.load()
+        group = groups.get(firmware.md5, (path, firmware, nodes))
+        groups[firmware.md5] = (group[0], group[1], group[2] | nodes)
+    return list(groups.values())
+
+
+def _plan_nodes(path: str, selection: list[str] | str) -> intervals.NodesSet:
+    """Return `path` firmware selected nodes.
+
+    >>> _plan_nodes("fw.elf", ["grenoble,m3,1-3", "m3-5.grenoble.iot-lab.info"])
+    NodesSet(['grenoble,m3,1-3+5'])
+    """
+    nodes = intervals.NodesSet()
+    for nodes_str in [selection] if isinstance(selection, str) else selection:
+        if "," in nodes_str:
+            site, archi, ids = nodes_str.split(",")  # ValueError if invalid
+            nodes |= intervals.NodesSet.from_info(site, archi, ids)
+        else:
+            nodes |= intervals.NodesSet.from_urls([nodes_str])
+    if not nodes:
+        raise ValueError(f"No nodes selected for {path!r}")
+    return nodes
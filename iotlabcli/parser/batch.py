@@ -0,0 +1,215 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Batch parser"""
+
+import argparse
+import contextlib
+import functools
+import importlib
+import io
+import shlex
+import sys
+from argparse import ArgumentParser, RawTextHelpFormatter
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.error import HTTPError
+
+from iotlabcli import auth, helpers
+from iotlabcli.parser import common
+
+BATCH_PARSER = """
+
+iotlab batch runs iotlab commands read from a file, one per line,
+in a single process. Commands share the connections to the server,
+the sites and nodes lists and the current experiment lookup.
+
+Results are printed as JSON lines, one per command, in the file order.
+
+"""
+
+BATCH_EPILOG = """
+
+Commands file example:
+    # empty lines and comments are ignored
+    node --reset -l grenoble,m3,1-4
+    iotlab node --sensor-config -l grenoble,m3,1-4 -p consumption
+    iotlab-robot status
+
+Examples:
+    * run commands from a file
+        $ iotlab batch commands.txt
+    * run commands from standard input, four at a time
+        $ generate_commands | iotlab batch --parallel 4
+    * only print failed commands
+        $ iotlab batch commands.txt --jmespath 'error && @'
+
+Commands run in parallel should not depend on each other.
+Commands cache options are ignored, use the batch ones.
+"""
+
+# Commands allowed in batch files
+COMMANDS = ("experiment", "node", "profile", "robot", "status")
+
+
+def parse_options() -> ArgumentParser:
+    """Handle iotlab-batch command-line options with argparse"""
+    parent_parser = common.base_parser()
+    parser = argparse.ArgumentParser(
+        description=BATCH_PARSER,
+        parents=[parent_parser],
+        formatter_class=RawTextHelpFormatter,
+        epilog=BATCH_EPILOG,
+    )
+    parser.add_argument(
+        "commands_file",
+        nargs="?",
+        type=argparse.FileType("r"),
+        default="-",
+        help="commands file, default to standard input",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        metavar="N",
+        help="number of commands run at the same time (%(default)s)",
+    )
+    return parser
+
+
+@functools.cache
+def command_parser(
+    name: str,
+) -> tuple[ArgumentParser, Callable[[argparse.Namespace], Any]]:
+    """Return `name` command parser and its parse and run function."""
+    if name not in COMMANDS:
+        raise ValueError(f"Unsupported command {name!r}, not in {COMMANDS}")
+    module = importlib.import_module(f"iotlabcli.parser.{name}")
+    argv, sys.argv = sys.argv, [f"iotlab {name}"]  # parsers default 'prog'
+    try:
+        parser = module.parse_options()
+    finally:
+        sys.argv = argv
+    return parser, getattr(module, f"{name}_parse_and_run")
+
+
+def split_command(line: str) -> list[str]:
+    """Return `line` command arguments, without 'iotlab' prefix.
+
+    >>> split_command('iotlab node --reset -l grenoble,m3,1  # comment')
+    ['node', '--reset', '-l', 'grenoble,m3,1']
+    >>> split_command('iotlab-robot status')
+    ['robot', 'status']
+    >>> split_command('# comment')
+    []
+    """
+    args = shlex.split(line, comments=True)
+    if args[:1] == ["iotlab"]:
+        args = args[1:]
+    elif args and args[0].startswith("iotlab-"):
+        args[0] = args[0].removeprefix("iotlab-")
+    return args
+
+
+class Batch:
+    """Run commands lines with shared credentials."""
+
+    def __init__(
+        self, username: str | None, password: str | None, parallel: int = 1
+    ) -> None:
+        self.credentials = auth.get_user_credentials(username, password)
+        self.parallel = parallel
+
+    def parse(self, line: str) -> tuple[str, Any]:
+        """Return `line` command name and parsed options.
+
+        Usage errors are returned as a ValueError.
+        """
+        output = io.StringIO()
+        try:
+            args = split_command(line) or [""]
+            parser, _ = command_parser(args[0])
+            with contextlib.redirect_stderr(output), contextlib.redirect_stdout(output):
+                opts = parser.parse_args(args[1:])
+        except SystemExit:
+            return "", ValueError(output.getvalue().strip())
+        except ValueError as err:
+            return "", err
+        if opts.username is None:
+            opts.username, opts.password = self.credentials
+        return args[0], opts
+
+    def run(self, line_number: int, line: str, name: str, opts: Any) -> dict[str, Any]:
+        """Run command `line` and return its result or error."""
+        result = {"line": line_number, "command": line.strip()}
+        try:
+            if isinstance(opts, Exception):
+                raise opts
+            _, function = command_parser(name)
+            result["result"] = _run_command(function, opts)
+        except (HTTPError, IOError, ValueError, RuntimeError) as err:
+            result["error"] = str(err)
+        return result
+
+    def run_lines(self, lines: list[str]) -> Iterator[dict[str, Any]]:
+        """Run `lines` commands in parallel, yield results in lines order."""
+        parsed = [
+            (num, line, *self.parse(line))
+            for num, line in enumerate(lines, 1)
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+        with (
+            helpers.shared_current_experiment(),
+            ThreadPoolExecutor(max_workers=self.parallel) as pool,
+        ):
+            yield from pool.map(lambda command: self.run(*command), parsed)
+
+
+def _run_command(function: Callable[[argparse.Namespace], Any], opts: Any) -> Any:
+    result = function(opts)
+    if isinstance(result, Iterator):
+        result = list(result)
+    if opts.jmespath is not None:
+        result = opts.jmespath.search(result)
+    return result
+
+
+def batch_parse_and_run(opts: argparse.Namespace) -> Iterator[dict[str, Any]]:
+    """Parse namespace 'opts' object and execute requested commands"""
+    batch = Batch(opts.username, opts.password, opts.parallel)
+    with opts.commands_file as commands_file:
+        lines = commands_file.readlines()
+
+    failed = 0
+    for result in batch.run_lines(lines):
+        failed += "error" in result
+        yield result
+    if failed:
+        raise RuntimeError(f"{failed} commands failed")
+
+
+def main(args: list[str] | None = None) -> None:
+    """Main command-line execution loop." """
+    args = args or sys.argv[1:]
+    parser = parse_options()
+    common.main_cli(batch_parse_and_run, parser, args)
@@ -27,7 +27,7 @@ import errno
 import sys
 from argparse import ArgumentParser
 from collections import OrderedDict
-from collections.abc import Callable, Generator
+from collections.abc import Callable, Generator, Iterator
 from typing import Any
 
 # pylint: disable=wrong-import-order
@@ -41,9 +41,9 @@ except ImportError:  # pragma: no cover
 import jmespath
 
 import iotlabcli
-from iotlabcli import helpers, rest
+from iotlabcli import cache, helpers, intervals, rest
 
-DOMAIN_DNS = "iot-lab.info"
+DOMAIN_DNS = intervals.DOMAIN_DNS
 
 
 def base_parser(user_required: bool = False) -> ArgumentParser:
@@ -53,6 +53,7 @@ def base_parser(user_required: bool = False) -> ArgumentParser:
     add_auth_arguments(parser, user_required)
     add_version(parser)
     add_output_formatter(parser)
+    add_cache_arguments(parser)
 
     return parser
 
@@ -88,6 +89,39 @@ def add_output_formatter(parser: ArgumentParser) -> None:
     )
 
 
+def add_cache_arguments(parser: ArgumentParser) -> None:
+    """Add '--no-cache' and '--refresh' arguments"""
+    group = parser.add_argument_group("Cache")
+    group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't use cached sites, nodes, circuits, profiles lists "
+        "and current experiment",
+    )
+    group.add_argument(
+        "--refresh",
+        action="store_true",
+        help="refresh cached sites, nodes, circuits, profiles lists "
+        "and current experiment",
+    )
+
+
+def configure_disk_cache(args: list[str]) -> None:
+    """Configure `rest.Api.disk_cache` from cache arguments in `args`.
+
+    It is done before parsing the command line, as parsing some
+    arguments, like nodes lists, already requests the server.
+    """
+    cache_parser = argparse.ArgumentParser(add_help=False)
+    add_cache_arguments(cache_parser)
+    opts, _ = cache_parser.parse_known_args(args)
+
+    if opts.no_cache:
+        rest.Api.disk_cache = None
+    else:
+        rest.Api.disk_cache = cache.DiskCache(refresh=opts.refresh)
+
+
 def add_expid_arg(parser: ArgumentParser, required: bool = False) -> None:
     """Add '-i' / '--id' for 'experiment_id' option."""
     parser.add_argument(
@@ -146,12 +180,39 @@ def print_result(  # noqa: C901
     jmespath_expr: Any = None,
     format_function: Callable[[Any], str] | None = None,
 ) -> None:
-    """Print result vule"""
+    """Print result vule
+
+    Iterators are printed as they are consumed, one item per line,
+    formatted as JSON lines by default.
+    """
+    if isinstance(result, Iterator):
+        format_function = format_function or helpers.json_line
+        lines = (_format_result(i, jmespath_expr, format_function) for i in result)
+    else:
+        lines = iter([_format_result(result, jmespath_expr, format_function)])
+
+    try:
+        for line in lines:
+            if line is not None:
+                print(line)
+                sys.stdout.flush()  # show iterators items as they come
+    except IOError as err:
+        # Ignore BrokenPipe
+        if err.errno != errno.EPIPE:
+            raise err
+
+
+def _format_result(
+    result: Any,
+    jmespath_expr: Any = None,
+    format_function: Callable[[Any], str] | None = None,
+) -> str | None:
+    """Format result value, None if nothing was returned"""
     format_function = format_function or helpers.json_dumps
 
     # early bail out if nothing was returned
     if result is None:
-        return
+        return None
 
     # Query using jmespath
     if jmespath_expr is not None:
@@ -159,14 +220,7 @@ def print_result(  # noqa: C901
         result = jmespath_expr.search(result, keep_dict_order)
 
     # Format output
-    formatted = format_function(result)
-
-    try:
-        print(formatted)
-    except IOError as err:
-        # Ignore BrokenPipe
-        if err.errno != errno.EPIPE:
-            raise err
+    return format_function(result)
 
 
 @contextlib.contextmanager
@@ -193,10 +247,14 @@ def main_cli(  # noqa: C901
 ) -> None:
     """Main command-line execution."""
     args = args or sys.argv[1:]
+    configure_disk_cache(args)
     try:
         with catch_missing_auth_cli():
             parser_opts = parser.parse_args(args)
             result = function(parser_opts)
+            # iterators are only run while printing their results
+            print_result(result, parser_opts.jmespath, parser_opts.format)
+        return
     except HTTPError as err:  # should be first as it's an IOError
         print(err, file=sys.stderr)
 
@@ -207,9 +265,6 @@ def main_cli(  # noqa: C901
 
     except KeyboardInterrupt:  # pragma: no cover
         print("\nStopped.", file=sys.stderr)
-    else:
-        print_result(result, parser_opts.jmespath, parser_opts.format)
-        return
     sys.exit(1)
 
 
@@ -263,10 +318,8 @@ def nodes_list_from_info(site: str, archi: str, nodes_str: str) -> list[str]:
     ValueError: Invalid nodes list: a-b ([0-9+-])
     """
 
-    nodes_list = nodes_id_list(archi, nodes_str)
-    fmt = f"%s.{site}.{DOMAIN_DNS}"
-    nodes_url_list = [fmt % node for node in nodes_list]
-    return nodes_url_list
+    nodes = intervals.NodesSet.from_info(site, archi, nodes_str)
+    return nodes.urls(DOMAIN_DNS)
 
 
 def nodes_id_list(archi: str, nodes_list: str) -> list[str]:
@@ -274,7 +327,7 @@ def nodes_id_list(archi: str, nodes_list: str) -> list[str]:
     to a regular nodes list
     """
 
-    nodes_num_list = expand_short_nodes_list(nodes_list)
+    nodes_num_list = intervals.IntervalSet.from_short(nodes_list)
 
     node_fmt = f"{archi}-%u"
     nodes = [node_fmt % num for num in nodes_num_list]
@@ -282,30 +335,8 @@ def nodes_id_list(archi: str, nodes_list: str) -> list[str]:
     return nodes
 
 
-def _expand_minus_str(minus_nodes_str: str) -> list[int] | range:
-    """Expand a '1-5' or '6' string to a list on integer
-    :raises: ValueError on invalid values
-    """
-    minus_node = minus_nodes_str.split("-")
-    res = None
-    if len(minus_node) == 1:
-        # ['6']
-        res = [int(minus_node[0])]
-    else:
-        # ['1', '4'] or ['7', '8']
-        first, last = minus_node
-        nodes_range = range(int(first), int(last) + 1)
-        # first >= last
-        if len(nodes_range) <= 1:
-            raise ValueError
-
-        # Add nodes range
-        res = nodes_range
-    return res
-
-
 def expand_short_nodes_list(nodes_str: str) -> list[int]:
-    """Expand short nodes_list '1-5+6+8-12' to a regular nodes list
+    """Expand short nodes_list '1-5+6+8-12' to a sorted nodes list
 
     >>> expand_short_nodes_list('1-4+6+7-8')
     [1, 2, 3, 4, 6, 7, 8]
@@ -326,18 +357,7 @@ def expand_short_nodes_list(nodes_str: str) -> list[int]:
     Traceback (most recent call last):
     ValueError: Invalid nodes list: a-b ([0-9+-])
     """
-
-    try:
-        # '1-4+6+8-8'
-        nodes_ll = [
-            _expand_minus_str(minus_nodes_str)
-            for minus_nodes_str in nodes_str.split("+")
-        ]
-        # [[1, 2, 3], [6], [12]]
-        return helpers.flatten_list_list(nodes_ll)
-    except ValueError:
-        # invalid: 6-3 or 6-7-8 or non int values
-        raise ValueError(f"Invalid nodes list: {nodes_str} ([0-9+-])")
+    return list(intervals.IntervalSet.from_short(nodes_str))
 
 
 def add_nodes_selection_list(parser: ArgumentParser) -> None:
@@ -372,26 +392,35 @@ def list_nodes(
 
     if nodes_ll is not None:
         # flatten lists into one
-        nodes = helpers.flatten_list_list(nodes_ll)
+        return helpers.sorted_nodes(helpers.flatten_list_list(nodes_ll))
 
-    elif excl_nodes_ll is not None:
+    if excl_nodes_ll is not None:
         # flatten lists into one
-        excl_nodes = set(helpers.flatten_list_list(excl_nodes_ll))
+        return _exclude_nodes(api, exp_id, helpers.flatten_list_list(excl_nodes_ll))
 
-        # remove exclude nodes from experiment nodes
-        exp_nodes = set(_get_experiment_nodes_list(api, exp_id))
-        nodes = list(exp_nodes - excl_nodes)
-    else:
-        nodes = []  # all the nodes
+    return []  # all the nodes
 
-    return sorted(nodes, key=helpers.node_url_sort_key)
 
+def _exclude_nodes(api: Any, exp_id: int, excluded: list[str]) -> list[str]:
+    """Return experiment nodes without `excluded` ones.
 
-def _get_experiment_nodes_list(api: Any, exp_id: int) -> list[str]:
-    """Get the nodes_list for given experiment"""
-    exp_nodes = api.get_experiment_info(exp_id, "nodes")
-    nodes = [res["network_address"] for res in exp_nodes["items"]]
-    return nodes
+    Difference is computed on nodes ids ranges, returns [] for all the
+    experiment nodes when none of them is excluded.
+    """
+    exp_nodes = _get_experiment_nodes_set(api, exp_id)
+    excl_nodes = intervals.NodesSet.from_urls(excluded)
+    if not exp_nodes & excl_nodes:
+        return []
+    nodes = exp_nodes - excl_nodes
+    if not nodes:
+        raise ValueError("All the experiment nodes are excluded")
+    return nodes.urls(DOMAIN_DNS)
+
+
+def _get_experiment_nodes_set(api: Any, exp_id: int) -> intervals.NodesSet:
+    """Get the nodes ids ranges for given experiment"""
+    nodes_ids = api.get_experiment_info(exp_id, "nodes_ids")
+    return intervals.NodesSet.from_nodes_ids(nodes_ids["items"])
 
 
 def nodes_list_from_str(nodes_list_str: str) -> list[str]:
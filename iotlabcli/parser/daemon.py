@@ -0,0 +1,151 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Daemon parser"""
+
+import argparse
+import json
+import sys
+import time
+from argparse import ArgumentParser, RawTextHelpFormatter
+from typing import Any
+
+from iotlabcli import cache, daemon, rest
+from iotlabcli.parser import main as main_parser
+
+DAEMON_PARSER = """
+
+iotlab-daemon runs a background process running iotlab commands.
+It keeps modules imported, connections to the server open and caches
+in memory, to reduce the latency of each command.
+
+When it is running, 'iotlab-experiment', 'iotlab-node', 'iotlab-profile',
+'iotlab-robot' and 'iotlab-status' commands are run by the daemon, except
+blocking ones: 'experiment wait', 'node --retry' and 'node --flash-plan'.
+
+"""
+
+DAEMON_EPILOG = """
+
+Examples:
+    * start the daemon in background
+        $ iotlab daemon start &
+    * check it is running
+        $ iotlab daemon status
+    * stop it
+        $ iotlab daemon stop
+
+Commands are run one at a time by the daemon.
+While it runs a command, other commands are run in their own process,
+as are commands run with other IOTLAB_* variables, HOME or api url file
+than the daemon. Restart it after upgrading iotlabcli.
+
+"""
+
+
+def parse_options() -> ArgumentParser:
+    """Handle iotlab daemon command-line options with argparse"""
+    parser = argparse.ArgumentParser(
+        description=DAEMON_PARSER,
+        formatter_class=RawTextHelpFormatter,
+        epilog=DAEMON_EPILOG,
+    )
+    parser.add_argument(
+        "command",
+        choices=("start", "stop", "status"),
+        help="start the daemon in foreground, stop it or get its status",
+    )
+    parser.add_argument(
+        "--socket",
+        default=daemon.socket_path(),
+        help="unix socket path, default from IOTLAB_DAEMON_SOCKET (%(default)s)",
+    )
+    return parser
+
+
+# Time to live in seconds of the in-memory sites list, as on disk
+MEMORY_CACHE_TTL = cache.ENDPOINTS_TTL["sites"]
+
+
+class CommandRunner:  # pylint:disable=too-few-public-methods
+    """Run commands main functions in the daemon process.
+
+    The Api in-memory cache is emptied every `ttl` seconds, as it is
+    only meant for one command process.
+    """
+
+    def __init__(self, ttl: float = MEMORY_CACHE_TTL) -> None:
+        self.ttl = ttl
+        self.cleared = time.monotonic()
+
+    def __call__(self, command: str, args: list[str]) -> Any:
+        if time.monotonic() - self.cleared > self.ttl:
+            rest.Api._cache.clear()  # pylint:disable=protected-access
+            self.cleared = time.monotonic()
+        return run_command(command, args)
+
+
+def run_command(command: str, args: list[str]) -> Any:
+    """Run `command` main function in the daemon process."""
+    return main_parser.load_entry_point(main_parser.COMMANDS[command])(args)
+
+
+def start(path: str) -> None:
+    """Run the daemon until stopped."""
+    for command in main_parser.FORWARDED:  # import commands modules once
+        main_parser.load_entry_point(main_parser.COMMANDS[command])
+    server = daemon.Daemon(CommandRunner(), path)
+    print(f"iotlab daemon listening on {path}", file=sys.stderr)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        print("\nStopped.", file=sys.stderr)
+
+
+def request(message: dict[str, Any], path: str) -> Any:
+    """Send control `message` to the daemon and return its reply."""
+    replies = daemon.request(message, path)
+    if replies is None:
+        raise RuntimeError(f"iotlab daemon not running on {path}")
+    reply = {key: value for reply in replies for key, value in reply.items()}
+    reply["socket"] = path
+    return reply
+
+
+def daemon_parse_and_run(opts: argparse.Namespace) -> Any:
+    """Parse namespace 'opts' object and execute requested command"""
+    if opts.command == "start":
+        return start(opts.socket)
+    message = daemon.STOP if opts.command == "stop" else daemon.STATUS
+    return request(message, opts.socket)
+
+
+def main(args: list[str] | None = None) -> None:
+    """Main command-line execution loop." """
+    args = args or sys.argv[1:]
+    opts = parse_options().parse_args(args)
+    try:
+        result = daemon_parse_and_run(opts)
+    except RuntimeError as err:
+        print(err, file=sys.stderr)
+        sys.exit(1)
+    if result is not None:
+        print(json.dumps(result, indent=4))
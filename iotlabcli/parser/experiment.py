@@ -21,7 +21,10 @@
 
 """Experiment parser"""
 
+# pylint: disable=too-many-lines
+
 import argparse
+import json
 import sys
 import time
 from argparse import ArgumentParser, RawTextHelpFormatter
@@ -168,6 +171,21 @@ def parse_options() -> ArgumentParser:
 
     get_parser.add_argument("--state", help="experiment list state filter")
 
+    get_parser.add_argument(
+        "--all",
+        action="store_true",
+        default=False,
+        help="experiment list: stream all experiments as JSON lines,"
+        " fetched by pages of --limit (default 100), --offset is ignored",
+    )
+
+    get_parser.add_argument(
+        "--progress",
+        action="store_true",
+        default=False,
+        help="archive: print download progress on stderr",
+    )
+
     get_group.add_argument(
         "-e",
         "--experiments",
@@ -392,6 +410,24 @@ def parser_add_wait_subparser(
         action="store_true",
         help="Cancel experiment if timeout is reached",
     )
+    ids_group = wait_parser.add_mutually_exclusive_group()
+    ids_group.add_argument(
+        "--ids",
+        type=exp_ids_from_str,
+        help="wait for several experiments `ID1,ID2`, checked with one request",
+    )
+    ids_group.add_argument(
+        "--all-active",
+        action="store_true",
+        help="wait for all active experiments, checked with one request",
+    )
+    wait_parser.add_argument(
+        "--strategy",
+        choices=experiment.POLLING_STRATEGIES,
+        default="fixed",
+        help="Polling strategy: 'fixed' checks every --step, 'adaptive' checks"
+        " faster when launching and backs off from --step when waiting",
+    )
 
     return wait_parser
 
@@ -436,6 +472,15 @@ def parser_add_script_subparser(subparsers: Any) -> ArgumentParser:
     return _script_parser
 
 
+def exp_ids_from_str(exp_ids_str: str) -> list[int]:
+    """Return experiments ids list from comma separated string.
+
+    >>> exp_ids_from_str('123,124')
+    [123, 124]
+    """
+    return [int(exp_id) for exp_id in exp_ids_str.split(",")]
+
+
 def exp_infos_from_str(exp_str: str) -> tuple[Any, dict[str, str]]:
     """Extract nodes and associations."""
     try:
@@ -863,15 +908,37 @@ def get_experiment_parser(opts: argparse.Namespace) -> Any:
     api = rest.Api(user, passwd)
     # pylint:disable=no-else-return
     if opts.get_cmd == "experiment_list":
-        return experiment.get_experiments_list(api, opts.state, opts.limit, opts.offset)
+        return _get_experiments_list(api, opts)
     elif opts.get_cmd in ("start_date", "state"):
         return _get_experiment_attr(api, opts)
     elif opts.get_cmd == "experiments":
         return experiment.get_active_experiments(api, running_only=not opts.active)
     else:
-        exp_id = helpers.get_current_experiment(api, opts.experiment_id)
+        return _get_experiment(api, opts)
 
-        return experiment.get_experiment(api, exp_id, _deprecate_cmd(opts.get_cmd))
+
+def _get_experiments_list(api: Any, opts: argparse.Namespace) -> Any:
+    """Return the experiments list page, or an iterator over all of them"""
+    if opts.all:
+        page_size = opts.limit or experiment.PAGE_SIZE
+        return experiment.iter_experiments(api, opts.state, page_size)
+    return experiment.get_experiments_list(api, opts.state, opts.limit, opts.offset)
+
+
+def _get_experiment(api: Any, opts: argparse.Namespace) -> Any:
+    """Return experiment description or `opts.get_cmd` restricted values"""
+    exp_id = helpers.get_current_experiment(api, opts.experiment_id)
+    cmd = _deprecate_cmd(opts.get_cmd)
+    if opts.progress:
+        return experiment.get_experiment(api, exp_id, cmd, _print_progress)
+    return experiment.get_experiment(api, exp_id, cmd)
+
+
+def _print_progress(size: int, total: int | None) -> None:
+    """Print download progress on stderr, on a single line."""
+    done = f"{size}/{total}" if total else f"{size}"
+    end = "\n" if size == total else ""
+    print(f"\rDownloaded {done} bytes", end=end, file=sys.stderr, flush=True)
 
 
 def _deprecate_cmd(cmd: str) -> str:
@@ -937,16 +1004,64 @@ def wait_experiment_parser(opts: argparse.Namespace) -> Any:
 
     user, passwd = auth.get_user_credentials(opts.username, opts.password)
     api = rest.Api(user, passwd)
+    strategy = experiment.POLLING_STRATEGIES[opts.strategy](opts.step)
+
+    if opts.ids or opts.all_active:
+        return _wait_experiments(api, opts, strategy)
 
     exp_id = helpers.get_current_experiment(api, opts.experiment_id, running_only=False)
 
     sys.stderr.write(f"Waiting that experiment {exp_id} gets in state {opts.state}\n")
 
     return experiment.wait_experiment(
-        api, exp_id, opts.state, opts.step, opts.timeout, opts.cancel_on_timeout
+        api,
+        exp_id,
+        opts.state,
+        opts.step,
+        opts.timeout,
+        opts.cancel_on_timeout,
+        strategy,
     )
 
 
+def _wait_experiments(
+    api: Any, opts: argparse.Namespace, strategy: experiment.PollingStrategy
+) -> dict[str, list[int]]:
+    """Wait for `opts.ids` or all active experiments, return states summary
+
+    Like for one experiment, raise a RuntimeError carrying the summary
+    when some experiments timed out or stopped in a state not waited for.
+    """
+    exp_ids = opts.ids
+    if opts.all_active:
+        exps_by_states = helpers.exps_by_states_dict(api, helpers.ACTIVE_STATES)
+        exp_ids = [exp_id for ids in exps_by_states.values() for exp_id in ids]
+
+    sys.stderr.write(f"Waiting that experiments {exp_ids} get in state {opts.state}\n")
+
+    summary = experiment.wait_experiments(
+        api,
+        exp_ids,
+        opts.state,
+        opts.step,
+        opts.timeout,
+        opts.cancel_on_timeout,
+        strategy,
+        report=_report_experiment_state,
+    )
+    unexpected = experiment.unexpected_states(summary, opts.state)
+    if unexpected:
+        raise RuntimeError(
+            f"Experiments not in state {opts.state}: {unexpected}\n"
+            f"States: {json.dumps(summary, sort_keys=True)}"
+        )
+    return summary
+
+
+def _report_experiment_state(exp_id: int, state: str) -> None:
+    sys.stderr.write(f"Experiment {exp_id} in state {state}\n")
+
+
 def experiment_parse_and_run(opts: argparse.Namespace) -> Any:
     """Parse namespace 'opts' object and execute requested command
     Return result object
@@ -94,6 +94,12 @@ Examples:
       every second and timeout after 60 seconds
         $ iotlab-experiment -i 1234 --state Launching,Running --step 1 \
 --timeout 60
+
+    * wait for an experiment scheduled later without polling every 5 seconds
+        $ iotlab-experiment wait -i 1234 --strategy adaptive
+
+    * wait that several experiments get Running, with one request per check
+        $ iotlab-experiment wait --ids 1234,1235,1236
 """
 
 LOAD_EPILOG = """
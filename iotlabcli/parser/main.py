@@ -19,42 +19,116 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL license and that you accept its terms.
 
-"""Main parser."""
+"""Main parser.
 
+Subcommands modules, and other packages providing subcommands, are only
+imported when their subcommand is run.
+Subcommands are forwarded to the `iotlab daemon` when it is running.
+"""
+
+import functools
+import importlib
+import importlib.util
 import sys
 from argparse import ArgumentParser
+from collections.abc import Callable
 from typing import Any
 
-import iotlabcli.parser.auth
-import iotlabcli.parser.experiment
-import iotlabcli.parser.node
-import iotlabcli.parser.profile
-import iotlabcli.parser.robot
-import iotlabcli.parser.status
-
-# from aggregation-tools
-try:
-    import iotlabaggregator.serial
-    import iotlabaggregator.sniffer
-except (ImportError, TypeError):
-    # TypeError for aggregation-tools, not py3 compatible yet
-    iotlabaggregator = None  # pylint:disable=invalid-name
-
-# from ssh-cli-tools
-try:
-    import iotlabsshcli
-    import iotlabsshcli.parser.open_linux_parser
-except ImportError:
-    iotlabsshcli = None  # pylint:disable=invalid-name
-
-# from oml-plot-tools
-try:
-    import oml_plot_tools
-    import oml_plot_tools.consum
-    import oml_plot_tools.radio
-    import oml_plot_tools.traj
-except (ImportError, SyntaxError, TypeError):
-    oml_plot_tools = None  # pylint:disable=invalid-name
+from iotlabcli import daemon
+
+# Subcommands 'module:function' entry points
+COMMANDS = {
+    "auth": "iotlabcli.parser.auth:main",
+    "batch": "iotlabcli.parser.batch:main",
+    "daemon": "iotlabcli.parser.daemon:main",
+    "experiment": "iotlabcli.parser.experiment:main",
+    "node": "iotlabcli.parser.node:main",
+    "profile": "iotlabcli.parser.profile:main",
+    "robot": "iotlabcli.parser.robot:main",
+    "shell": "iotlabcli.parser.shell:main",
+    "status": "iotlabcli.parser.status:main",
+}
+
+# Subcommands run by the daemon when it is running
+FORWARDED = ("experiment", "node", "profile", "robot", "status")
+
+# Subcommands arguments that may block for long, run in their own process
+# to keep the daemon available
+BLOCKING = {"experiment": ("wait",), "node": ("--retry", "--flash-plan")}
+
+# Subcommands only available when their package is installed
+PLUGINS = {
+    # from aggregation-tools
+    "serial": ("iotlabaggregator", "iotlabaggregator.serial:main"),
+    "sniffer": ("iotlabaggregator", "iotlabaggregator.sniffer:main"),
+    # from oml-plot-tools
+    "plot": ("oml_plot_tools", "iotlabcli.parser.main:oml_plot"),
+    # from ssh-cli-tools
+    "ssh": ("iotlabsshcli", "iotlabsshcli.parser.open_linux_parser:main"),
+}
+
+OML_PLOT_COMMANDS = {
+    "consum": "oml_plot_tools.consum:main",
+    "radio": "oml_plot_tools.radio:main",
+    "traj": "oml_plot_tools.traj:main",
+}
+
+
+def plugin_installed(package: str) -> bool:
+    """Return if `package` is installed, without importing it."""
+    try:
+        return importlib.util.find_spec(package) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def load_entry_point(entry_point: str) -> Callable[[list[str]], Any]:
+    """Import and return 'module:function' `entry_point`."""
+    module, _, function = entry_point.partition(":")
+    return getattr(importlib.import_module(module), function)
+
+
+def lazy_commands(entry_points: dict[str, str]) -> dict[str, Callable[..., Any]]:
+    """Return commands functions importing `entry_points` when called."""
+
+    def _lazy(entry_point):
+        def _command(args):
+            return load_entry_point(entry_point)(args)
+
+        return _command
+
+    return {name: _lazy(entry_point) for name, entry_point in entry_points.items()}
+
+
+def forwardable(command: str, args: list[str]) -> bool:
+    """Return if `command` can be run by the daemon.
+
+    Commands given a username may ask the password on the terminal.
+    Blocking commands would keep the daemon busy.
+    """
+    user_opts = ("-u", "--user")
+    given_user = any(arg.startswith(user_opts) for arg in args)
+    blocking = BLOCKING.get(command, ())
+    blocks = any(arg.split("=")[0] in blocking for arg in args)
+    return command in FORWARDED and not given_user and not blocks
+
+
+def run_command(command: str, args: list[str] | None = None) -> Any:
+    """Run `command` subcommand, in the daemon if it is running."""
+    args = args or sys.argv[1:]
+    if forwardable(command, args):
+        code = daemon.forward(command, args)
+        if code is not None:
+            return code
+    return load_entry_point(COMMANDS[command])(args)
+
+
+# 'iotlab-<command>' entry points
+experiment_main = functools.partial(run_command, "experiment")
+node_main = functools.partial(run_command, "node")
+profile_main = functools.partial(run_command, "profile")
+robot_main = functools.partial(run_command, "robot")
+status_main = functools.partial(run_command, "status")
 
 
 def parse_subcommands(commands: dict[str, Any], args: list[str]) -> Any:
@@ -66,39 +140,26 @@ def parse_subcommands(commands: dict[str, Any], args: list[str]) -> Any:
 
     opts, _ = parser.parse_known_args(args[:1])
 
-    sys.argv[0] = f"iotlab {opts.command}"
+    sys.argv = [f"iotlab {opts.command}", *args[1:]]
     return commands[opts.command](args[1:])
 
 
 def oml_plot(args: list[str]) -> None:
     """'iotlab oml-plot' main function."""
-
-    commands = {
-        "consum": oml_plot_tools.consum.main,
-        "radio": oml_plot_tools.radio.main,
-        "traj": oml_plot_tools.traj.main,
-    }
-    parse_subcommands(commands, args)
+    parse_subcommands(lazy_commands(OML_PLOT_COMMANDS), args)
 
 
 def main(args: list[str] | None = None) -> Any:
     """'iotlab' main function."""
     args = args or sys.argv[1:]
 
+    entry_points = {}
+    for command, (package, entry_point) in PLUGINS.items():
+        if plugin_installed(package):
+            entry_points[command] = entry_point
+
     commands = {
-        "auth": iotlabcli.parser.auth.main,
-        "experiment": iotlabcli.parser.experiment.main,
-        "node": iotlabcli.parser.node.main,
-        "profile": iotlabcli.parser.profile.main,
-        "robot": iotlabcli.parser.robot.main,
-        "status": iotlabcli.parser.status.main,
+        command: functools.partial(run_command, command) for command in COMMANDS
     }
-    if iotlabaggregator:
-        commands["serial"] = iotlabaggregator.serial.main
-        commands["sniffer"] = iotlabaggregator.sniffer.main
-    if oml_plot_tools:
-        commands["plot"] = oml_plot
-    if iotlabsshcli:
-        commands["ssh"] = iotlabsshcli.parser.open_linux_parser.main
-
+    commands.update(lazy_commands(entry_points))
     return parse_subcommands(commands, args)
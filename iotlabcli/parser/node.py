@@ -22,6 +22,8 @@
 """Node parser"""
 
 import argparse
+import json
+import os
 import sys
 from argparse import ArgumentParser, RawTextHelpFormatter
 from typing import Any
@@ -51,6 +53,14 @@ Examples:
         $ iotlab-node --reset -l grenoble,wsn430,1-34+72
     * command with several experiments with state Running
         $ iotlab-node -i <expid> --reset
+    * flash each site nodes with a concurrent request
+        $ iotlab-node --flash /home/tp.hex --parallel-sites
+    * reset nodes, then up to 3 more times the ones that failed
+        $ iotlab-node --reset --retry 3
+    * flash different firmwares on nodes groups, paths relative to plan
+        $ iotlab-node --flash-plan plan.json
+    * upload an ELF firmware loadable content only, as a binary firmware
+        $ iotlab-node --flash /home/tp.elf --strip-elf
 
 """
 
@@ -110,6 +120,16 @@ def parse_options() -> ArgumentParser:
         default=None,
         help="flash firmware command with path file",
     )
+    cmd_group.add_argument(
+        "--flash-plan",
+        dest="flash_plan_path",
+        default=None,
+        help=(
+            "flash several firmwares from a JSON file mapping firmware paths "
+            "to nodes lists:\n"
+            '{"sink.elf": ["grenoble,m3,1"], "node.elf": ["grenoble,m3,2-10"]}'
+        ),
+    )
     cmd_group.add_argument(
         "--flash-idle",
         help="flash idle firmware",
@@ -168,6 +188,36 @@ def parse_options() -> ArgumentParser:
     # nodes list or exclude list
     common.add_nodes_selection_list(parser)
 
+    parser.add_argument(
+        "--parallel-sites",
+        type=int,
+        nargs="?",
+        const=iotlabcli.node.PARALLEL_SITES,
+        metavar="N",
+        help=(
+            "send one request per site, up to N concurrently "
+            f"(default {iotlabcli.node.PARALLEL_SITES})"
+        ),
+    )
+
+    parser.add_argument(
+        "--retry",
+        dest="retries",
+        type=int,
+        metavar="N",
+        help="run command again up to N times on nodes that failed",
+    )
+
+    parser.add_argument(
+        "--strip-elf",
+        action="store_true",
+        default=None,
+        help=(
+            "flash ELF firmwares loadable content only, converted locally "
+            "to a binary firmware"
+        ),
+    )
+
     return parser
 
 
@@ -185,9 +235,40 @@ def node_parse_and_run(opts: argparse.Namespace) -> Any:
         # opts.command has a real value
         command, cmd_opt = (opts.command, None)
 
+    if command == "flash-plan":
+        return _flash_plan(api, exp_id, cmd_opt, opts)
+
     nodes = common.list_nodes(api, exp_id, opts.nodes_list, opts.exclude_nodes_list)
 
-    return iotlabcli.node.node_command(api, command, exp_id, nodes, cmd_opt)
+    return iotlabcli.node.node_command(
+        api, command, exp_id, nodes, cmd_opt, **_node_command_options(opts)
+    )
+
+
+def _flash_plan(
+    api: Any, exp_id: int, plan_path: str, opts: argparse.Namespace
+) -> dict[str, Any]:
+    """Run flash plan, firmwares relative paths are relative to the plan."""
+    if opts.nodes_list or opts.exclude_nodes_list:
+        raise ValueError("Nodes are selected in flash plan, not with -l/-e")
+    if opts.parallel_sites is not None:
+        raise ValueError("--parallel-sites not supported with --flash-plan")
+    plan_dir = os.path.dirname(plan_path)
+    plan = {
+        os.path.join(plan_dir, os.path.expanduser(path)): selection
+        for path, selection in json.loads(helpers.read_file(plan_path)).items()
+    }
+    return iotlabcli.node.flash_plan(api, exp_id, plan, **_node_command_options(opts))
+
+
+def _node_command_options(opts: argparse.Namespace) -> dict[str, Any]:
+    """Return `node_command` options given on command line."""
+    options = {
+        "parallel_sites": opts.parallel_sites,
+        "retries": opts.retries,
+        "strip_elf": opts.strip_elf,
+    }
+    return {name: value for name, value in options.items() if value is not None}
 
 
 def _deprecate_cmd(opts: argparse.Namespace) -> None:
@@ -236,6 +317,7 @@ def _node_parse_command_and_opt(**opts_dict: Any) -> tuple[str, str]:
     # Mapping between 'command' and argparse option name
     commands_arguments = {
         "flash": "firmware_path",
+        "flash-plan": "flash_plan_path",
         "profile": "profile_name",
         "profile-load": "profile_path",
     }
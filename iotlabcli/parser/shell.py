@@ -0,0 +1,203 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Interactive shell parser"""
+
+import argparse
+import cmd
+import contextlib
+import sys
+from argparse import ArgumentParser, RawTextHelpFormatter
+from typing import Any
+from urllib.error import HTTPError
+
+from iotlabcli import helpers, rest
+from iotlabcli.parser import batch, common
+
+SHELL_PARSER = """
+
+iotlab shell runs iotlab commands interactively in a single process.
+Commands share the connections to the server, the credentials, the
+sites and nodes lists and the current experiment lookup.
+
+"""
+
+SHELL_EPILOG = """
+
+Example session:
+    iotlab> node --reset -l grenoble,m3,1-4
+    iotlab> experiment get -p --jmespath nodes
+    iotlab> exit
+
+Use 'help <command>' for commands help, and <TAB> to complete commands,
+options and nodes lists.
+"""
+
+# Options followed by a nodes list
+NODES_LIST_OPTIONS = ("-l", "--list", "-e", "--exclude")
+
+
+def parse_options() -> ArgumentParser:
+    """Handle iotlab shell command-line options with argparse"""
+    parser = argparse.ArgumentParser(
+        description=SHELL_PARSER,
+        parents=[common.base_parser()],
+        formatter_class=RawTextHelpFormatter,
+        epilog=SHELL_EPILOG,
+    )
+    return parser
+
+
+class Shell(cmd.Cmd):
+    """Interactive shell running iotlab commands."""
+
+    intro = "IoT-LAB shell, type 'help' for help, 'exit' to quit."
+    prompt = "iotlab> "
+
+    def __init__(self, username: str | None, password: str | None) -> None:
+        super().__init__()
+        self.batch = batch.Batch(username, password)
+        self.commands = 0
+        self._nodes_lists: list[str] | None = None
+
+    def preloop(self) -> None:
+        # nodes lists contain ',' and '-', only complete whole words
+        with contextlib.suppress(ImportError):
+            import readline  # pylint:disable=import-outside-toplevel
+
+            readline.set_completer_delims(" \t\n")
+
+    def default(self, line: str) -> None:
+        """Run iotlab command `line` and print its result."""
+        self.commands += 1
+        result = self.batch.run(self.commands, line, *self.batch.parse(line))
+        if "error" in result:
+            print(result["error"], file=sys.stderr)
+        else:
+            common.print_result(result["result"])
+
+    def emptyline(self) -> bool:
+        """Do not repeat the last command."""
+        return False
+
+    def do_help(self, arg: str) -> None:
+        """List commands, or print 'help <command>' help."""
+        if arg in batch.COMMANDS:
+            parser, _ = batch.command_parser(arg)
+            parser.print_help()
+        else:
+            print(f"Commands: {', '.join(batch.COMMANDS)}, help and exit")
+
+    def do_exit(self, _arg: str) -> bool:
+        """Exit the shell."""
+        return True
+
+    do_quit = do_exit
+
+    def do_EOF(self, _arg: str) -> bool:  # pylint:disable=invalid-name
+        """Exit the shell on end of file (Ctrl-D)."""
+        print()
+        return True
+
+    def completenames(self, text: str, *ignored: Any) -> list[str]:
+        names = (*batch.COMMANDS, "help", "exit")
+        return [name for name in names if name.startswith(text)]
+
+    def complete_help(self, *args: Any) -> list[str]:
+        """Complete commands names."""
+        return [name for name in batch.COMMANDS if name.startswith(args[0])]
+
+    def completedefault(self, *ignored: Any) -> list[str]:
+        """Complete command options, or nodes list after a nodes option."""
+        text, line, begidx, _ = ignored
+        args = line[:begidx].split()
+        if args[-1] in NODES_LIST_OPTIONS:
+            candidates = self.nodes_lists()
+        else:
+            candidates = command_options(args)
+        return [candidate for candidate in candidates if candidate.startswith(text)]
+
+    def nodes_lists(self) -> list[str]:
+        """Return 'site,archi,' nodes lists prefixes from testbed nodes.
+
+        Nodes are only requested once.
+        """
+        if self._nodes_lists is None:
+            try:
+                nodes = rest.Api(*self.batch.credentials).get_nodes()["items"]
+            except (HTTPError, IOError):
+                return []  # retry on next completion
+            self._nodes_lists = sorted({nodes_list_prefix(node) for node in nodes})
+        return self._nodes_lists
+
+
+def nodes_list_prefix(node: dict[str, Any]) -> str:
+    """Return `node` nodes list 'site,archi,' prefix.
+
+    >>> nodes_list_prefix({'network_address': 'm3-1.grenoble.iot-lab.info',
+    ...                    'site': 'grenoble'})
+    'grenoble,m3,'
+    >>> nodes_list_prefix({'network_address': 'nrf52dk-3.saclay.iot-lab.info',
+    ...                    'site': 'saclay'})
+    'saclay,nrf52dk,'
+    """
+    archi = node["network_address"].split(".")[0].rsplit("-", 1)[0]
+    return f"{node['site']},{archi},"
+
+
+def command_options(args: list[str]) -> list[str]:
+    """Return options and subcommands of the `args` command parser."""
+    try:
+        parser, _ = batch.command_parser(args[0])
+    except ValueError:
+        return []
+    # pylint:disable=protected-access
+    subparsers = [
+        action
+        for action in parser._actions
+        if isinstance(action, argparse._SubParsersAction)
+    ]
+    for action in subparsers:
+        subcommand = next((arg for arg in args if arg in action.choices), None)
+        if subcommand is None:
+            return list(action.choices)
+        parser = action.choices[subcommand]
+    return [option for action in parser._actions for option in action.option_strings]
+
+
+def shell_parse_and_run(opts: argparse.Namespace) -> None:
+    """Parse namespace 'opts' object and run the shell"""
+    shell = Shell(opts.username, opts.password)
+    with helpers.shared_current_experiment():
+        while True:
+            try:
+                shell.cmdloop()
+                return
+            except KeyboardInterrupt:
+                print("^C")
+                shell.intro = ""
+
+
+def main(args: list[str] | None = None) -> None:
+    """Main command-line execution loop." """
+    args = args or sys.argv[1:]
+    parser = parse_options()
+    common.main_cli(shell_parse_and_run, parser, args)
@@ -28,13 +28,25 @@ first parameter to the function.
 
 """
 
+import contextlib
+import os
+import random
 import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from http.cookiejar import DefaultCookiePolicy
 from typing import Any
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3 import filepost
+from urllib3.fields import RequestField
 
-from iotlabcli import helpers
+from iotlabcli import cache, helpers
 
 # pylint: disable=import-error,no-name-in-module
 # pylint: disable=wrong-import-order
@@ -49,24 +61,252 @@ except ImportError:  # pragma: no cover
     from urlparse import urljoin
 
 
-try:  # pragma: no cover
-    # With newer versions of requests, old python version may
-    # raise an InsecurePlatformWarning
-    #   https://urllib3.readthedocs.org/en/latest/\
-    #       security.html#insecureplatformwarning
+def _inject_pyopenssl() -> None:
+    """Use pyopenssl TLS backend in urllib3 when installed.
+
+    Done when creating sessions and not on import, as it is costly.
+    """
+    try:  # pragma: no cover
+        # With newer versions of requests, old python version may
+        # raise an InsecurePlatformWarning
+        #   https://urllib3.readthedocs.org/en/latest/\
+        #       security.html#insecureplatformwarning
+
+        # It can be fixed by installing pyopenssl support as described here
+        #   https://urllib3.readthedocs.org/en/latest/\
+        #       security.html#openssl-pyopenssl
+        #
+        # Dependencies can be installed with
+        #     pip install iotlabcli[secure]
+
+        import urllib3.contrib.pyopenssl  # pylint: disable=import-outside-toplevel
+
+        urllib3.contrib.pyopenssl.inject_into_urllib3()
+    except ImportError:
+        pass
+
+
+# Number of keep-alive connections kept per host
+POOL_SIZE = 10
+
+# Large inventory endpoints whose last 'get' entries are kept in memory
+# for conditional requests, and the maximum number of entries kept
+VALIDATED_ENDPOINTS = ("nodes", "nodes/ids", "sites/details")
+VALIDATED_SIZE = 16
+
+# Suffix of the file storing the validator of a partial download content
+PART_VALIDATOR = ".validator"
+
+
+class TransportError(RuntimeError):
+    """Server could not be reached, or did not answer in time.
+
+    A RuntimeError with `sys.exc_info()` as argument, like other request
+    errors, so they are handled the same way.
+    """
+
+
+def new_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """Return a keep-alive session with a `pool_size` connections pool.
+
+    Cookies are not stored, so requests stay independent from each other
+    as when using `requests.request`.
+    """
+    _inject_pyopenssl()
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@dataclass
+class RetryPolicy:  # pylint:disable=too-many-instance-attributes
+    """Timeouts and retries of transient errors for Api requests.
+
+    Only `methods` requests are retried, POST requests are not by default
+    as they may not be idempotent, add 'post' to `methods` to opt in.
+
+    :param connect_timeout: seconds to wait for the connection, None for ever
+    :param read_timeout: seconds to wait for server data of retried
+        `methods` requests, None for ever
+    :param unretried_read_timeout: seconds to wait for server data of other
+        requests, like node commands that may run long on large experiments,
+        None for ever
+    :param retries: number of retries after the first attempt
+    :param backoff: delay before the first retry, doubled for each retry
+    :param backoff_max: maximum delay between two attempts
+    :param jitter: randomize each delay between 0 and its computed value
+    :param status_codes: transient HTTP status codes that are retried
+    :param methods: requests methods that are retried
+    :param hook: called after each request as
+        `hook(method, url, attempts, elapsed_seconds)`
+    """
+
+    connect_timeout: float | None = 10.0
+    read_timeout: float | None = 300.0
+    unretried_read_timeout: float | None = None
+    retries: int = 3
+    backoff: float = 0.5
+    backoff_max: float = 30.0
+    jitter: bool = True
+    status_codes: tuple[int, ...] = (502, 503, 504)
+    methods: tuple[str, ...] = ("get",)
+    hook: Callable[[str, str, int, float], None] | None = None
+
+    def timeout(self, method: str) -> tuple[float | None, float | None]:
+        """requests (connect, read) timeout of `method` requests.
+
+        >>> RetryPolicy().timeout("get"), RetryPolicy().timeout("post")
+        ((10.0, 300.0), (10.0, None))
+        """
+        if method in self.methods:
+            return self.connect_timeout, self.read_timeout
+        return self.connect_timeout, self.unretried_read_timeout
+
+    def can_retry(self, method: str, attempt: int) -> bool:
+        """Return if `method` request can be retried after `attempt`."""
+        return method in self.methods and attempt <= self.retries
+
+    def delay(self, attempt: int) -> float:
+        """Delay before retrying after `attempt`.
+
+        >>> policy = RetryPolicy(backoff=1, backoff_max=5, jitter=False)
+        >>> [policy.delay(attempt) for attempt in range(1, 5)]
+        [1, 2, 4, 5]
+        """
+        delay = min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def report(self, method: str, url: str, attempts: int, elapsed: float) -> None:
+        """Report request `attempts` and `elapsed` time to `hook`."""
+        if self.hook is not None:
+            self.hook(method, url, attempts, elapsed)
+
+
+class MultipartBody:
+    """multipart/form-data body streamed from `files` values.
+
+    Encoded as `requests` would encode `files`, but FileRef values are read
+    by chunks while sending. The body can be iterated again on retries.
+    """
 
-    # It can be fixed by installing pyopenssl support as described here
-    #   https://urllib3.readthedocs.org/en/latest/\
-    #       security.html#openssl-pyopenssl
-    #
-    # Dependencies can be installed with
-    #     pip install iotlabcli[secure]
+    def __init__(self, files: dict[str, Any]) -> None:
+        self.boundary = filepost.choose_boundary()
+        self.parts = [(self._part_header(key), value) for key, value in files.items()]
 
-    import urllib3.contrib.pyopenssl
+    @property
+    def content_type(self) -> str:
+        """Request Content-Type header"""
+        return f"multipart/form-data; boundary={self.boundary}"
 
-    urllib3.contrib.pyopenssl.inject_into_urllib3()
-except ImportError:
-    pass
+    def _part_header(self, name: str) -> bytes:
+        field = RequestField(name=name, data=b"", filename=name)
+        field.make_multipart()
+        return f"--{self.boundary}\r\n{field.render_headers()}".encode()
+
+    @property
+    def _end(self) -> bytes:
+        return f"--{self.boundary}--\r\n".encode()
+
+    @staticmethod
+    def _chunks(value: str | bytes | helpers.FileRef) -> Iterator[bytes]:
+        if isinstance(value, helpers.FileRef):
+            return value.chunks()
+        return iter([value.encode("utf-8") if isinstance(value, str) else value])
+
+    @staticmethod
+    def _size(value: str | bytes | helpers.FileRef) -> int:
+        if isinstance(value, helpers.FileRef):
+            return value.size
+        return len(value.encode("utf-8") if isinstance(value, str) else value)
+
+    def __len__(self) -> int:
+        """Body size, sent as Content-Length"""
+        parts = sum(len(hdr) + self._size(value) + 2 for hdr, value in self.parts)
+        return parts + len(self._end)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for header, value in self.parts:
+            yield header
+            yield from self._chunks(value)
+            yield b"\r\n"
+        yield self._end
+
+
+def _resume_headers(part: str) -> dict[str, str] | None:
+    """Return headers resuming the download after `part` content.
+
+    The part is resumed only if the validator of its content was stored
+    next to it, as 'part.validator', and sent as If-Range. Otherwise it
+    is removed, to be downloaded again.
+    """
+    if not os.path.exists(part):
+        return None
+    try:
+        with open(part + PART_VALIDATOR, encoding="utf-8") as _fd:
+            validator = _fd.read()
+    except OSError:
+        validator = ""
+    if not validator:
+        _remove_part(part)
+        return None
+    return {"Range": f"bytes={os.path.getsize(part)}-", "If-Range": validator}
+
+
+def _save_validator(part: str, headers: Any) -> None:
+    """Store `headers` validator of the `part` content being downloaded.
+
+    Weak ETags cannot be used with If-Range, Last-Modified is used instead.
+    """
+    etag = headers.get("ETag", "")
+    validator = etag if etag and not etag.startswith("W/") else ""
+    validator = validator or headers.get("Last-Modified", "")
+    if not validator:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(part + PART_VALIDATOR)
+        return
+    with open(part + PART_VALIDATOR, "w", encoding="utf-8") as _fd:
+        _fd.write(validator)
+
+
+def _remove_part(part: str) -> None:
+    """Remove `part` download and its validator, if any"""
+    for path in (part, part + PART_VALIDATOR):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def _content_total(headers: Any, offset: int = 0) -> int | None:
+    """Return the total size of a content starting at `offset`, if known.
+
+    >>> _content_total({'Content-Length': '10'}, 20)
+    30
+    >>> _content_total({}) is None
+    True
+    """
+    try:
+        return offset + int(headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+
+class _ApiUrl:  # pylint:disable=too-few-public-methods
+    """`Api.url` class attribute resolved and memoized on first access.
+
+    Instances may still override it with `api.url = url`.
+    """
+
+    default = "https://www.iot-lab.info/api/"
+
+    def __init__(self) -> None:
+        self.url: str | None = None
+
+    def __get__(self, instance: Any, owner: Any = None) -> str:
+        if self.url is None:
+            self.url = helpers.read_custom_api_url() or self.default
+        return self.url
 
 
 # pylint: disable=maybe-no-member,no-member
@@ -74,15 +314,44 @@ class Api:  # pylint:disable=too-many-public-methods
     """IoT-Lab REST API"""
 
     _cache = {}
-    url = helpers.read_custom_api_url() or "https://www.iot-lab.info/api/"
-
-    def __init__(self, username: str | None, password: str | None) -> None:
+    _session = None
+    # Persistent cache of 'get' results, disabled if None
+    disk_cache: cache.DiskCache | None = None
+    # Last 'get' json entries with validators for conditional requests,
+    # least recently used first
+    _validated: OrderedDict[str, dict[str, Any]] = OrderedDict()
+    _validated_lock = threading.Lock()
+    # Streamed downloads chunks size
+    chunk_size = 64 * 1024
+    url = _ApiUrl()
+
+    def __init__(
+        self,
+        username: str | None,
+        password: str | None,
+        pool_size: int | None = None,
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
         """
         :param username: username for Basic password auth
         :param password: password for Basic auth
-        :param url: url of API.
+        :param pool_size: use a dedicated session with this connections pool
+            size. By default, the session shared by all Api objects is used.
+        :param retry_policy: timeouts and retries, default to `RetryPolicy()`
         """
         self.auth = HTTPBasicAuth(username, password)
+        self.retry_policy = retry_policy or RetryPolicy()
+        if pool_size is None:
+            self.session = self.shared_session()
+        else:
+            self.session = new_session(pool_size)
+
+    @classmethod
+    def shared_session(cls) -> requests.Session:
+        """Return the keep-alive session shared by all Api objects."""
+        if cls._session is None:
+            cls._session = new_session()
+        return cls._session
 
     def get_sites_details(self) -> Any:
         """Get testbed sites details"""
@@ -114,6 +383,7 @@ class Api:  # pylint:disable=too-many-public-methods
         :type files: dictionnary
         :returns JSONObject
         """
+        helpers.forget_current_experiment(self)
         return self.method("experiments", "post", files=files)
 
     def get_experiments(
@@ -146,11 +416,26 @@ class Api:  # pylint:disable=too-many-public-methods
             url += f"/{option}"
         return self.method(url, raw=option == "data")
 
+    def get_experiment_archive(
+        self,
+        expid: int,
+        path: str,
+        progress: Callable[[int, int | None], None] | None = None,
+    ) -> None:
+        """Download user experiment tar.gz archive to `path`.
+
+        :param expid: experiment id submission (e.g. OAR scheduler)
+        :param path: archive destination
+        :param progress: see `download`
+        """
+        self.download(f"experiments/{expid}/data", path, progress)
+
     def stop_experiment(self, expid: int) -> Any:
         """Stop user experiment.
 
         :param id: experiment id submission (e.g. OAR scheduler)
         """
+        helpers.forget_current_experiment(self)
         return self.method(f"experiments/{expid}", "delete")
 
     def reload_experiment(
@@ -163,6 +448,7 @@ class Api:  # pylint:disable=too-many-public-methods
         :returns JSONObject
         """
         url = f"experiments/{expid}/reload"
+        helpers.forget_current_experiment(self)
         return self.method(url, "post", json=exp_json)
 
     # Node commands
@@ -363,6 +649,13 @@ class Api:  # pylint:disable=too-many-public-methods
     ) -> Any:
         """Call http `method` on iot-lab-url/'url'.
 
+        'get' json results are revalidated with conditional requests when
+        the server gave validators (ETag, Last-Modified).
+        When `disk_cache` is set, 'get' json results are cached and other
+        methods invalidate the cached results of the same resources.
+        Errors on experiments resources forget the current experiment, it
+        may have been rejected by the server.
+
         :param url: url of API.
         :param method: request method
         :param json: send as 'post' json encoded data
@@ -372,26 +665,241 @@ class Api:  # pylint:disable=too-many-public-methods
         assert method in ("get", "post", "delete")
         assert (method == "post") or (files is None and json is None)
 
+        try:
+            return self._method(url, method, json, files, raw)
+        except HTTPError:
+            if url.startswith("experiments/"):
+                helpers.forget_current_experiment(self)
+            raise
+
+    def _method(  # pylint:disable=too-many-arguments,too-many-positional-arguments
+        self,
+        url: str,
+        method: str,
+        json: Any,
+        files: dict[str, Any] | None,
+        raw: bool,
+    ) -> Any:
+        if method == "get" and not raw:
+            return self._get_json(url)
+
+        ret = self._http_method(url, method, json, files, raw)
+        if method != "get" and self.disk_cache is not None:
+            self.disk_cache.invalidate(url)
+        return ret
+
+    def _http_method(  # pylint:disable=too-many-arguments,too-many-positional-arguments
+        self,
+        url: str,
+        method: str = "get",
+        json: Any = None,
+        files: dict[str, Any] | None = None,
+        raw: bool = False,
+    ) -> Any:
+        """Run http `method` on iot-lab-url/'url' and return its result."""
+        _url = urljoin(self.url, url)
+
+        req = self._request(
+            _url, method, auth=self.auth, json=json, **self._files_kwargs(files)
+        )
+        return self._response_content(_url, req, raw)
+
+    @staticmethod
+    def _files_kwargs(files: dict[str, Any] | None) -> dict[str, Any]:
+        """Return request arguments to stream `files` as multipart body."""
+        if files is None:
+            return {"files": None}
+        body = MultipartBody(files)
+        return {
+            "files": None,
+            "data": body,
+            "headers": {"Content-Type": body.content_type},
+        }
+
+    def download(
+        self,
+        url: str,
+        path: str,
+        progress: Callable[[int, int | None], None] | None = None,
+    ) -> None:
+        """Stream iot-lab-url/'url' content to `path` by chunks.
+
+        Content is written to 'path.part' and renamed to `path` when
+        complete. If 'path.part' remains from an interrupted download,
+        only the missing content is requested with a Range request, if it
+        is still the same content, as checked with If-Range.
+
+        :param url: url of API.
+        :param path: destination file
+        :param progress: called after each chunk with the downloaded and
+            total sizes, total is None when unknown.
+        """
+        part = f"{path}.part"
+        with self._download_request(url, part) as req:
+            offset = 0
+            if requests.codes.partial_content == req.status_code:
+                offset = os.path.getsize(part)
+            total = _content_total(req.headers, offset)
+            with open(part, "ab" if offset else "wb") as archive:
+                for chunk in req.iter_content(self.chunk_size):
+                    archive.write(chunk)
+                    offset += len(chunk)
+                    if progress is not None:
+                        progress(offset, total)
+        os.replace(part, path)
+        _remove_part(part)
+
+    def _download_request(self, url: str, part: str) -> requests.Response:
+        """Start streaming iot-lab-url/'url', resuming after `part` content.
+
+        A `part` file the server cannot resume from, or whose content
+        changed, is downloaded again.
+        """
         _url = urljoin(self.url, url)
+        headers = _resume_headers(part)
+        req = self._request(_url, "get", auth=self.auth, stream=True, headers=headers)
+        if requests.codes.requested_range_not_satisfiable == req.status_code:
+            req.close()
+            _remove_part(part)
+            return self._download_request(url, part)
+        if req.status_code not in (requests.codes.ok, requests.codes.partial_content):
+            self._raise_http_error(_url, req)
+        if requests.codes.ok == req.status_code:
+            _save_validator(part, req.headers)
+        return req
+
+    def _get_json(self, url: str) -> Any:
+        """Get iot-lab-url/'url' json content, through `disk_cache` if set."""
+        key = f"{self.url} {self.auth.username} {url}"
+        if self.disk_cache is None:
+            return self._conditional_get(key, url)["content"]
+        return self.disk_cache.cached(
+            key, url, lambda stale: self._conditional_get(key, url, stale)
+        )
+
+    def _conditional_get(
+        self, key: str, url: str, entry: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """Get iot-lab-url/'url' json content and validators entry.
 
-        req = self._request(_url, method, auth=self.auth, json=json, files=files)
+        If `entry`, or the last validated entry for `key`, has validators
+        the request is conditional and its content is reused on a 304.
+        """
+        entry = entry or self._validated.get(key)
+        _url = urljoin(self.url, url)
+
+        req = self._request(
+            _url,
+            "get",
+            auth=self.auth,
+            json=None,
+            files=None,
+            headers=self._conditional_headers(entry),
+        )
+        if entry is not None and requests.codes.not_modified == req.status_code:
+            self._remember_validated(key, url, entry)
+            return entry
+
+        validators = self._validators(req.headers)
+        entry = {"content": self._response_content(_url, req), **validators}
+        if validators:
+            self._remember_validated(key, url, entry)
+        return entry
+
+    @classmethod
+    def _remember_validated(cls, key: str, url: str, entry: dict[str, Any]) -> None:
+        """Keep `entry` of inventory endpoints, evicting least recently used."""
+        if cache.endpoint(url) not in VALIDATED_ENDPOINTS:
+            return
+        with cls._validated_lock:
+            cls._validated[key] = entry
+            cls._validated.move_to_end(key)
+            while len(cls._validated) > VALIDATED_SIZE:
+                cls._validated.popitem(last=False)
+
+    @staticmethod
+    def _validators(headers: Any) -> dict[str, str]:
+        """Return response `headers` validators.
+
+        >>> Api._validators({'ETag': '"1a"', 'Content-Length': '2'})
+        {'etag': '"1a"'}
+        >>> Api._validators(None)
+        {}
+        """
+        headers = headers or {}
+        validators = {"etag": "ETag", "last_modified": "Last-Modified"}
+        return {key: headers[hdr] for key, hdr in validators.items() if hdr in headers}
+
+    @staticmethod
+    def _conditional_headers(entry: dict[str, Any] | None) -> dict[str, str] | None:
+        """Return conditional request headers for `entry` validators.
+
+        >>> Api._conditional_headers({'etag': '"1a"', 'content': {}})
+        {'If-None-Match': '"1a"'}
+        >>> Api._conditional_headers({'content': {}}) is None
+        True
+        """
+        entry = entry or {}
+        conditions = {"etag": "If-None-Match", "last_modified": "If-Modified-Since"}
+        headers = {hdr: entry[key] for key, hdr in conditions.items() if key in entry}
+        return headers or None
+
+    @classmethod
+    def _response_content(
+        cls, url: str, req: requests.Response, raw: bool = False
+    ) -> Any:
+        """Return `req` response content, raise HTTPError on errors."""
         if requests.codes.ok == req.status_code:
             return req.content if raw else req.json()
         if requests.codes.no_content == req.status_code:
             return None
-        return self._raise_http_error(_url, req)
+        return cls._raise_http_error(url, req)
 
-    @staticmethod
-    def _request(url: str, method: str, **kwargs: Any) -> requests.Response:
-        """Call http `method` on 'url'
+    def _request(self, url: str, method: str, **kwargs: Any) -> requests.Response:
+        """Call http `method` on 'url' using the keep-alive session
+        Transient errors are retried according to `retry_policy`
 
         :param url: url of API.
         :param method: request method
         :param **kwargs: requests.request additional arguments"""
+        start = time.monotonic()
+        attempt = 1
         try:
-            return requests.request(method, url, timeout=None, **kwargs)
+            while True:
+                req = self._request_attempt(url, method, attempt, **kwargs)
+                if req is not None:
+                    return req
+                time.sleep(self.retry_policy.delay(attempt))
+                attempt += 1
+        finally:
+            self.retry_policy.report(method, url, attempt, time.monotonic() - start)
+
+    def _request_attempt(
+        self, url: str, method: str, attempt: int, **kwargs: Any
+    ) -> requests.Response | None:
+        """Run request `attempt`, return None if it should be retried."""
+        policy = self.retry_policy
+        retry = policy.can_retry(method, attempt)
+        timeout = policy.timeout(method)
+        try:
+            req = self.session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if retry:
+                return None
+            raise TransportError(sys.exc_info())
         except Exception:  # show issue with old requests versions
             raise RuntimeError(sys.exc_info())
+        return self._retried_response(req, method, attempt)
+
+    def _retried_response(
+        self, req: requests.Response, method: str, attempt: int
+    ) -> requests.Response | None:
+        """Return `req`, or None after closing it if it should be retried."""
+        policy = self.retry_policy
+        if policy.can_retry(method, attempt) and req.status_code in policy.status_codes:
+            req.close()  # release its connection, even when streamed
+            return None
+        return req
 
     @staticmethod
     def _raise_http_error(url: str, req: requests.Response) -> None:
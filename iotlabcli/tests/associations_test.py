@@ -106,6 +106,40 @@ class TestAssociationsMap(unittest.TestCase):
         ret = associations.AssociationsMap.from_list(None, "script", "sites")
         self.assertTrue(ret is None)
 
+    def test_associationsmap_from_items(self):
+        """Test creating a map from (key, values) items."""
+        items = [
+            ("test.elf", ["m3-10", "m3-2"]),
+            ("fw.elf", ["m3-3"]),
+            ("test.elf", ["m3-1", "m3-2"]),
+        ]
+        assocs = associations.AssociationsMap.from_items(
+            items, "firmware", "nodes", helpers.node_url_sort_key
+        )
+        expected = [
+            {"firmwarename": "fw.elf", "nodes": ["m3-3"]},
+            {"firmwarename": "test.elf", "nodes": ["m3-1", "m3-2", "m3-10"]},
+        ]
+        self._assert_json_equal(assocs, expected)
+
+        # Keys are still inserted and removed in place
+        assocs.extendvalues("m3.elf", ["m3-4"])
+        del assocs["fw.elf"]
+        assocs["a.elf"] = ["m3-5"]
+        self.assertEqual(
+            [assoc.key for assoc in assocs], ["a.elf", "m3.elf", "test.elf"]
+        )
+        self.assertEqual(assocs._keys, ["a.elf", "m3.elf", "test.elf"])
+
+    def test_associationsmap_from_list_copy(self):
+        """Loading from a list does not modify it."""
+        assocs_list = [{"firmwarename": "fw.elf", "nodes": ["m3-2", "m3-10"]}]
+        assocs = associations.AssociationsMap.from_list(
+            assocs_list, "firmware", "nodes"
+        )
+        self.assertEqual(assocs["fw.elf"], ["m3-10", "m3-2"])
+        self.assertEqual(assocs_list[0]["nodes"], ["m3-2", "m3-10"])
+
     def test_association_dict_factory(self):
         """Test associationsmapdict_from_dict."""
         assocsdict = {
@@ -158,3 +192,55 @@ class TestAssociation(unittest.TestCase):
         assoc = assocclass("test.elf", ["m3-1", "m3-2", "m3-3"])
         with self.assertRaises(AttributeError):
             assoc.update()
+
+    def test_sort_only_when_changed(self):
+        """Values are only sorted again when they changed."""
+        sorted_values = []
+
+        def _sortkey(value):
+            sorted_values.append(value)
+            return helpers.node_url_sort_key(value)
+
+        assocclass = associations._Association.for_key_value(
+            "firmware", "nodes", _sortkey
+        )
+        assoc = assocclass("test.elf", ["m3-10", "m3-2"])
+        self.assertEqual(assoc.value, ["m3-2", "m3-10"])
+        self.assertEqual(json.loads(helpers.json_dumps(assoc))["nodes"], assoc.value)
+        self.assertEqual(len(sorted_values), 2)
+        self.assertEqual(
+            assoc.dict(), {"firmwarename": "test.elf", "nodes": assoc.value}
+        )
+
+        # A few values are inserted in place
+        sorted_values.clear()
+        assoc.extend(["m3-3"])
+        self.assertEqual(assoc.value, ["m3-2", "m3-3", "m3-10"])
+        self.assertLessEqual(len(sorted_values), 3)
+
+        # More values or a direct modification sort everything again
+        assoc.extend(["m3-9", "m3-1", "m3-4", "m3-5"])
+        assoc._value().append("m3-0")
+        self.assertEqual(
+            assoc.value,
+            ["m3-0", "m3-1", "m3-2", "m3-3", "m3-4", "m3-5", "m3-9", "m3-10"],
+        )
+
+    def test_sort_same_length_change(self):
+        """In place changes keeping the values length are sorted again."""
+        assocclass = associations._Association.for_key_value(
+            "firmware", "nodes", helpers.node_url_sort_key
+        )
+        assoc = assocclass("test.elf", ["m3-1", "m3-2", "m3-3"])
+        value = assoc.value
+        value[0] = "m3-9"
+        self.assertEqual(assoc.value, ["m3-2", "m3-3", "m3-9"])
+
+        value.remove("m3-3")
+        value.append("m3-0")
+        self.assertEqual(json.loads(helpers.json_dumps(assoc))["nodes"], value)
+        self.assertEqual(value, ["m3-0", "m3-2", "m3-9"])
+
+        value.sort(reverse=True)
+        assoc.extend(["m3-1"])
+        self.assertEqual(assoc.value, ["m3-0", "m3-1", "m3-2", "m3-9"])
@@ -0,0 +1,102 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Test the iotlabcli.parser.batch module"""
+
+import json
+
+import pytest
+
+from iotlabcli.parser import batch as batch_parser
+
+RUNNING = "/experiments?state=Running&limit=0&offset=0"
+ROUTES = {
+    "/sites": {"items": [{"site": "grenoble"}]},
+    "/experiments/running": {"items": []},
+    RUNNING: {"items": [{"id": 123, "state": "Running"}]},
+}
+
+
+def _run_batch(tmp_path, capsys, lines, *args):
+    """Run batch `lines` and return printed results"""
+    (tmp_path / "commands").write_text("\n".join(lines))
+    batch_parser.main([str(tmp_path / "commands"), *args])
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_batch(api_server, tmp_path, capsys):
+    """Commands share the current experiment lookup"""
+    lines = [
+        "# reset nodes",
+        "node --reset -l grenoble,m3,1",
+        "",
+        "iotlab node --reset -l grenoble,m3,2  # same experiment",
+        "iotlab-status --experiments-running --jmespath items",
+        "experiment stop",
+        "node --reset -l grenoble,m3,3",
+    ]
+    results = _run_batch(tmp_path, capsys, lines)
+
+    assert [result["line"] for result in results] == [2, 4, 5, 6, 7]
+    assert results[0] == {"line": 2, "command": lines[1], "result": {}}
+    assert results[2]["result"] == []
+    assert all("error" not in result for result in results)
+
+    # looked up again after stopping the experiment
+    assert api_server.requests.count(RUNNING) == 2
+    assert [posted[0] for posted in api_server.posted] == [
+        "/experiments/123/nodes/reset",
+        "/experiments/123/nodes/reset",
+        "/experiments/123",
+        "/experiments/123/nodes/reset",
+    ]
+
+
+@pytest.mark.usefixtures("api_server")
+def test_batch_errors(tmp_path, capsys):
+    """Failed commands are reported and make the batch fail"""
+    lines = [
+        "status --unknown",
+        "auth -l",
+        "node --reset -l 'grenoble,m3,1",
+        "iotlab",
+        "status --experiments-running",
+    ]
+    with pytest.raises(SystemExit) as exit_info:
+        _run_batch(tmp_path, capsys, lines)
+    assert exit_info.value.code == 1
+
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    errors = [result.get("error", "") for result in results]
+    assert "one of the arguments" in errors[0]
+    assert "Unsupported command 'auth'" in errors[1]
+    assert "No closing quotation" in errors[2]
+    assert "Unsupported command ''" in errors[3]
+    assert results[4]["result"] == {"items": []}
+
+
+@pytest.mark.usefixtures("api_server")
+def test_batch_parallel(tmp_path, capsys):
+    """Parallel commands results are printed in commands order"""
+    lines = [f"status --experiments-running --jmespath '`{num}`'" for num in range(20)]
+    results = _run_batch(tmp_path, capsys, lines, "--parallel", "4")
+    assert [result["result"] for result in results] == list(range(20))
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Test the iotlabcli.cache module"""
+
+import os
+import unittest
+from unittest.mock import Mock, patch
+
+import pytest
+
+from iotlabcli import cache, rest
+from iotlabcli.tests.my_mock import RequestRet
+
+
+def entry_function(content):
+    """Mock cached function returning new entries with `content`"""
+    return Mock(side_effect=lambda _: {"content": content})
+
+
+@pytest.fixture(name="disk_cache")
+def fixture_disk_cache(tmp_path):
+    """DiskCache in a temporary directory"""
+    return cache.DiskCache(str(tmp_path), ttls={"sites": 10, "monitoring": 10})
+
+
+def test_default_cache_dir(monkeypatch):
+    """Cache directory may be set from environment"""
+    monkeypatch.setenv("IOTLAB_CACHE_DIR", "/tmp/iotlab_cache")
+    assert cache.default_cache_dir() == "/tmp/iotlab_cache"
+
+    monkeypatch.delenv("IOTLAB_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", "/tmp/xdg")
+    assert cache.default_cache_dir() == "/tmp/xdg/iotlabcli"
+
+
+def test_cached_ttl(disk_cache):
+    """Content is cached for the endpoint time to live"""
+    function = entry_function({"items": []})
+    with patch("time.time", return_value=1000):
+        assert disk_cache.cached("key", "sites", function) == {"items": []}
+        assert disk_cache.cached("key", "sites", function) == {"items": []}
+    assert function.call_count == 1
+
+    # other key
+    disk_cache.cached("key2", "sites", function)
+    assert function.call_count == 2
+
+    # expired, function gets expired entry
+    with patch("time.time", return_value=1011):
+        disk_cache.cached("key", "sites", function)
+    assert function.call_count == 3
+    function.assert_called_with({"time": 1000, "content": {"items": []}})
+
+
+def test_not_cached_endpoint(disk_cache):
+    """Urls without time to live are not cached"""
+    function = entry_function({"items": []})
+    disk_cache.cached("key", "experiments", function)
+    disk_cache.cached("key", "experiments", function)
+    assert function.call_count == 2
+    assert not os.listdir(disk_cache.path)
+
+
+def test_refresh(disk_cache):
+    """Refresh ignores current entries but stores new ones"""
+    function = entry_function({"items": [1]})
+    disk_cache.cached("key", "sites", function)
+
+    refreshing = cache.DiskCache(disk_cache.path, disk_cache.ttls, refresh=True)
+    function.side_effect = lambda _: {"content": {"items": [2]}}
+    assert refreshing.cached("key", "sites", function) == {"items": [2]}
+    assert disk_cache.cached("key", "sites", function) == {"items": [2]}
+    assert function.call_count == 2
+    function.assert_called_with(None)
+
+
+def test_invalidate(disk_cache):
+    """Invalidate removes entries of same resources"""
+    function = entry_function({"items": []})
+    disk_cache.cached("monitoring", "monitoring", function)
+    disk_cache.cached("monitoring?archi=m3", "monitoring?archi=m3", function)
+    disk_cache.cached("sites", "sites", function)
+    assert function.call_count == 3
+
+    disk_cache.invalidate("monitoring/profile_name")
+    disk_cache.cached("monitoring", "monitoring", function)
+    disk_cache.cached("monitoring?archi=m3", "monitoring?archi=m3", function)
+    disk_cache.cached("sites", "sites", function)
+    assert function.call_count == 5
+
+
+def test_invalid_entry(disk_cache):
+    """Unreadable entries are ignored"""
+    function = entry_function({"items": []})
+    disk_cache.cached("key", "sites", function)
+    # pylint:disable=protected-access
+    with open(disk_cache._entry_path("key", "sites"), "w") as entry:
+        entry.write("{invalid")
+    disk_cache.cached("key", "sites", function)
+    assert function.call_count == 2
+
+
+def test_eviction(tmp_path):
+    """Oldest entries are removed above maximum size"""
+    disk_cache = cache.DiskCache(str(tmp_path), ttls={"sites": 10}, max_size=150)
+    function = entry_function({"items": ["a" * 50]})
+    for num in range(3):
+        with patch("time.time", return_value=1000 + num):
+            disk_cache.cached(f"key{num}", "sites", function)
+    # pylint:disable=protected-access
+    remaining = sorted(path for _, _, path in disk_cache._entries_stats())
+    assert len(remaining) == 1
+    assert remaining == [disk_cache._entry_path("key2", "sites")]
+
+
+class TestApiDiskCache(unittest.TestCase):
+    """Test rest.Api with a disk cache"""
+
+    def setUp(self):
+        self.m_req = patch("requests.Session.request").start()
+        self.m_req.return_value = RequestRet(200, content='{"items": []}')
+        patch.object(rest.Api, "disk_cache", cache.DiskCache()).start()
+        self.api = rest.Api("user", "password")
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_get_cached(self):
+        """Cached endpoints are requested only once"""
+        for _ in range(3):
+            self.assertEqual({"items": []}, self.api.get_nodes(site="grenoble"))
+            self.assertEqual({"items": []}, self.api.get_experiments())
+        self.assertEqual(4, self.m_req.call_count)
+
+        # Different user
+        rest.Api("user2", "password").get_nodes(site="grenoble")
+        self.assertEqual(5, self.m_req.call_count)
+
+    def test_write_invalidates(self):
+        """Modifying profiles invalidates cached profiles"""
+        self.api.get_profiles()
+        self.api.get_profiles()
+        self.assertEqual(1, self.m_req.call_count)
+
+        self.api.del_profile("name")
+        self.api.get_profiles()
+        self.assertEqual(3, self.m_req.call_count)
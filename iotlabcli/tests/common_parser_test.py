@@ -26,9 +26,12 @@ import argparse
 import sys
 import unittest
 from io import StringIO
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, call, patch
 from urllib.error import HTTPError
 
+import jmespath
+
+from iotlabcli import intervals, rest
 from iotlabcli.parser import common
 from iotlabcli.parser.common import print_result
 from iotlabcli.tests.my_mock import api_mock, api_mock_stop
@@ -80,6 +83,17 @@ class TestCommonParser(unittest.TestCase):
             function.side_effect = KeyboardInterrupt()
             self.assertRaises(SystemExit, common.main_cli, function, parser)
 
+    def test_configure_disk_cache(self):
+        """Configure disk cache from cache arguments"""
+        common.configure_disk_cache(["-l", "grenoble,m3,1", "--reset"])
+        self.assertFalse(rest.Api.disk_cache.refresh)
+
+        common.configure_disk_cache(["--refresh", "-l", "grenoble,m3,1"])
+        self.assertTrue(rest.Api.disk_cache.refresh)
+
+        common.configure_disk_cache(["-l", "grenoble,m3,1", "--no-cache"])
+        self.assertIsNone(rest.Api.disk_cache)
+
     def test_print_result_sigpipe(self):
         """Test BrokenPipe silent handling
 
@@ -100,6 +114,39 @@ class TestCommonParser(unittest.TestCase):
         """verify that print_result can handle None results"""
         self.assertIsNone(print_result(None))
 
+    def test_print_result_iterator(self):
+        """Iterators are printed as JSON lines"""
+        with patch(f"{BUILTIN}.print") as mock_print:
+            print_result(iter([{"id": 1, "state": "Running"}, None, {"id": 2}]))
+            self.assertEqual(
+                [call('{"id": 1, "state": "Running"}'), call('{"id": 2}')],
+                mock_print.call_args_list,
+            )
+
+            mock_print.reset_mock()
+            print_result(iter([{"id": 1}, {"id": 2}]), jmespath.compile("id"), str)
+            self.assertEqual([call("1"), call("2")], mock_print.call_args_list)
+
+            # Stops on BrokenPipe
+            mock_print.reset_mock()
+            mock_print.side_effect = IOError(32, "Broken pipe")
+            print_result(iter([{"id": 1}, {"id": 2}]))
+            self.assertEqual(1, mock_print.call_count)
+
+    def test_main_cli_iterator_error(self):
+        """Errors while iterating over results are handled"""
+
+        def _results(_):
+            yield {"id": 1}
+            raise HTTPError(None, 500, "msg", None, None)
+
+        parser = common.base_parser()
+        with patch(f"{BUILTIN}.print") as mock_print:
+            self.assertRaises(
+                SystemExit, common.main_cli, _results, parser, ["-u", "a"]
+            )
+        mock_print.assert_any_call('{"id": 1}')
+
     @staticmethod
     def test_main_cli_jmespath_fmt():
         """Run main_cli with --jmespath and --format options
@@ -158,18 +205,13 @@ class TestNodeSelectionParser(unittest.TestCase):
     def tearDown(self):
         api_mock_stop()
 
-    @patch("iotlabcli.parser.common._get_experiment_nodes_list")
+    @patch("iotlabcli.parser.common._get_experiment_nodes_set")
     def test_list_nodes(self, g_nodes_list):
         """Run the different list_nodes cases"""
         api = api_mock()
-        g_nodes_list.return_value = [
-            "m3-1.grenoble.iot-lab.info",
-            "m3-2.grenoble.iot-lab.info",
-            "m3-3.grenoble.iot-lab.info",
-            "m3-1.strasbourg.iot-lab.info",
-            "m3-2.strasbourg.iot-lab.info",
-            "m3-3.strasbourg.iot-lab.info",
-        ]
+        g_nodes_list.return_value = intervals.NodesSet.from_nodes_ids(
+            [{"grenoble": {"m3": "1-3"}, "strasbourg": {"m3": "1-3"}}]
+        )
 
         nodes_ll = [
             ["m3-1.grenoble.iot-lab.info", "m3-2.grenoble.iot-lab.info"],
@@ -200,26 +242,24 @@ class TestNodeSelectionParser(unittest.TestCase):
         )
         self.assertTrue(g_nodes_list.called)
 
-    def test__get_experiment_nodes_list(self):
-        """Run get_experiment_nodes_list"""
-        api = api_mock(
-            ret={
-                "items": [
-                    {"network_address": "m3-1.grenoble.iot-lab.info"},
-                    {"network_address": "m3-2.grenoble.iot-lab.info"},
-                    {"network_address": "m3-3.grenoble.iot-lab.info"},
-                ]
-            }
+        # No experiment node excluded => all nodes
+        excl_ll = [["m3-4.grenoble.iot-lab.info", "m3-1.lille.iot-lab.info"]]
+        self.assertEqual(common.list_nodes(api, 123, excl_nodes_ll=excl_ll), [])
+
+        # All nodes excluded
+        excl_ll = [nodes_ll[0], ["m3-3.grenoble.iot-lab.info"], nodes_ll[1]]
+        excl_ll.append(["m3-3.strasbourg.iot-lab.info"])
+        self.assertRaises(
+            ValueError, common.list_nodes, api, 123, excl_nodes_ll=excl_ll
         )
+
+    def test__get_experiment_nodes_set(self):
+        """Run get_experiment_nodes_set"""
+        api = api_mock(ret={"items": [{"grenoble": {"m3:at86rf231": "1-3+5"}}]})
         # pylint: disable=protected-access
-        self.assertEqual(
-            common._get_experiment_nodes_list(api, 3),
-            [
-                "m3-1.grenoble.iot-lab.info",
-                "m3-2.grenoble.iot-lab.info",
-                "m3-3.grenoble.iot-lab.info",
-            ],
-        )
+        nodes = common._get_experiment_nodes_set(api, 3)
+        api.get_experiment_info.assert_called_with(3, "nodes_ids")
+        self.assertEqual(nodes.short_lists(), ["grenoble,m3,1-3+5"])
 
     @patch("iotlabcli.parser.common.check_site_with_server")
     def test_nodes_list_from_str(self, _):
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""pytest configuration for iotlabcli tests"""
+
+import collections
+from unittest.mock import patch
+
+import pytest
+
+from iotlabcli import helpers, rest
+from iotlabcli.tests.stub_server import stub_server
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Never use the user cache directory nor leak cached content."""
+    monkeypatch.setenv("IOTLAB_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(rest.Api, "disk_cache", None)
+    monkeypatch.setattr(rest.Api, "_validated", collections.OrderedDict())
+    monkeypatch.setattr(helpers.FileRef, "_digests", {})
+
+
+@pytest.fixture(autouse=True)
+def no_daemon(tmp_path, monkeypatch):
+    """Never forward commands to a running user daemon."""
+    monkeypatch.setenv("IOTLAB_DAEMON_SOCKET", str(tmp_path / "daemon.sock"))
+
+
+@pytest.fixture(name="api_server")
+def fixture_api_server(request, monkeypatch):
+    """Stub server answering test module ROUTES used as Api url.
+
+    Stored credentials are 'user:password'.
+    """
+    credentials = ("user", "password")
+    monkeypatch.setattr(rest.Api, "_cache", {})
+    with (
+        stub_server(request.module.ROUTES) as server,
+        patch("iotlabcli.auth.get_user_credentials", return_value=credentials),
+    ):
+        monkeypatch.setattr(rest.Api, "url", server.url)
+        yield server
@@ -0,0 +1,251 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Test the iotlabcli.daemon module"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from iotlabcli import daemon, rest
+from iotlabcli.parser import daemon as daemon_parser
+from iotlabcli.parser import main as main_parser
+from iotlabcli.tests.stub_server import stub_server
+
+SITES = {"items": [{"site": "grenoble"}]}
+RUNNING = {"items": [{"id": 123}]}
+
+
+@pytest.fixture(name="server")
+def fixture_server(tmp_path, monkeypatch):
+    """Run 'iotlab daemon start' against a stub server in a new process"""
+    (tmp_path / "iotlabrc").write_text("user:cGFzc3dvcmQ=")
+    monkeypatch.setenv("IOTLAB_PASSWORD_FILE", str(tmp_path / "iotlabrc"))
+    with stub_server(
+        {"/sites/details": SITES, "/experiments/running": RUNNING}
+    ) as stub:
+        monkeypatch.setenv("IOTLAB_API_URL", stub.url)
+        code = "from iotlabcli.parser import main; main.main(['daemon', 'start'])"
+        with subprocess.Popen([sys.executable, "-c", code]) as process:
+            _wait_running()
+            yield stub
+            main_parser.main(["daemon", "stop"])
+            assert process.wait(timeout=10) == 0
+    assert not os.path.exists(daemon.socket_path())
+
+
+def _wait_running(timeout=10):
+    """Wait until the daemon accepts connections"""
+    end = time.time() + timeout
+    while (sock := daemon.connect()) is None:
+        assert time.time() < end, "daemon not started"
+        time.sleep(0.05)
+    sock.close()
+
+
+def test_socket_path(monkeypatch):
+    """Socket path may be set from environment"""
+    monkeypatch.delenv("IOTLAB_DAEMON_SOCKET")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert daemon.socket_path() == f"/run/user/1000/iotlabcli-{os.getuid()}.sock"
+
+    monkeypatch.setenv("IOTLAB_DAEMON_SOCKET", "/tmp/iotlab.sock")
+    assert daemon.socket_path() == "/tmp/iotlab.sock"
+
+
+def test_not_running(tmp_path):
+    """Commands are not forwarded when the daemon is not running"""
+    assert daemon.forward("status", ["--sites"]) is None
+
+    (tmp_path / "daemon.sock").write_text("")  # stale socket
+    assert daemon.forward("status", ["--sites"]) is None
+    with pytest.raises(SystemExit):
+        main_parser.main(["daemon", "status"])
+
+
+def test_exit_code(capsys):
+    """Functions exit code"""
+    assert daemon.exit_code(print, "text") == 0
+    assert daemon.exit_code(sys.exit) == 0
+    assert daemon.exit_code(sys.exit, 2) == 2
+    assert daemon.exit_code(sys.exit, "error message") == 1
+    assert daemon.exit_code(int, "not an int") == 1
+    stderr = capsys.readouterr().err
+    assert "error message" in stderr
+    assert "ValueError" in stderr
+
+
+@pytest.mark.usefixtures("server")
+def test_forward(capsys):
+    """Commands are run by the daemon"""
+    assert main_parser.main(["status", "--sites"]) == 0
+    assert json.loads(capsys.readouterr().out) == SITES
+
+    assert main_parser.status_main(["--sites", "--jmespath", "items[0].site"]) == 0
+    assert capsys.readouterr().out == '"grenoble"\n'
+
+    assert main_parser.main(["status", "--sites", "--unknown"]) == 2
+    assert "unrecognized arguments: --unknown" in capsys.readouterr().err
+
+    main_parser.main(["daemon", "status"])
+    status = json.loads(capsys.readouterr().out)
+    assert status["socket"] == daemon.socket_path()
+    assert status["pid"] != os.getpid()
+
+
+def test_daemon_keep_alive(server):
+    """The daemon reuses its connections to the server"""
+    for _ in range(3):
+        assert daemon.forward("status", ["--experiments-running"]) == 0
+    assert server.requests == ["/experiments/running"] * 3
+    assert server.connections == 1
+
+
+def test_forwardable():
+    """Commands that may ask a password are not forwarded"""
+    assert main_parser.forwardable("node", ["--list", "grenoble,m3,1"])
+    assert not main_parser.forwardable("node", ["-u", "user", "--list"])
+    assert not main_parser.forwardable("node", ["--user=user", "--list"])
+    assert not main_parser.forwardable("auth", ["-l"])
+    # Blocking commands
+    assert main_parser.forwardable("experiment", ["get", "-l"])
+    assert not main_parser.forwardable("experiment", ["wait", "--ids", "1,2"])
+    assert not main_parser.forwardable("node", ["--reset", "--retry=3"])
+    assert not main_parser.forwardable("node", ["--flash-plan", "plan.json"])
+
+
+@pytest.fixture(name="local_daemon")
+def fixture_local_daemon(tmp_path):
+    """Run a daemon in a thread, its commands are set by the test"""
+    server = daemon.Daemon(None, str(tmp_path / "daemon.sock"))
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    yield server
+    assert list(daemon.request(daemon.STOP, server.path))[0]["exit"] == 0
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+
+
+def _commands(**commands):
+    """Return daemon `run` function running `commands` functions"""
+    return lambda command, args: commands[command]()
+
+
+def test_busy_daemon(local_daemon):
+    """A blocked command does not starve other clients"""
+    started, release = threading.Event(), threading.Event()
+
+    def _blocked():
+        started.set()
+        release.wait(10)
+        sys.exit(3)
+
+    local_daemon.run = _commands(blocked=_blocked, quick=lambda: None)
+    codes = []
+    client = threading.Thread(
+        target=lambda: codes.append(daemon.forward("blocked", [], local_daemon.path))
+    )
+    client.start()
+    assert started.wait(10)
+
+    # Other clients run their command themselves, control requests answered
+    assert daemon.forward("quick", [], local_daemon.path) is None
+    assert list(daemon.request(daemon.STATUS, local_daemon.path))[0]["exit"] == 0
+
+    release.set()
+    client.join(timeout=10)
+    assert codes == [3]
+    assert daemon.forward("quick", [], local_daemon.path) == 0
+
+
+def test_other_settings(local_daemon, monkeypatch, tmp_path):
+    """Commands with other account or api url settings are run locally"""
+    local_daemon.run = _commands(quick=lambda: None)
+    assert daemon.forward("quick", [], local_daemon.path) == 0
+
+    for name, value in (
+        ("IOTLAB_PASSWORD_FILE", str(tmp_path / "other_iotlabrc")),
+        ("IOTLAB_API_URL", "https://other.example.org/api/"),
+        ("HOME", str(tmp_path)),
+    ):
+        with monkeypatch.context() as patch:
+            patch.setenv(name, value)
+            assert daemon.forward("quick", [], local_daemon.path) is None
+
+    with monkeypatch.context() as patch:
+        patch.setenv("HOME", str(tmp_path))
+        local_daemon.settings = daemon.settings()
+        assert daemon.forward("quick", [], local_daemon.path) == 0
+        (tmp_path / ".iotlab.api-url").write_text("https://other.example.org/api/")
+        assert daemon.forward("quick", [], local_daemon.path) is None
+
+
+def test_memory_cache_expires(monkeypatch):
+    """The daemon does not keep the sites list forever"""
+    # pylint: disable=protected-access
+    monkeypatch.setattr(rest.Api, "_cache", {"sites": SITES})
+    runner = daemon_parser.CommandRunner(ttl=3600)
+    monkeypatch.setattr(daemon_parser, "run_command", lambda command, args: 0)
+
+    runner("status", ["--sites"])
+    assert rest.Api._cache == {"sites": SITES}
+
+    runner.cleared -= 3601
+    runner("status", ["--sites"])
+    assert not rest.Api._cache
+
+
+def test_client_disconnected(local_daemon):
+    """Commands are aborted when their client disconnects"""
+    aborted = threading.Event()
+
+    def _output():
+        try:
+            for _ in range(200):
+                print("output")
+                time.sleep(0.05)
+        except daemon.ClientDisconnected:
+            aborted.set()
+            raise
+
+    local_daemon.run = _commands(output=_output, quick=lambda: None)
+    message = {"command": "output", "prog": "iotlab", "args": [], "cwd": "/"}
+    message["settings"] = daemon.settings()
+    replies = daemon.request(message, local_daemon.path)
+    assert next(replies) == {"stdout": "output"}
+    replies.close()
+
+    assert aborted.wait(5)
+    _wait_available(local_daemon.path)
+
+
+def _wait_available(path, timeout=5):
+    """Wait until the daemon runs commands again"""
+    end = time.time() + timeout
+    while daemon.forward("quick", [], path) is None:
+        assert time.time() < end, "daemon still busy"
+        time.sleep(0.05)
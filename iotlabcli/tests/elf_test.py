@@ -0,0 +1,148 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Test the iotlabcli.elf module"""
+
+import os
+import struct
+from unittest.mock import patch
+
+import pytest
+
+from iotlabcli import cache, elf
+
+# header, program header and section header formats, by ELF class
+_FORMATS = {
+    1: ("HHIIIIIHHHHHH", "IIIIIIII", "IIIIIIIIII"),
+    2: ("HHIQQQIHHHHHH", "IIQQQQQQ", "IIQQQQIIQQ"),
+}
+
+
+def make_elf(sections, elfclass=1, endianness="<"):
+    """Return an ELF file content with `sections` in their own segment.
+
+    :param sections: (address, load address, content) list, with a not
+        allocated section and a NOBITS one after them
+    """
+    fmts = [endianness + fmt for fmt in _FORMATS[elfclass]]
+    sizes = [16 + struct.calcsize(fmts[0])] + [struct.calcsize(f) for f in fmts[1:]]
+    ident = elf.ELF_MAGIC + bytes([elfclass, 1 if endianness == "<" else 2, 1])
+    segments, shdrs, contents = _elf_tables(
+        sections, sizes[0] + len(sections) * sizes[1]
+    )
+
+    shoff = sizes[0] + len(sections) * sizes[1] + len(contents)
+    header = (2, 40, 1, 0, sizes[0], shoff, 0, sizes[0])
+    header += (sizes[1], len(segments), sizes[2], len(shdrs), 0)
+    data = ident.ljust(16, b"\0") + struct.pack(fmts[0], *header)
+    for segment in segments:
+        if elfclass == 2:  # p_flags moved after p_type
+            segment = segment[:1] + segment[6:7] + segment[1:6] + segment[7:]
+        data += struct.pack(fmts[1], *segment)
+    data += contents
+    return data + b"".join(struct.pack(fmts[2], *shdr, 0, 0, 4, 0) for shdr in shdrs)
+
+
+def _elf_tables(sections, offset):
+    """Return `sections` program headers, section headers and contents"""
+    segments, shdrs, contents = [], [], b""
+    for address, load_address, content in sections:
+        size = len(content)
+        segments.append((elf.PT_LOAD, offset, address, load_address, size, size, 5, 4))
+        shdrs.append((0, 1, elf.SHF_ALLOC, address, offset, size))
+        contents += content
+        offset += size
+    shdrs.append((0, 1, 0, 0, 0, 8))  # .comment like, not allocated
+    shdrs.append((0, elf.SHT_NOBITS, elf.SHF_ALLOC | 1, 0x20001000, offset, 64))
+    return segments, shdrs, contents
+
+
+FIRMWARE_SECTIONS = [
+    (0x08001000, 0x08001000, b"code"),
+    (0x08001008, 0x08001008, b"rodata"),  # zeros filled gap before
+    (0x20000000, 0x0800100E, b"data"),  # initialized data copied to RAM
+]
+
+
+@pytest.mark.parametrize("elfclass", [1, 2])
+@pytest.mark.parametrize("endianness", ["<", ">"])
+def test_to_binary(elfclass, endianness):
+    """Convert ELF files to binary"""
+    data = make_elf(FIRMWARE_SECTIONS, elfclass, endianness)
+    assert elf.to_binary(data) == (0x1000, b"code\0\0\0\0rodatadata")
+
+    sections = [(0x200, 0x200, b"vectors"), (0x100, 0x100, b"boot")]
+    assert elf.to_binary(make_elf(sections, elfclass, endianness)) == (
+        0x100,
+        b"boot".ljust(0x100, b"\0") + b"vectors",
+    )
+
+    # cc2538 flash starts at 0x00200000
+    sections = [(0x00204000, 0x00204000, b"code")]
+    assert elf.to_binary(make_elf(sections, elfclass, endianness)) == (
+        0x4000,
+        b"code",
+    )
+
+
+def test_to_binary_errors():
+    """Invalid or not flashable ELF files"""
+    with pytest.raises(ValueError, match="Not an ELF file"):
+        elf.to_binary(b":020000040800F2\n")
+    with pytest.raises(ValueError, match="Invalid ELF file"):
+        elf.to_binary(make_elf(FIRMWARE_SECTIONS)[:100])
+    with pytest.raises(ValueError, match="Invalid ELF file"):
+        elf.to_binary(elf.ELF_MAGIC + b"\3\1".ljust(60, b"\0"))
+    with pytest.raises(ValueError, match="No loaded sections"):
+        elf.to_binary(make_elf([]))
+    # data not copied from flash
+    sections = [(0x08000000, 0x08000000, b"code"), (0x20000000, 0x20000000, b"data")]
+    with pytest.raises(ValueError, match="not only flash content"):
+        elf.to_binary(make_elf(sections))
+    # flash offset would be guessed
+    sections = [(0x10000000, 0x10000000, b"code")]
+    with pytest.raises(ValueError, match="not in a known flash region"):
+        elf.to_binary(make_elf(sections))
+
+
+def test_binary_firmware(tmp_path):
+    """Binary firmwares are cached by ELF content"""
+    elf_path = str(tmp_path / "firmware.elf")
+    with open(elf_path, "wb") as _fd:
+        _fd.write(make_elf(FIRMWARE_SECTIONS))
+    assert elf.is_elf(elf_path)
+    assert not elf.is_elf(os.path.join(os.path.dirname(__file__), "firmware.elf"))
+
+    disk_cache = cache.DiskCache(str(tmp_path / "cache"))
+    firmware = elf.BinaryFirmware(elf_path, disk_cache)
+    assert firmware.path == str(tmp_path / "firmware.bin")
+    assert firmware.offset == 0x1000
+    assert firmware.read() == b"code\0\0\0\0rodatadata"
+    assert firmware.size == 18
+    assert firmware == b"code\0\0\0\0rodatadata"
+
+    with patch("iotlabcli.elf.to_binary") as to_binary:
+        assert elf.BinaryFirmware(elf_path, disk_cache) == firmware
+        assert not to_binary.called
+        # Not cached
+        to_binary.return_value = (0, b"")
+        assert elf.BinaryFirmware(elf_path).size == 0
@@ -24,12 +24,13 @@
 # pylint: disable=invalid-name
 
 import argparse
+import json
 import unittest
 from io import StringIO
-from unittest.mock import patch
+from unittest.mock import ANY, call, patch
 
 import iotlabcli.parser.experiment as experiment_parser
-from iotlabcli import experiment
+from iotlabcli import experiment, helpers
 from iotlabcli.tests import resource_file
 from iotlabcli.tests.my_mock import MainMock
 
@@ -109,6 +110,11 @@ class TestMainInfoParser(MainMock):
         experiment_parser.main(["get", "--archive"])
         get_exp.assert_called_with(self.api, 123, "data")
 
+        experiment_parser.main(["get", "--archive", "--progress"])
+        # pylint:disable=protected-access
+        progress = experiment_parser._print_progress
+        get_exp.assert_called_with(self.api, 123, "data", progress)
+
         experiment_parser.main(
             ["get", "--list", "--state=Running", "--limit=10", "--offset=50"]
         )
@@ -117,6 +123,19 @@ class TestMainInfoParser(MainMock):
         experiment_parser.main(["get", "--list"])
         get_exp_list.assert_called_with(self.api, None, 0, 0)
 
+    @patch("iotlabcli.experiment.iter_experiments")
+    def test_main_get_all_parser(self, iter_exps):
+        """Run experiment_parser.main.get --list --all"""
+        iter_exps.return_value = iter([{"id": 1}, {"id": 2}])
+        with patch("builtins.print") as m_print:
+            experiment_parser.main(["get", "--list", "--all", "--state=Terminated"])
+        iter_exps.assert_called_with(self.api, "Terminated", 100)
+        m_print.assert_has_calls([call('{"id": 1}'), call('{"id": 2}')])
+
+        iter_exps.return_value = iter([])
+        experiment_parser.main(["get", "--list", "--all", "--limit=10"])
+        iter_exps.assert_called_with(self.api, None, 10)
+
     def test_parser_error(self):
         """Test some parser errors directly"""
         parser = experiment_parser.parse_options()
@@ -406,7 +425,13 @@ class TestMainInfoParser(MainMock):
 
         experiment_parser.main(["wait"])
         wait_exp.assert_called_with(
-            self.api, 234, "Running", 5, experiment.WAIT_TIMEOUT_DEFAULT, False
+            self.api,
+            234,
+            "Running",
+            5,
+            experiment.WAIT_TIMEOUT_DEFAULT,
+            False,
+            experiment.PollingStrategy(5),
         )
         experiment_parser.main(
             [
@@ -421,7 +446,15 @@ class TestMainInfoParser(MainMock):
                 "60",
             ]
         )
-        wait_exp.assert_called_with(self.api, 42, "Launching,Running", 1, 60, False)
+        wait_exp.assert_called_with(
+            self.api,
+            42,
+            "Launching,Running",
+            1,
+            60,
+            False,
+            experiment.PollingStrategy(1),
+        )
         experiment_parser.main(
             [
                 "wait",
@@ -434,9 +467,69 @@ class TestMainInfoParser(MainMock):
                 "--timeout",
                 "60",
                 "--cancel-on-timeout",
+                "--strategy",
+                "adaptive",
             ]
         )
-        wait_exp.assert_called_with(self.api, 42, "Launching,Running", 1, 60, True)
+        wait_exp.assert_called_with(
+            self.api,
+            42,
+            "Launching,Running",
+            1,
+            60,
+            True,
+            experiment.AdaptivePollingStrategy(1),
+        )
+
+    @patch("iotlabcli.helpers.exps_by_states_dict")
+    @patch("iotlabcli.experiment.wait_experiments")
+    def test_main_wait_many_parser(self, wait_exps, exps_by_states):
+        """Run experiment_parser.main.wait with several experiments"""
+        wait_exps.return_value = {"Running": [42, 43]}
+
+        experiment_parser.main(["wait", "--ids", "42,43", "--timeout", "60"])
+        wait_exps.assert_called_with(
+            self.api,
+            [42, 43],
+            "Running",
+            5,
+            60,
+            False,
+            experiment.PollingStrategy(5),
+            report=ANY,
+        )
+
+        exps_by_states.return_value = {"Waiting": [44, 45], "Running": [46]}
+        wait_exps.return_value = {"Terminated": [44, 45, 46]}
+        experiment_parser.main(["wait", "--all-active", "--state", "Terminated"])
+        exps_by_states.assert_called_with(self.api, helpers.ACTIVE_STATES)
+        self.assertEqual([44, 45, 46], wait_exps.call_args[0][1])
+        self.assertEqual("Terminated", wait_exps.call_args[0][2])
+
+    @patch("iotlabcli.experiment.wait_experiments")
+    def test_main_wait_many_failed(self, wait_exps):
+        """Waiting several experiments fails on timeout or stopped ones"""
+        args = ["wait", "--ids", "42,43,44"]
+        for summary in (
+            {"Running": [42, 43], "Timeout": [44]},
+            {"Running": [42, 43], "Error": [44]},
+            {"Running": [42], "Terminated": [43, 44]},
+        ):
+            wait_exps.return_value = summary
+            opts = experiment_parser.parse_options().parse_args(args)
+            with self.assertRaises(RuntimeError) as err:
+                experiment_parser.experiment_parse_and_run(opts)
+            self.assertIn(json.dumps(summary, sort_keys=True), str(err.exception))
+
+            with patch("sys.stdout", new_callable=StringIO) as stdout:
+                with self.assertRaises(SystemExit) as exit_err:
+                    experiment_parser.main(args)
+            self.assertNotEqual(exit_err.exception.code, 0)
+            self.assertEqual("", stdout.getvalue())
+
+        # Stopped states may be waited for
+        wait_exps.return_value = {"Terminated": [42, 43], "Error": [44]}
+        experiment_parser.main([*args, "--state", "Terminated,Error"])
 
     @patch("iotlabcli.experiment.load_experiment")
     def test_main_load_parser(self, load_exp):
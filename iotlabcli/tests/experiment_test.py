@@ -32,12 +32,15 @@
 # pylint:disable=attribute-defined-outside-init
 
 import json
+import os
+import tempfile
+import time
 import unittest
 from unittest import mock
-from unittest.mock import mock_open, patch
+from unittest.mock import call, patch
 
-from iotlabcli import experiment, helpers, rest, tests
-from iotlabcli.tests.my_mock import API_RET, CommandMock, RequestRet
+from iotlabcli import experiment, helpers, tests
+from iotlabcli.tests.my_mock import API_RET, CommandMock
 
 SCRIPTS = {
     "script.sh": (b'#! /bin/sh\necho "script.sh"\n'),
@@ -383,6 +386,11 @@ class TestExperimentSubmit(CommandMock):
         self.assertEqual(files_dict["script_2.sh"], SCRIPTS["script_2.sh"])
         self.assertEqual(files_dict["scriptconfig"], SCRIPTCONFIG["scriptconfig"])
 
+    def _chdir_resources(self):
+        """Run from tests directory, where experiment files are"""
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(os.path.dirname(tests.resource_file("firmware.elf")) or ".")
+
     def _read_file_for_load(self, file_path, *_):  # noqa: C901
         """read_file mock"""
         expected = self.expected
@@ -439,13 +447,17 @@ class TestExperimentSubmit(CommandMock):
             "reservation": None,
         }
         read_file_mock.side_effect = self._read_file_for_load
+        self._chdir_resources()
 
         experiment.load_experiment(self.api, experiment.EXP_FILENAME, ["firmware.elf"])
 
-        # read_file_calls
+        # read_file_calls, firmwares are only referenced
         _files = {_call[0][0] for _call in read_file_mock.call_args_list}
+        self.assertEqual(_files, set([experiment.EXP_FILENAME]))
+        files_dict = self.api.submit_experiment.call_args[0][0]
         self.assertEqual(
-            _files, set((experiment.EXP_FILENAME, "firmware.elf", "firmware_2.elf"))
+            set(files_dict),
+            set((experiment.EXP_FILENAME, "firmware.elf", "firmware_2.elf")),
         )
 
         self.assertRaises(
@@ -458,6 +470,35 @@ class TestExperimentSubmit(CommandMock):
 
         self.assertRaises(ValueError, self._read_file_for_load, "invalid/file/path")
 
+    @patch("iotlabcli.helpers.read_file")
+    def test_experiment_load_same_content(self, read_file_mock):
+        """Firmwares with the same content are all sent under their name"""
+        node_fmt = "m3-%u.grenoble.iot-lab.info"
+        self.expected = {
+            "duration": 20,
+            "nodes": [node_fmt % num for num in range(1, 3)],
+            "firmwareassociations": [
+                {"firmwarename": "sink.elf", "nodes": [node_fmt % 1]},
+                {"firmwarename": "node.elf", "nodes": [node_fmt % 2]},
+            ],
+            "type": "physical",
+        }
+        read_file_mock.side_effect = self._read_file_for_load
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("sink.elf", "node.elf"):
+                with open(os.path.join(tmp, name), "wb") as firmware:
+                    firmware.write(b"elf32arm")
+            self.addCleanup(os.chdir, os.getcwd())
+            os.chdir(tmp)
+
+            experiment.load_experiment(self.api, experiment.EXP_FILENAME)
+
+            files_dict = self.api.submit_experiment.call_args[0][0]
+            self.assertEqual(
+                set(files_dict), {experiment.EXP_FILENAME, "sink.elf", "node.elf"}
+            )
+            self.assertEqual(files_dict["sink.elf"], files_dict["node.elf"])
+
     @patch("iotlabcli.helpers.read_file")
     def test_experiment_load_with_script(self, read_file_mock):
         """Try experiment_load with script."""
@@ -492,15 +533,19 @@ class TestExperimentSubmit(CommandMock):
             "mobilities": None,
         }
         read_file_mock.side_effect = self._read_file_for_load
+        self._chdir_resources()
 
         experiment.load_experiment(self.api, experiment.EXP_FILENAME, ["script.sh"])
 
-        # read_file_calls
+        # read_file_calls, files are only referenced
         _files = {_call[0][0] for _call in read_file_mock.call_args_list}
+        self.assertEqual(_files, set([experiment.EXP_FILENAME]))
+        files_dict = self.api.submit_experiment.call_args[0][0]
         self.assertEqual(
-            _files,
+            set(files_dict),
             set((experiment.EXP_FILENAME, "firmware.elf", "script.sh", "scriptconfig")),
         )
+        self.assertEqual(files_dict["script.sh"], SCRIPTS["script.sh"])
 
 
 class TestSiteAssociation(unittest.TestCase):
@@ -672,6 +717,37 @@ class TestExperimentGet(CommandMock):
         experiment.get_experiments_list(self.api, "Running", 100, 100)
         self.api.get_experiments.assert_called_with("Running", 100, 100)
 
+    def test_iter_experiments(self):
+        """Test experiment.iter_experiments"""
+        exps = [{"id": num} for num in range(5)]
+        self.api.get_experiments = mock.Mock(
+            side_effect=lambda state, limit, offset: {
+                "items": exps[offset : offset + limit]
+            }
+        )
+
+        iterator = experiment.iter_experiments(self.api, "Terminated", page_size=2)
+        self.api.get_experiments.assert_not_called()
+        self.assertEqual(exps[0], next(iterator))
+        # first page and maybe the prefetched one
+        self.assertLessEqual(self.api.get_experiments.call_count, 2)
+
+        self.assertEqual(exps[1:], list(iterator))
+        self.assertEqual(
+            [
+                mock.call("Terminated", 2, 0),
+                mock.call("Terminated", 2, 2),
+                mock.call("Terminated", 2, 4),
+            ],
+            self.api.get_experiments.call_args_list,
+        )
+
+        # Last page full, stopped by an empty page
+        self.assertEqual(exps, list(experiment.iter_experiments(self.api, "", 5)))
+        self.api.get_experiments.assert_called_with(
+            helpers.check_experiment_state(""), 5, 5
+        )
+
     def test_get_experiment(self):
         """Test experiment.get_experiment"""
 
@@ -769,23 +845,127 @@ class TestExperimentWait(CommandMock):
         )
         stop_exp.assert_called_with(self.api, 123)
 
+    @patch("time.sleep")
+    def test_wait_experiment_strategy(self, sleep, get_exp, _):
+        """Test wait_experiment with polling strategies"""
+        self.wait_ret = ["Waiting", "Waiting", "toLaunch", "Launching", "Running"]
+        get_exp.side_effect = self._get_exp
 
-class TestExperimentGetWriteExpArchive(unittest.TestCase):
-    """Test iotlabcli.experiment.get archive"""
+        strategy = experiment.AdaptivePollingStrategy(step=5, jitter=False)
+        ret = experiment.wait_experiment(self.api, 123, strategy=strategy)
+        self.assertEqual("Running", ret)
+        self.assertEqual(5, strategy.polls)
+        self.assertEqual([call(5), call(10), call(1), call(1)], sleep.call_args_list)
+        self.assertEqual(17, strategy.slept)
+
+        # Sleep until shortly before the scheduled start
+        sleep.reset_mock()
+        self.wait_ret = ["Waiting", "Running"]
+        start = time.time() + 3600
+        get_exp.side_effect = lambda *_: {
+            "state": self.wait_ret.pop(0),
+            "start_date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start)),
+        }
+        strategy = experiment.AdaptivePollingStrategy(margin=60)
+        experiment.wait_experiment(self.api, 123, strategy=strategy)
+        self.assertAlmostEqual(start - 60 - time.time(), sleep.call_args[0][0], -1)
+
+    def test_polling_strategies(self, *_):
+        """Test polling strategies delays"""
+        fixed = experiment.PollingStrategy(step=3)
+        self.assertEqual([3, 3], [fixed.delay("Waiting"), fixed.delay("Launching")])
+
+        adaptive = experiment.AdaptivePollingStrategy(step=4, max_step=10)
+        for expected in (4, 8, 10, 10):
+            self.assertTrue(expected / 2 <= adaptive.delay("Waiting") <= expected)
+        # Back to fast polls, backoff is reset
+        self.assertEqual(1, adaptive.delay("Launching"))
+        self.assertEqual(4, adaptive.delay("Running"))
+        self.assertTrue(2 <= adaptive.delay("Waiting") <= 4)
+
+        # Never sleep after timeout
+        with patch("time.sleep") as sleep:
+            fixed.sleep("Waiting", 1.5)
+            fixed.sleep("Waiting", -1)
+        self.assertEqual([call(1.5), call(0.0)], sleep.call_args_list)
+
+
+@patch("time.sleep")
+class TestExperimentWaitMany(unittest.TestCase):
+    """Test iotlabcli.experiment.wait_experiments"""
+
+    def setUp(self):
+        self.api = mock.Mock()
+        self.listings = []
+        self.api.get_experiments.side_effect = lambda state: {
+            "items": self.listings.pop(0)
+        }
 
-    @patch("iotlabcli.experiment._write_experiment_archive")
-    def test_get_experiment(self, w_exp_archive):
-        """Test experiment.get_experiment"""
-        arch_content = "\x42\x69"
+    def test_wait_experiments(self, sleep):
+        """Wait several experiments with one list request per check"""
+        self.listings = [
+            [
+                {"id": 1, "state": "Waiting"},
+                {"id": 2, "state": "Launching"},
+                {"id": 3, "state": "Running"},
+                {"id": 10, "state": "Waiting"},  # not waited for
+            ],
+            [{"id": 1, "state": "Running"}, {"id": 2, "state": "Running"}],
+        ]
+        # ended experiment, not in the list
+        self.api.get_experiment_info.return_value = {"id": 4, "state": "Error"}
+        report = mock.Mock()
+        strategy = experiment.AdaptivePollingStrategy()
+
+        ret = experiment.wait_experiments(
+            self.api, [1, 2, 3, 4], strategy=strategy, report=report
+        )
+        self.assertEqual({"Running": [3, 1, 2], "Error": [4]}, ret)
+        report.assert_has_calls([call(3, "Running"), call(4, "Error")])
+        self.api.get_experiments.assert_called_with(
+            state="Waiting,toLaunch,Launching,Running"
+        )
+        self.api.get_experiment_info.assert_called_once_with(4, "")
+        self.assertEqual(2, strategy.polls)
+        # polled fast as one was Launching
+        sleep.assert_called_once_with(1)
+
+    def test_wait_experiments_timeout(self, sleep):
+        """Experiments still waited for at timeout are cancelled"""
+        waiting = [{"id": 1, "state": "Waiting"}, {"id": 2, "state": "Running"}]
+        self.api.get_experiments.side_effect = lambda state: {"items": waiting}
+
+        ret = experiment.wait_experiments(
+            self.api,
+            [1, 2],
+            "Terminated",
+            step=0.01,
+            timeout=0.05,
+            cancel_on_timeout=True,
+        )
+        self.assertEqual({"Timeout": [1, 2]}, ret)
+        self.api.get_experiments.assert_called_with(
+            state="Waiting,toLaunch,Launching,Running"
+        )
+        self.api.stop_experiment.assert_has_calls([call(1), call(2)])
+        self.assertTrue(sleep.called)
+
+
+class TestExperimentGetArchive(unittest.TestCase):
+    """Test iotlabcli.experiment.get archive"""
 
-        ret_val = RequestRet(content=arch_content, status_code=200)
-        patch("requests.request", return_value=ret_val).start()
-        api = rest.Api("user", "password")
+    def test_get_experiment(self):
+        """Test experiment.get_experiment 'data'"""
+        api = mock.Mock()
+        progress = mock.Mock()
 
         ret = experiment.get_experiment(api, 123, option="data")
         self.assertEqual(ret, "Written")
-        # encode, not real but easier for tests
-        w_exp_archive.assert_called_with(123, arch_content.encode("utf-8"))
+        api.get_experiment_archive.assert_called_with(123, "123.tar.gz", None)
+
+        experiment.get_experiment(api, 123, "data", progress)
+        api.get_experiment_archive.assert_called_with(123, "123.tar.gz", progress)
+        api.get_experiment_info.assert_not_called()
 
 
 class TestExperimentInfo(CommandMock):
@@ -801,19 +981,3 @@ class TestExperimentInfo(CommandMock):
 
         experiment.info_experiment(self.api, site="grenoble", archi="m3")
         self.api.get_nodes.assert_called_with(False, "grenoble", archi="m3")
-
-
-class TestWriteExperimentArchive(unittest.TestCase):
-    """Test iotlabcli.experiment._write_experiment_archive"""
-
-    @staticmethod
-    def test_write_experiment_archive():
-        """Test experiment._write_experiment_archive"""
-        open_name = "iotlabcli.experiment.open"
-        exp_data = "binary_content"
-        m_open = mock_open()
-        with patch(open_name, m_open, create=True):
-            experiment._write_experiment_archive(123, exp_data)
-
-            file_handle = m_open.return_value
-            file_handle.write.assert_called_with(exp_data)
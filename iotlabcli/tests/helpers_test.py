@@ -22,6 +22,7 @@
 """Test the iotlabcli.helpers module"""
 # pylint:disable=too-many-public-methods,redefined-outer-name
 
+import os
 import sys
 import unittest
 import warnings
@@ -154,16 +155,24 @@ def test_no_overwrite(file_dict):
     assert file_dict == {"a": 1, "b": 2}
 
 
-@patch("iotlabcli.helpers.read_file")
-def test_same_basename_files(read_file, file_dict):
+def _write_files(directory, files):
+    """Write `files` {relative_path: content} in `directory`"""
+    for name, content in files.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+
+def test_same_basename_files(tmp_path, file_dict):
     """Test FilesDict add_file methods
     when given two files with same basename."""
 
     files = {
         "a/1.elf": b"ELF32_1",
-        "~/iot-lab/b/1.elf": b"ELF32_2",
-        "/tmp/c/1.elf": b"ELF32_3",
+        "iot-lab/b/1.elf": b"ELF32_2",
+        "c/1.elf": b"ELF32_3",
     }
+    _write_files(tmp_path, files)
 
     keys = [
         "1.elf",
@@ -171,47 +180,41 @@ def test_same_basename_files(read_file, file_dict):
         "c7b7412e59348fb71ca8ec6619284f3f_1.elf",
     ]
 
-    def _read_file(name, *_):
-        """Read file mock."""
-
-        return files[name]
-
-    read_file.side_effect = _read_file
-
     # Add some files
-    input_files_dict = {"firmware": "a/1.elf"}
+    input_files_dict = {"firmware": str(tmp_path / "a/1.elf")}
     inserted = file_dict.add_files_from_dict(("firmware",), input_files_dict)
     assert inserted["firmware"] == keys[0]
     assert file_dict == {keys[0]: b"ELF32_1"}
 
     # Add some other files
-    input_files_dict = {"firmware": "~/iot-lab/b/1.elf"}
+    input_files_dict = {"firmware": str(tmp_path / "iot-lab/b/1.elf")}
     inserted = file_dict.add_files_from_dict(("firmware",), input_files_dict)
 
     assert inserted["firmware"] == keys[1]
     assert file_dict == {keys[0]: b"ELF32_1", keys[1]: b"ELF32_2"}
 
-    input_files_dict = {"firmware": "/tmp/c/1.elf"}
+    input_files_dict = {"firmware": str(tmp_path / "c/1.elf")}
     inserted = file_dict.add_files_from_dict(("firmware",), input_files_dict)
 
     assert inserted["firmware"] == keys[2]
     assert file_dict == {keys[0]: b"ELF32_1", keys[1]: b"ELF32_2", keys[2]: b"ELF32_3"}
 
+    # Same content is not added twice
+    assert file_dict.add_file(str(tmp_path / "a/1.elf")) == keys[0]
+    assert len(file_dict) == 3
 
-@patch("iotlabcli.helpers.read_file")
-def test_add_file_method(read_file, file_dict):
-    """Test FilesDict add_file methods."""
 
-    def _read_file(name, *_):
-        """Read file mock."""
-        files = {
+def test_add_file_method(tmp_path, monkeypatch, file_dict):
+    """Test FilesDict add_file methods."""
+    _write_files(
+        tmp_path,
+        {
             "1.elf": b"ELF32_1",
             "2.elf": b"ELF32_2",
             "prof.json": b"{}",
-        }
-        return files[name]
-
-    read_file.side_effect = _read_file
+        },
+    )
+    monkeypatch.chdir(tmp_path)
 
     # Add some files
     input_files_dict = {"firmware": "1.elf", "profile": "prof.json"}
@@ -226,3 +229,114 @@ def test_add_file_method(read_file, file_dict):
         "2.elf": b"ELF32_2",
         "prof.json": b"{}",
     }
+
+
+def test_file_ref(tmp_path):
+    """FileRef content is read lazily and compared by content"""
+    _write_files(tmp_path, {"a.elf": b"ELF32", "b.elf": b"ELF32", "c.elf": b"ELF33"})
+    ref = helpers.FileRef(str(tmp_path / "a.elf"))
+    assert ref.size == 5
+    assert ref == b"ELF32"
+    assert ref != b"ELF3"
+    assert ref != "ELF32"
+    assert ref == helpers.FileRef(str(tmp_path / "b.elf"))
+    assert ref != helpers.FileRef(str(tmp_path / "c.elf"))
+    assert ref.md5 == helpers.md5(b"ELF32")
+
+    ref.chunk_size = 2
+    assert list(ref.chunks()) == [b"EL", b"F3", b"2"]
+    assert ref.read() == b"ELF32"
+
+    # loaded content is kept
+    assert ref.load() is ref
+    os.remove(tmp_path / "a.elf")
+    assert list(ref.chunks()) == [b"ELF32"]
+
+    with pytest.raises(OSError):
+        helpers.FileRef(str(tmp_path / "missing.elf"))
+
+
+def test_files_dict_references(tmp_path):
+    """Files are hashed once whatever the number of references"""
+    _write_files(tmp_path, {"a/1.elf": b"ELF32_1", "b/1.elf": b"ELF32_2"})
+    files = [str(tmp_path / "a/1.elf"), str(tmp_path / "b/1.elf")] * 100
+
+    chunks = helpers.FileRef.chunks
+    with patch.object(helpers.FileRef, "chunks", autospec=True) as m_chunks:
+        m_chunks.side_effect = chunks
+        file_dict = helpers.FilesDict()
+        keys = {file_dict.add_file(path) for path in files}
+
+        assert keys == {"1.elf", "56d50b0f4f3216dd962e8911ec91c062_1.elf"}
+        assert m_chunks.call_count == 2
+
+        # the digests index is shared by FilesDict
+        assert helpers.FilesDict().add_file(files[1]) == "1.elf"
+        assert helpers.FileRef(files[1]).md5 == helpers.md5(b"ELF32_2")
+        assert m_chunks.call_count == 2
+
+
+def test_files_dict_same_content(tmp_path, file_dict):
+    """Files with the same content are added once, whatever their name"""
+    _write_files(
+        tmp_path,
+        {"a/sink.elf": b"ELF32_1", "b/node.elf": b"ELF32_1", "c/node.elf": b"ELF32_2"},
+    )
+    assert file_dict.add_file(str(tmp_path / "a/sink.elf")) == "sink.elf"
+    assert file_dict.add_file(str(tmp_path / "b/node.elf")) == "sink.elf"
+    assert file_dict.add_file(str(tmp_path / "c/node.elf")) == "node.elf"
+    assert file_dict == {"sink.elf": b"ELF32_1", "node.elf": b"ELF32_2"}
+
+    # Files referenced by their name
+    file_dict = helpers.FilesDict()
+    assert file_dict.add_file(str(tmp_path / "a/sink.elf"), dedupe=False) == "sink.elf"
+    assert file_dict.add_file(str(tmp_path / "b/node.elf"), dedupe=False) == "node.elf"
+    assert file_dict == {"sink.elf": b"ELF32_1", "node.elf": b"ELF32_1"}
+
+
+def test_file_ref_modified(tmp_path):
+    """Modified files are hashed again"""
+    _write_files(tmp_path, {"1.elf": b"ELF32_1"})
+    ref = helpers.FileRef(str(tmp_path / "1.elf"))
+    assert ref.md5 == helpers.md5(b"ELF32_1")
+
+    _write_files(tmp_path, {"1.elf": b"ELF32_2"})
+    os.utime(tmp_path / "1.elf", ns=(1, 1))  # even within mtime resolution
+    assert helpers.FileRef(str(tmp_path / "1.elf")).md5 == helpers.md5(b"ELF32_2")
+
+
+def test_node_id():
+    """NodeId are interned strings sorted as (site, archi, number)"""
+    urls = [
+        "m3-10.grenoble.iot-lab.info",
+        "a8-1.lille.iot-lab.info",
+        "m3-9.grenoble.iot-lab.info",
+        "a8-1.grenoble.iot-lab.info",
+    ]
+    nodes = [helpers.NodeId(url) for url in urls]
+    assert helpers.sorted_nodes(urls) == sorted(urls, key=helpers.node_url_sort_key)
+    assert helpers.sorted_nodes(nodes) == helpers.sorted_nodes(urls)
+    assert [node.sort_key for node in nodes] == [
+        helpers.node_sort_key(url) for url in urls
+    ]
+    assert helpers.sorted_nodes(["10", "9"]) == ["9", "10"]
+
+    assert helpers.NodeId(urls[0]) is helpers.NodeId(urls[0])
+    assert helpers.NodeId(urls[0]) in set(urls)
+    assert helpers.json_dumps([helpers.NodeId(urls[0])]) == f'[\n    "{urls[0]}"\n]'
+    assert not hasattr(nodes[0], "__dict__")
+
+    with pytest.raises(ValueError):
+        helpers.NodeId("grenoble")
+    with pytest.raises(ValueError):
+        helpers.sorted_nodes(["m3-1.grenoble.iot-lab.info", "grenoble"])
+
+
+def test_node_id_interned_size(monkeypatch):
+    """Interned NodeId are bounded, for long running processes"""
+    # pylint: disable=protected-access
+    monkeypatch.setattr(helpers, "NODES_INTERNED_SIZE", 10)
+    monkeypatch.setattr(helpers.NodeId, "_interned", {})
+    for num in range(25):
+        helpers.NodeId(f"m3-{num}.grenoble.iot-lab.info")
+        assert len(helpers.NodeId._interned) <= 10
@@ -0,0 +1,97 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Test the iotlabcli.intervals module"""
+
+import random
+
+import pytest
+
+from iotlabcli import helpers, intervals
+from iotlabcli.intervals import IntervalSet, NodesSet
+
+
+def test_interval_set_operations():
+    """IntervalSet operations match python sets ones"""
+    rand = random.Random(0)
+    for _ in range(200):
+        first = set(rand.sample(range(40), rand.randint(0, 30)))
+        second = set(rand.sample(range(40), rand.randint(0, 30)))
+        ids, other = IntervalSet.from_ints(first), IntervalSet.from_ints(second)
+
+        assert list(ids) == sorted(first)
+        assert len(ids) == len(first)
+        assert list(ids | other) == sorted(first | second)
+        assert list(ids & other) == sorted(first & second)
+        assert list(ids - other) == sorted(first - second)
+        assert [num in ids for num in range(-1, 41)] == [
+            num in first for num in range(-1, 41)
+        ]
+        if ids:
+            assert IntervalSet.from_short(str(ids)) == ids
+
+
+def test_interval_set_short_format():
+    """Parse and render the short format"""
+    ids = IntervalSet.from_short("8-12+1-5+6-7+3")
+    assert str(ids) == "1-12"
+    assert ids.ranges == ((1, 12),)
+    assert str(IntervalSet.from_short("1+3-4+10")) == "1+3-4+10"
+    assert not IntervalSet() and str(IntervalSet()) == ""
+    assert "3" not in ids
+    assert ids.bounds() == (1, 12)
+    assert str(ids.complement(0, 14)) == "0+13-14"
+
+    for invalid in ("", "3-3", "1-2-3", "a", "-1", "1+"):
+        with pytest.raises(ValueError):
+            IntervalSet.from_short(invalid)
+
+
+def test_nodes_set():
+    """NodesSet of different sites and archis"""
+    nodes = NodesSet.from_info("grenoble", "m3", "1-5000")
+    nodes |= NodesSet.from_info("lille", "a8", "1-3")
+    assert len(nodes) == 5003
+    assert len(nodes.ids[("grenoble", "m3")].ranges) == 1
+
+    excluded = NodesSet.from_urls(
+        [
+            "m3-10.grenoble.iot-lab.info",
+            "m3-11.grenoble.iot-lab.info",
+            "a8-2.lille.iot-lab.info",
+            "m3-2.lille.iot-lab.info",
+        ]
+    )
+    nodes -= excluded
+    assert nodes.short_lists() == ["grenoble,m3,1-9+12-5000", "lille,a8,1+3"]
+    assert "m3-12.grenoble.iot-lab.info" in nodes
+    assert "m3-11.grenoble.iot-lab.info" not in nodes
+
+    common = nodes & NodesSet.from_info("lille", "a8", "1-2")
+    assert common == NodesSet.from_info("lille", "a8", "1")
+    assert common.urls() == ["a8-1.lille.iot-lab.info"]
+    assert (nodes - nodes).short_lists() == []
+
+    urls = nodes.urls()
+    assert urls == helpers.sorted_nodes(urls)
+    assert NodesSet.from_urls(urls) == nodes
+    assert urls[0].endswith(intervals.DOMAIN_DNS)
@@ -113,8 +113,7 @@ def without_tools(function):
 def test_aggregator_main(entry):
     """test main parser dispatching for subcommands"""
 
-    with patch("iotlabcli.parser.main.iotlabaggregator") as mocked_module:
-        mocked_main = getattr(mocked_module, entry).main
+    with patch(f"iotlabaggregator.{entry}.main") as mocked_main:
         main_parser.main([entry, "-i", "123"])
         mocked_main.assert_called_with(["-i", "123"])
 
@@ -126,8 +125,7 @@ def test_aggregator_main(entry):
 def test_oml_main(entry):
     """test main parser dispatching for subcommands"""
 
-    with patch("iotlabcli.parser.main.oml_plot_tools") as mocked_module:
-        mocked_main = getattr(mocked_module, entry).main
+    with patch(f"oml_plot_tools.{entry}.main") as mocked_main:
         main_parser.main(["plot", entry, "-i", "123"])
         mocked_main.assert_called_with(["-i", "123"])
 
@@ -139,8 +137,7 @@ def test_oml_main(entry):
 def test_ssh_main():
     """test main parser dispatching for subcommands"""
 
-    with patch("iotlabcli.parser.main.iotlabsshcli") as mocked_module:
-        mocked_main = mocked_module.parser.open_linux_parser.main
+    with patch("iotlabsshcli.parser.open_linux_parser.main") as mocked_main:
         main_parser.main(["ssh", "-i", "123"])
         mocked_main.assert_called_with(["-i", "123"])
 
@@ -161,7 +158,7 @@ def test_aggregator_tools_detect():
     """
     tests that we detect the aggregator-tools correctly
     """
-    assert main_parser.iotlabaggregator
+    assert main_parser.plugin_installed("iotlabaggregator")
 
 
 @with_oml_plot_tools
@@ -169,7 +166,7 @@ def test_oml_plot_tools_detect():
     """
     tests that we detect the oml-plot-tools correctly
     """
-    assert main_parser.oml_plot_tools
+    assert main_parser.plugin_installed("oml_plot_tools")
 
 
 @with_ssh_tools
@@ -177,7 +174,7 @@ def test_ssh_tools_detect():
     """
     tests that we detect the ssh-cli-tools correctly
     """
-    assert main_parser.iotlabsshcli
+    assert main_parser.plugin_installed("iotlabsshcli")
 
 
 @without_tools
@@ -186,6 +183,55 @@ def test_detect_tools_not_installed():
     tests that we detect the non installed modules correctly
     """
 
-    assert not main_parser.iotlabaggregator
-    assert not main_parser.oml_plot_tools
-    assert not main_parser.iotlabsshcli
+    assert not main_parser.plugin_installed("iotlabaggregator")
+    assert not main_parser.plugin_installed("oml_plot_tools")
+    assert not main_parser.plugin_installed("iotlabsshcli")
+
+
+def test_plugins_lazy_loading():
+    """Installed plugins are available, and only imported when run"""
+    with (
+        patch("importlib.util.find_spec", return_value=True),
+        patch("importlib.import_module") as import_module,
+    ):
+        main_parser.main(["ssh", "-i", "123"])
+        import_module.assert_called_once_with("iotlabsshcli.parser.open_linux_parser")
+        import_module.return_value.main.assert_called_with(["-i", "123"])
+
+
+def _import_times(code):
+    """Return modules cumulative import times in microseconds, as given by
+    '-X importtime' when running `code` in a new process"""
+    cmd = [sys.executable, "-X", "importtime", "-c", code]
+    stderr = subprocess.run(cmd, capture_output=True, check=True, text=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def _imported_modules(*args):
+    """Return modules import times when running 'iotlab *args'"""
+    return _import_times(
+        f"from iotlabcli.parser import main; main.main({list(args)!r})"
+    )
+
+
+def test_startup_imports():
+    """Only the run subcommand modules are imported on startup"""
+    subcommands = {module.partition(":")[0] for module in main_parser.COMMANDS.values()}
+    plugins = {"iotlabaggregator", "iotlabsshcli", "oml_plot_tools", "matplotlib"}
+
+    imported = _imported_modules("help")
+    assert "iotlabcli.parser.main" in imported
+    assert not imported.keys() & (subcommands | plugins)
+    assert "requests" not in imported
+
+    # Modules loaded with 'importlib.import_module' are not reported by
+    # '-X importtime', only the modules they import
+    backends = {"iotlabcli.experiment", "iotlabcli.node", "iotlabcli.robot"}
+    imported = _imported_modules("status", "--help")
+    assert "iotlabcli.status" in imported
+    assert not imported.keys() & (backends | plugins)
@@ -41,11 +41,16 @@ class RequestRet:  # pylint:disable=too-few-public-methods
         self.content = content.encode("utf-8")
         self.headers = headers
         self.text = self.content.decode("utf-8")
+        self.closed = False
 
     def json(self):
         """Load output as JSON"""
         return json.loads(self.text)
 
+    def close(self):
+        """Release the connection"""
+        self.closed = True
+
 
 def api_mock(ret=None):
     """Return a mock of an api object
@@ -53,7 +58,7 @@ def api_mock(ret=None):
     """
     ret = ret or API_RET
     ret_val = RequestRet(content=json_dumps(ret), status_code=200)  # HTTP OK
-    patch("requests.request", return_value=ret_val).start()
+    patch("requests.Session.request", return_value=ret_val).start()
     api_class = patch("iotlabcli.rest.Api").start()
     api_class.return_value = Mock(wraps=Api("user", "password"))
     return api_class.return_value
@@ -21,6 +21,9 @@
 
 """Test the iotlabcli.parser.node module"""
 
+import json
+import os
+import tempfile
 from unittest.mock import patch
 
 import iotlabcli.parser.node as node_parser
@@ -79,6 +82,28 @@ class TestMainNodeParser(MainMock):
             self.api, "reset", 123, ["m3-1", "m3-2", "m3-3"], None
         )
 
+        # One request per site
+        node_parser.main(["--reset", "--parallel-sites"])
+        node_command.assert_called_with(
+            self.api, "reset", 123, ["m3-1", "m3-2", "m3-3"], None, parallel_sites=8
+        )
+        node_parser.main(["--start", "--parallel-sites", "2"])
+        node_command.assert_called_with(
+            self.api, "start", 123, ["m3-1", "m3-2", "m3-3"], None, parallel_sites=2
+        )
+
+        # Retry failed nodes
+        node_parser.main(["--reset", "--retry", "3"])
+        node_command.assert_called_with(
+            self.api, "reset", 123, ["m3-1", "m3-2", "m3-3"], None, retries=3
+        )
+
+        # Flash ELF firmware loadable content only
+        node_parser.main(["--flash", "tp.elf", "--strip-elf"])
+        node_command.assert_called_with(
+            self.api, "flash", 123, ["m3-1", "m3-2", "m3-3"], "tp.elf", strip_elf=True
+        )
+
     def test_main_update(self, list_nodes, node_command):
         """Run the parser.node.main function regarding update."""
         node_command.return_value = {"result": "test"}
@@ -148,3 +173,35 @@ class TestMainNodeParser(MainMock):
         node_parser.main(args)
         list_nodes.assert_called_with(self.api, 123, None, None)
         node_command.assert_called_with(self.api, "profile-reset", 123, [], None)
+
+    @patch("iotlabcli.node.flash_plan")
+    def test_main_flash_plan(self, flash_plan, list_nodes, node_command):
+        """Run the parser.node.main function with a flash plan."""
+        flash_plan.return_value = {"0": []}
+        with tempfile.TemporaryDirectory() as tmp:
+            plan_path = os.path.join(tmp, "plan.json")
+            with open(plan_path, "w", encoding="utf-8") as plan:
+                json.dump({"sink.elf": "grenoble,m3,1", "/fw.elf": ["m3-2"]}, plan)
+
+            args = ["--flash-plan", plan_path, "--retry", "2", "--strip-elf"]
+            node_parser.main(args)
+            flash_plan.assert_called_with(
+                self.api,
+                123,
+                {os.path.join(tmp, "sink.elf"): "grenoble,m3,1", "/fw.elf": ["m3-2"]},
+                retries=2,
+                strip_elf=True,
+            )
+            self.assertFalse(list_nodes.called)
+            self.assertFalse(node_command.called)
+
+            # Nodes are selected in the plan
+            flash_plan.reset_mock()
+            args = ["--flash-plan", plan_path, "-l", "grenoble,m3,1"]
+            self.assertRaises(SystemExit, node_parser.main, args)
+            self.assertFalse(flash_plan.called)
+
+            # Requests are per firmware, not per site
+            args = ["--flash-plan", plan_path, "--parallel-sites", "0"]
+            self.assertRaises(SystemExit, node_parser.main, args)
+            self.assertFalse(flash_plan.called)
@@ -25,11 +25,17 @@
 # Issues with 'mock'
 # pylint: disable=no-member,maybe-no-member,too-many-statements
 import json
+import os
+import tempfile
 import unittest
-from unittest.mock import patch
+from unittest.mock import Mock, patch
+from urllib.error import HTTPError
 
-from iotlabcli import node
+import requests
+
+from iotlabcli import node, rest
 from iotlabcli.tests import my_mock
+from iotlabcli.tests.elf_test import FIRMWARE_SECTIONS, make_elf
 
 
 class TestNode(unittest.TestCase):
@@ -38,12 +44,19 @@ class TestNode(unittest.TestCase):
     def tearDown(self):
         my_mock.api_mock_stop()
 
-    @patch("iotlabcli.helpers.read_file")
-    def test_node_command(self, read_file_mock):
+    def _file(self, name, content):
+        """Write a temporary `name` file with `content`"""
+        tmp = tempfile.TemporaryDirectory()  # pylint:disable=consider-using-with
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, name)
+        with open(path, "wb") as _fd:
+            _fd.write(content)
+        return path
+
+    def test_node_command(self):
         """Test 'node_command'"""
 
         nodes_list = ["m3-1", "m3-2", "m3-3"]
-        read_file_mock.return_value = "file_data"
 
         api = my_mock.api_mock()
 
@@ -68,19 +81,23 @@ class TestNode(unittest.TestCase):
         api.node_command.assert_called_with("monitoring", 123, nodes_list, "p_m3")
 
         api.reset_mock()
-        res = node.node_command(api, "flash", 123, nodes_list, "~/../filename.elf")
+        res = node.node_command(
+            api, "flash", 123, nodes_list, self._file("filename.elf", b"file_data")
+        )
         self.assertEqual(my_mock.API_RET, res)
         self.assertEqual(1, api.node_update.call_count)
         api.node_update.assert_called_with(
             123,
             {
-                "filename.elf": "file_data",
+                "filename.elf": b"file_data",
                 "nodes.json": '["m3-1", "m3-2", "m3-3"]',
             },
         )
 
         api.reset_mock()
-        res = node.node_command(api, "flash", 123, nodes_list, "~/../filename.bin")
+        res = node.node_command(
+            api, "flash", 123, nodes_list, self._file("filename.bin", b"file_data")
+        )
         self.assertEqual(my_mock.API_RET, res)
         self.assertEqual(1, api.node_update.call_count)
         api.node_update.assert_called_once()
@@ -106,13 +123,13 @@ class TestNode(unittest.TestCase):
         api.node_command.assert_called_with("flash-idle", 123, nodes_list)
 
         # profile-load
-        read_file_mock.return_value = "{profilejson}"  # no local content check
+        profile = self._file("profile.json", b"{profilejson}")  # no content check
         json_file = {
-            "profile.json": "{profilejson}",
+            "profile.json": b"{profilejson}",
             "nodes.json": '["m3-1", "m3-2", "m3-3"]',
         }
         api.reset_mock()
-        res = node.node_command(api, "profile-load", 123, nodes_list, "profile.json")
+        res = node.node_command(api, "profile-load", 123, nodes_list, profile)
         self.assertEqual(my_mock.API_RET, res)
         api.node_profile_load.assert_called_with(123, json_file)
 
@@ -126,3 +143,252 @@ class TestNode(unittest.TestCase):
         res = node.node_command(api, "profile-reset", 123, nodes_list)
         self.assertEqual(my_mock.API_RET, res)
         api.node_command.assert_called_with("profile-reset", 123, nodes_list)
+
+    def test_node_command_parallel_sites(self):
+        """Test 'node_command' with one request per site"""
+        api = Mock()
+
+        def _node_command(_command, _exp_id, nodes):
+            if "strasbourg" in nodes[0]:
+                raise HTTPError("url", 502, "Bad Gateway", {}, None)
+            return {"0": nodes[1:], "1": nodes[:1]}
+
+        api.node_command.side_effect = _node_command
+        api.get_experiment_info.return_value = {
+            "items": [
+                {"grenoble": {"m3:at86rf231": "1-3"}},
+                {"lille": {"a8": "5"}, "strasbourg": {"m3": "1"}},
+            ]
+        }
+
+        res = node.node_command(api, "reset", 123, parallel_sites=2)
+        api.get_experiment_info.assert_called_with(123, "nodes_ids")
+        self.assertEqual(api.node_command.call_count, 3)
+        api.node_command.assert_any_call("reset", 123, ["a8-5.lille.iot-lab.info"])
+        self.assertEqual(
+            res["0"], ["m3-2.grenoble.iot-lab.info", "m3-3.grenoble.iot-lab.info"]
+        )
+        self.assertEqual(
+            res["1"], ["m3-1.grenoble.iot-lab.info", "a8-5.lille.iot-lab.info"]
+        )
+        self.assertEqual(list(res["sites"]), ["grenoble", "lille", "strasbourg"])
+        self.assertNotIn("error", res["sites"]["grenoble"])
+        self.assertIn("Bad Gateway", res["sites"]["strasbourg"]["error"])
+        self.assertIsInstance(res["sites"]["lille"]["duration"], float)
+
+        # All sites failed
+        self.assertRaises(
+            HTTPError,
+            node.node_command,
+            api,
+            "reset",
+            123,
+            ["m3-1.strasbourg.iot-lab.info"],
+            parallel_sites=2,
+        )
+
+    @patch("requests.Session.request")
+    def test_node_command_parallel_sites_unreachable(self, request):
+        """An unreachable site does not abort other sites requests"""
+        api = rest.Api("user", "password")
+        nodes = ["m3-1.grenoble.iot-lab.info", "m3-1.strasbourg.iot-lab.info"]
+
+        def _request(_method, _url, **kwargs):
+            if "strasbourg" in kwargs["json"][0]:
+                raise requests.ConnectionError("strasbourg unreachable")
+            return my_mock.RequestRet(200, content=json.dumps({"0": kwargs["json"]}))
+
+        request.side_effect = _request
+        res = node.node_command(api, "reset", 123, nodes, parallel_sites=2)
+        self.assertEqual(res["0"], ["m3-1.grenoble.iot-lab.info"])
+        self.assertNotIn("error", res["sites"]["grenoble"])
+        self.assertIn("strasbourg unreachable", res["sites"]["strasbourg"]["error"])
+
+    @patch("time.sleep")
+    def test_node_command_retries(self, sleep):
+        """Test 'node_command' running again failed nodes"""
+        api = Mock()
+        failing = {"m3-2": 2, "m3-3": 5}
+
+        def _node_command(_command, _exp_id, nodes):
+            result = {}
+            for node_url in nodes:
+                failing[node_url] = failing.get(node_url, 0) - 1
+                code = "0" if failing[node_url] < 0 else "1"
+                result.setdefault(code, []).append(node_url)
+            return result
+
+        api.node_command.side_effect = _node_command
+        res = node.node_command(api, "reset", 123, ["m3-1", "m3-2", "m3-3"], retries=3)
+        self.assertEqual(
+            res,
+            {
+                "0": ["m3-1", "m3-2"],
+                "1": ["m3-3"],
+                "attempts": {"m3-2": 3, "m3-3": 4},
+            },
+        )
+        self.assertEqual(
+            [call.args[2] for call in api.node_command.call_args_list],
+            [["m3-1", "m3-2", "m3-3"], ["m3-2", "m3-3"], ["m3-2", "m3-3"], ["m3-3"]],
+        )
+        self.assertEqual(
+            [call.args[0] for call in sleep.call_args_list],
+            [node.RETRY_DELAY, 2 * node.RETRY_DELAY, 4 * node.RETRY_DELAY],
+        )
+
+        # No retry when all nodes succeed
+        api.node_command.reset_mock()
+        res = node.node_command(api, "reset", 123, ["m3-1"], retries=3)
+        self.assertEqual(res, {"0": ["m3-1"], "attempts": {}})
+        self.assertEqual(api.node_command.call_count, 1)
+
+    @patch("time.sleep")
+    def test_node_command_retries_errors(self, _):
+        """Failed retry requests do not drop previous rounds results"""
+        api = Mock()
+        api.node_command.side_effect = [
+            {"0": ["m3-1"], "1": ["m3-2", "m3-3"]},
+            HTTPError("url", 502, "Bad Gateway", {}, None),
+            {"0": ["m3-2"], "1": ["m3-3"]},
+        ]
+        res = node.node_command(api, "reset", 123, ["m3-1", "m3-2", "m3-3"], retries=2)
+        self.assertEqual(res["0"], ["m3-1", "m3-2"])
+        self.assertEqual(res["1"], ["m3-3"])
+        self.assertEqual(res["attempts"], {"m3-2": 3, "m3-3": 3})
+        self.assertIn("Bad Gateway", res["errors"][1])
+
+        # Last retry failed
+        api.node_command.side_effect = [
+            {"0": ["m3-1"], "1": ["m3-2"]},
+            HTTPError("url", 502, "Bad Gateway", {}, None),
+        ]
+        res = node.node_command(api, "reset", 123, ["m3-1", "m3-2"], retries=1)
+        self.assertEqual(res["0"], ["m3-1"])
+        self.assertEqual(res[node.REQUEST_ERROR], ["m3-2"])
+
+    @patch("time.sleep")
+    def test_node_command_retries_sites(self, _):
+        """Nodes of failed sites requests are retried"""
+        api = Mock()
+        unreachable = ["strasbourg"]
+
+        def _node_command(_command, _exp_id, nodes):
+            if "strasbourg" in nodes[0] and unreachable:
+                raise HTTPError("url", 502, unreachable.pop(), {}, None)
+            return {"0": nodes}
+
+        api.node_command.side_effect = _node_command
+        api.get_experiment_info.return_value = {
+            "items": [{"grenoble": {"m3": "1"}, "strasbourg": {"m3": "1-2"}}]
+        }
+        res = node.node_command(api, "reset", 123, parallel_sites=2, retries=1)
+        self.assertEqual(
+            res["0"],
+            [
+                "m3-1.grenoble.iot-lab.info",
+                "m3-1.strasbourg.iot-lab.info",
+                "m3-2.strasbourg.iot-lab.info",
+            ],
+        )
+        self.assertIn("strasbourg", res["sites"]["strasbourg"]["error"])
+        self.assertEqual(
+            res["attempts"],
+            {"m3-1.strasbourg.iot-lab.info": 2, "m3-2.strasbourg.iot-lab.info": 2},
+        )
+
+    @patch("time.sleep")
+    def test_node_command_retries_flash(self, _):
+        """Firmware is read once when flashing again failed nodes"""
+        firmware = self._file("filename.elf", b"file_data")
+        api = Mock()
+        api.node_update.side_effect = [{"1": ["m3-1"], "0": ["m3-2"]}, {"0": ["m3-1"]}]
+
+        res = node.node_command(api, "flash", 123, [], firmware, retries=1)
+        self.assertEqual(res, {"0": ["m3-1", "m3-2"], "attempts": {"m3-1": 2}})
+
+        files = [call.args[1] for call in api.node_update.call_args_list]
+        self.assertEqual(files[1]["nodes.json"], '["m3-1"]')
+        self.assertIs(files[0]["filename.elf"], files[1]["filename.elf"])
+        self.assertEqual(files[1]["filename.elf"].content, b"file_data")
+
+    def test_node_command_strip_elf(self):
+        """ELF firmwares are flashed as binary firmwares with 'strip_elf'"""
+        firmware = self._file("firmware.elf", make_elf(FIRMWARE_SECTIONS))
+        api = Mock(disk_cache=None)
+        api.node_update.return_value = {"0": ["m3-1"]}
+
+        node.node_command(api, "flash", 123, ["m3-1"], firmware, strip_elf=True)
+        files = api.node_update.call_args.args[1]
+        self.assertEqual(api.node_update.call_args.kwargs, {"binary": True})
+        self.assertEqual(files["firmware.bin"], b"code\0\0\0\0rodatadata")
+        self.assertEqual(
+            json.loads(files["experiment.json"]), {"nodes": ["m3-1"], "offset": 0x1000}
+        )
+
+        # Not ELF firmwares are sent as is
+        hex_firmware = self._file("firmware.hex", b":020000040800F2")
+        node.node_command(api, "flash", 123, [], hex_firmware, strip_elf=True)
+        self.assertIn("firmware.hex", api.node_update.call_args.args[1])
+
+        # With a flash plan
+        res = node.flash_plan(api, 123, {firmware: "grenoble,m3,1"}, strip_elf=True)
+        self.assertIn("firmware.bin", api.node_update.call_args.args[1])
+        self.assertEqual(list(res["firmwares"]), [firmware])
+
+    def test_flash_plan(self):
+        """Test 'flash_plan' flashing firmwares concurrently"""
+        sink = self._file("sink.elf", b"sink")
+        sensor = self._file("sensor.elf", b"sensor")
+        router = self._file("router.elf", b"sensor")  # same content
+        api = Mock()
+
+        def _node_update(_exp_id, files):
+            nodes = json.loads(files["nodes.json"])
+            if "sink.elf" in files:
+                raise HTTPError("url", 500, "Internal Server Error", {}, None)
+            return {"0": nodes[1:], "1": nodes[:1]}
+
+        api.node_update.side_effect = _node_update
+        plan = {
+            sink: "m3-1.grenoble.iot-lab.info",
+            sensor: ["grenoble,m3,2-4", "m3-10.grenoble.iot-lab.info"],
+            router: ["grenoble,m3,5"],
+        }
+        res = node.flash_plan(api, 123, plan)
+
+        self.assertEqual(api.node_update.call_count, 2)
+        files = [call.args[1] for call in api.node_update.call_args_list]
+        self.assertIn(
+            '"m3-5.grenoble.iot-lab.info", "m3-10.grenoble.iot-lab.info"]',
+            files[0]["nodes.json"] + files[1]["nodes.json"],
+        )
+        self.assertEqual(res["1"], ["m3-2.grenoble.iot-lab.info"])
+        self.assertEqual(len(res["0"]), 4)
+        self.assertEqual(list(res["firmwares"]), [sink, sensor])
+        self.assertIn("Internal Server Error", res["firmwares"][sink]["error"])
+
+        # Nodes selected twice
+        plan[router] = ["grenoble,m3,4-5"]
+        self.assertRaises(ValueError, node.flash_plan, api, 123, plan)
+        # No nodes
+        self.assertRaises(ValueError, node.flash_plan, api, 123, {sink: []})
+
+    def test_flash_plan_unreachable(self):
+        """A firmware request transport error does not abort the plan"""
+        sink = self._file("sink.elf", b"sink")
+        sensor = self._file("sensor.elf", b"sensor")
+        api = Mock()
+
+        def _node_update(_exp_id, files):
+            if "sensor.elf" in files:
+                raise rest.TransportError("Read timed out")
+            return {"0": json.loads(files["nodes.json"])}
+
+        api.node_update.side_effect = _node_update
+        res = node.flash_plan(
+            api, 123, {sink: "grenoble,m3,1", sensor: "grenoble,m3,2"}
+        )
+        self.assertEqual(res["0"], ["m3-1.grenoble.iot-lab.info"])
+        self.assertIn("Read timed out", res["firmwares"][sensor]["error"])
+        self.assertNotIn("error", res["firmwares"][sink])
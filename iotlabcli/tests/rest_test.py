@@ -24,13 +24,24 @@
 # pylint: disable=too-many-public-methods
 # pylint: disable=protected-access
 import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
-from unittest.mock import patch
+from unittest.mock import ANY, Mock, call, patch
 from urllib.error import HTTPError
 
-from iotlabcli import rest
+import requests
+
+from iotlabcli import cache, helpers, rest, tests
 from iotlabcli.helpers import json_dumps
 from iotlabcli.tests.my_mock import RequestRet
+from iotlabcli.tests.stub_server import StubServer, stub_server
+
+TIMEOUT = rest.RetryPolicy().timeout("get")
+UNRETRIED_TIMEOUT = rest.RetryPolicy().timeout("post")
 
 
 class TestRest(unittest.TestCase):
@@ -51,14 +62,14 @@ class TestRest(unittest.TestCase):
     def test_method_no_content(self):
         """Test Api.method rest code 204"""
         ret_val = RequestRet(204, content="")
-        m_req = patch("requests.request", return_value=ret_val).start()
+        m_req = patch("requests.Session.request", return_value=ret_val).start()
         _auth = self.api.auth
 
         ret = self.api.method("resources/123", "delete")
         m_req.assert_called_with(
             "delete",
             self._url + "resources/123",
-            timeout=None,
+            timeout=UNRETRIED_TIMEOUT,
             files=None,
             json=None,
             auth=_auth,
@@ -69,7 +80,7 @@ class TestRest(unittest.TestCase):
         """Test Api.method rest submission"""
         ret_expected = {"test": "val"}
         ret_val = RequestRet(200, content=json_dumps(ret_expected))
-        m_req = patch("requests.request", return_value=ret_val).start()
+        m_req = patch("requests.Session.request", return_value=ret_val).start()
 
         # pylint:disable=protected-access
         _auth = self.api.auth
@@ -77,12 +88,24 @@ class TestRest(unittest.TestCase):
         # call get
         ret = self.api.method("page")
         m_req.assert_called_with(
-            "get", self._url + "page", timeout=None, files=None, json=None, auth=_auth
+            "get",
+            self._url + "page",
+            timeout=TIMEOUT,
+            files=None,
+            json=None,
+            auth=_auth,
+            headers=None,
         )
         self.assertEqual(ret_expected, ret)
         ret = self.api.method("page?1", "get")
         m_req.assert_called_with(
-            "get", self._url + "page?1", timeout=None, files=None, json=None, auth=_auth
+            "get",
+            self._url + "page?1",
+            timeout=TIMEOUT,
+            files=None,
+            json=None,
+            auth=_auth,
+            headers=None,
         )
         self.assertEqual(ret_expected, ret)
 
@@ -91,7 +114,7 @@ class TestRest(unittest.TestCase):
         m_req.assert_called_with(
             "delete",
             self._url + "deeel",
-            timeout=None,
+            timeout=UNRETRIED_TIMEOUT,
             files=None,
             json=None,
             auth=_auth,
@@ -103,24 +126,27 @@ class TestRest(unittest.TestCase):
         m_req.assert_called_with(
             "post",
             self._url + "post_page",
-            timeout=None,
+            timeout=UNRETRIED_TIMEOUT,
             files=None,
             json={},
             auth=_auth,
         )
         self.assertEqual(ret_expected, ret)
 
-        # call multipart
+        # call multipart, streamed as data
         _files = {"entry": "{}"}
         ret = self.api.method("multip", "post", files=_files)
         m_req.assert_called_with(
             "post",
             self._url + "multip",
-            timeout=None,
-            files=_files,
+            timeout=UNRETRIED_TIMEOUT,
+            files=None,
+            data=ANY,
+            headers={"Content-Type": ANY},
             json=None,
             auth=_auth,
         )
+        self.assertIsInstance(m_req.call_args.kwargs["data"], rest.MultipartBody)
         self.assertEqual(ret_expected, ret)
         patch.stopall()
 
@@ -147,7 +173,7 @@ class TestRest(unittest.TestCase):
     def test_check_credentials(self):
         """Test Api.method rest submission"""
         ret_val = RequestRet(200, content='"OK"')
-        patch("requests.request", return_value=ret_val).start()
+        patch("requests.Session.request", return_value=ret_val).start()
 
         ret_val.status_code = 200
         self.assertTrue(self.api.check_credential())
@@ -165,7 +191,7 @@ class TestRest(unittest.TestCase):
         test_ssh_keys = '{"sshkey": ["test"]}'
         test_ssh_keys_json = json.loads(test_ssh_keys)
         ret_val = RequestRet(200, content=test_ssh_keys)
-        patch("requests.request", return_value=ret_val).start()
+        patch("requests.Session.request", return_value=ret_val).start()
         assert self.api.get_ssh_keys() == test_ssh_keys_json
         assert self.api.set_ssh_keys(test_ssh_keys_json) is None
         patch.stopall()
@@ -173,7 +199,7 @@ class TestRest(unittest.TestCase):
     def test_method_raw(self):
         """Run as Raw mode"""
         ret_val = RequestRet(200, content="text_only")
-        with patch("requests.request", return_value=ret_val):
+        with patch("requests.Session.request", return_value=ret_val):
             ret = self.api.method(self._url, raw=True)
             self.assertEqual(ret, "text_only".encode("utf-8"))
 
@@ -181,14 +207,145 @@ class TestRest(unittest.TestCase):
         """Test Api.method rest submission error cases"""
         # invalid status code
         ret_val = RequestRet(404, content="return_text")
-        with patch("requests.request", return_value=ret_val):
+        with patch("requests.Session.request", return_value=ret_val):
             self.assertRaises(HTTPError, self.api.method, self._url)
 
         # using older requests version fail because of json argument
-        with patch("requests.request", side_effect=TypeError()):
+        with patch("requests.Session.request", side_effect=TypeError()):
             self.assertRaises(RuntimeError, self.api.method, self._url)
 
 
+class TestApiUrl(unittest.TestCase):
+    """Test Api.url lazy resolution"""
+
+    @patch("iotlabcli.helpers.read_custom_api_url")
+    def test_api_url(self, read_url):
+        """Test url is read on first access only"""
+
+        class _Api:  # pylint:disable=too-few-public-methods
+            url = rest._ApiUrl()
+
+        read_url.return_value = None
+        read_url.assert_not_called()
+        self.assertEqual(_Api.url, "https://www.iot-lab.info/api/")
+        self.assertEqual(_Api().url, "https://www.iot-lab.info/api/")
+        read_url.assert_called_once_with()
+
+        api = _Api()
+        api.url = "http://localhost/api/"
+        self.assertEqual(api.url, "http://localhost/api/")
+        self.assertEqual(_Api.url, "https://www.iot-lab.info/api/")
+
+    def test_import_side_effects(self):
+        """Test importing iotlabcli.rest does not read the custom api url"""
+        with tempfile.TemporaryDirectory() as home:
+            with open(os.path.join(home, ".iotlab.api-url"), "w") as url_file:
+                url_file.write("http://localhost/api/")
+            code = "from iotlabcli import rest; print('imported', flush=True)"
+            env = dict(os.environ, HOME=home)
+            cmd = [sys.executable, "-c", code]
+            ret = subprocess.run(cmd, env=env, capture_output=True, check=True)
+            self.assertEqual(ret.stderr, b"")
+
+            cmd[-1] += "; print(rest.Api.url)"
+            ret = subprocess.run(cmd, env=env, capture_output=True, check=True)
+            self.assertEqual(ret.stdout, b"imported\nhttp://localhost/api/\n")
+            self.assertIn(b"Using custom api_url", ret.stderr)
+
+
+class TestRestSession(unittest.TestCase):
+    """Test the Api keep-alive session"""
+
+    def test_connection_reused(self):
+        """Successive calls go through one kept alive connection"""
+        routes = {"/experiments/123": {"state": "Running"}}
+        with stub_server(routes) as server:
+            api = rest.Api("user", "password", pool_size=2)
+            api.url = server.url
+            for _ in range(5):
+                self.assertEqual({"state": "Running"}, api.get_experiment_info(123))
+
+        self.assertEqual(5, len(server.requests))
+        self.assertEqual(1, server.connections)
+
+    def test_shared_session(self):
+        """Api objects share one session unless a pool size is given"""
+        session = rest.Api.shared_session()
+        self.assertIs(session, rest.Api(None, None).session)
+        self.assertIs(session, rest.Api("user", "password").session)
+        self.assertIsNot(session, rest.Api(None, None, pool_size=1).session)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test Api requests timeouts and retries"""
+
+    _url = "http://url.test.org/rest/"
+
+    def setUp(self):
+        self.sleep = patch("time.sleep").start()
+        self.hook = Mock()
+        self.policy = rest.RetryPolicy(retries=2, hook=self.hook)
+        self.api = rest.Api("user", "password", retry_policy=self.policy)
+        self.api.url = self._url
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_get_retried(self):
+        """GET requests are retried on transient errors"""
+        side_effect = [
+            RequestRet(502, content="Bad Gateway"),
+            requests.ConnectionError(),
+            RequestRet(200, content='{"state": "Running"}'),
+        ]
+        m_req = patch("requests.Session.request", side_effect=side_effect).start()
+
+        self.assertEqual({"state": "Running"}, self.api.get_experiment_info(123))
+        self.assertEqual(3, m_req.call_count)
+        self.assertEqual(2, self.sleep.call_count)
+        self.assertTrue(side_effect[0].closed)  # connection released
+        self.assertFalse(side_effect[2].closed)
+        self.hook.assert_called_once_with("get", self._url + "experiments/123", 3, ANY)
+
+    def test_retries_exhausted(self):
+        """Last error is raised when retries are exhausted"""
+        ret_val = RequestRet(503, content="Unavailable")
+        m_req = patch("requests.Session.request", return_value=ret_val).start()
+        with self.assertRaises(HTTPError) as err:
+            self.api.get_nodes()
+        self.assertEqual(503, err.exception.code)
+        self.assertEqual(3, m_req.call_count)
+
+        m_req.side_effect = requests.Timeout()
+        m_req.reset_mock()
+        self.assertRaises(rest.TransportError, self.api.get_sites_details)
+        self.assertEqual(3, m_req.call_count)
+        self.hook.assert_called_with("get", self._url + "sites/details", 3, ANY)
+
+    def test_not_transient_error(self):
+        """Other errors are not retried"""
+        ret_val = RequestRet(404, content="Not Found")
+        m_req = patch("requests.Session.request", return_value=ret_val).start()
+        self.assertRaises(HTTPError, self.api.get_experiment_info, 123)
+        self.assertEqual(1, m_req.call_count)
+        self.sleep.assert_not_called()
+
+    def test_post_opt_in(self):
+        """POST requests are only retried if added to policy methods"""
+        ret_val = RequestRet(502, content="Bad Gateway")
+        m_req = patch("requests.Session.request", return_value=ret_val).start()
+        self.assertRaises(HTTPError, self.api.node_command, "reset", 123)
+        self.assertEqual(1, m_req.call_count)
+        # may run long, no read timeout
+        self.assertEqual((10.0, None), m_req.call_args.kwargs["timeout"])
+
+        self.policy.methods = ("get", "post")
+        m_req.reset_mock()
+        self.assertRaises(HTTPError, self.api.node_command, "reset", 123)
+        self.assertEqual(3, m_req.call_count)
+        self.assertEqual((10.0, 300.0), m_req.call_args.kwargs["timeout"])
+
+
 class TestGetNodesSelection(unittest.TestCase):
     """Test get_nodes selection."""
 
@@ -207,6 +364,284 @@ class TestGetNodesSelection(unittest.TestCase):
         _method.assert_called_with("nodes/ids?archi=a8&site=lille&state=Busy")
 
 
+class TestConditionalGet(unittest.TestCase):
+    """Test GET results revalidation with ETag and Last-Modified"""
+
+    routes = {"/nodes": {"items": [{"network_address": "m3-1.grenoble.iot-lab.info"}]}}
+
+    def _api(self, server, disk_cache=None):
+        api = rest.Api("user", "password", pool_size=1)
+        api.url = server.url
+        api.disk_cache = disk_cache
+        return api
+
+    def test_etag_revalidation(self):
+        """Unchanged content is answered with a 304 and reused"""
+        routes = dict(self.routes)
+        with stub_server(routes, validators=("ETag",)) as server:
+            api = self._api(server)
+            self.assertEqual(self.routes["/nodes"], api.get_nodes())
+            self.assertEqual(self.routes["/nodes"], api.get_nodes())
+            self.assertEqual(1, server.not_modified)
+
+            routes["/nodes"] = {"items": []}
+            self.assertEqual({"items": []}, api.get_nodes())
+            self.assertEqual(1, server.not_modified)
+
+    def test_last_modified_revalidation(self):
+        """Last-Modified is used when there is no ETag"""
+        with stub_server(dict(self.routes), validators=("Last-Modified",)) as server:
+            api = self._api(server)
+            api.get_nodes()
+            self.assertEqual(self.routes["/nodes"], api.get_nodes())
+            self.assertEqual(1, server.not_modified)
+
+    def test_no_validators(self):
+        """Content without validators is always downloaded again"""
+        with stub_server(dict(self.routes)) as server:
+            api = self._api(server)
+            api.get_nodes()
+            self.assertEqual(self.routes["/nodes"], api.get_nodes())
+            self.assertEqual(0, server.not_modified)
+            self.assertEqual({}, rest.Api._validated)
+
+    @patch("iotlabcli.rest.VALIDATED_SIZE", 2)
+    def test_validated_entries(self):
+        """Only last inventory entries are kept for revalidation"""
+        routes = {f"/nodes?site=site-{num}": {"items": []} for num in range(3)}
+        routes["/experiments?state=Running&offset=0"] = {"items": []}
+        with stub_server(routes, validators=("ETag",)) as server:
+            api = self._api(server)
+            api.method("experiments?state=Running&offset=0")
+            for num in (0, 1, 0, 2):
+                api.method(f"nodes?site=site-{num}")
+            self.assertEqual(
+                [key.rsplit(" ", 1)[1] for key in rest.Api._validated],
+                ["nodes?site=site-0", "nodes?site=site-2"],
+            )
+            self.assertEqual(1, server.not_modified)
+
+    def test_disk_cache_revalidation(self):
+        """Expired disk cache entries are revalidated with stored validators"""
+        disk_cache = cache.DiskCache(ttls={"nodes": 0})
+        with stub_server(dict(self.routes), validators=("ETag",)) as server:
+            self._api(server, disk_cache).get_nodes()
+            # new process: only the disk cache remains
+            rest.Api._validated.clear()
+            api = self._api(server, disk_cache)
+            self.assertEqual(self.routes["/nodes"], api.get_nodes())
+            self.assertEqual(1, server.not_modified)
+
+
+class TestCurrentExperimentCache(unittest.TestCase):
+    """Test current experiment lookups cached on disk"""
+
+    running = "/experiments?state=Running&limit=0&offset=0"
+    routes = {running: {"items": [{"id": 123, "state": "Running"}]}}
+
+    def _api(self, server):
+        api = rest.Api("user", "password", pool_size=1)
+        api.url = server.url
+        api.disk_cache = cache.DiskCache()
+        return api
+
+    def _lookups(self, server):
+        return server.requests.count(self.running)
+
+    def test_shared_between_processes(self):
+        """Current experiment is looked up once for its time to live"""
+        with stub_server(self.routes) as server:
+            self.assertEqual(123, helpers.get_current_experiment(self._api(server)))
+            self.assertEqual(123, helpers.get_current_experiment(self._api(server)))
+            self.assertEqual(1, self._lookups(server))
+
+            # other user
+            api = self._api(server)
+            api.auth.username = "other"
+            self.assertEqual(123, helpers.get_current_experiment(api))
+            self.assertEqual(2, self._lookups(server))
+
+            # expired
+            with patch("time.time", return_value=time.time() + 60):
+                helpers.get_current_experiment(self._api(server))
+            self.assertEqual(3, self._lookups(server))
+
+    def test_invalidation(self):
+        """Experiment changes and errors forget the current experiment"""
+        with stub_server(self.routes) as server:
+            api = self._api(server)
+            helpers.get_current_experiment(api)
+
+            api.stop_experiment(123)
+            helpers.get_current_experiment(api)
+            api.reload_experiment(123)
+            helpers.get_current_experiment(api)
+            self.assertEqual(3, self._lookups(server))
+
+            # node commands do not change the current experiment
+            api.node_command("reset", 123)
+            helpers.get_current_experiment(api)
+            self.assertEqual(3, self._lookups(server))
+
+            # rejected experiment
+            self.assertRaises(HTTPError, api.get_experiment_info, 123)
+            helpers.get_current_experiment(api)
+            self.assertEqual(4, self._lookups(server))
+
+    def test_shared_in_process(self):
+        """Without disk cache, lookups are shared in shared blocks"""
+        with stub_server(self.routes) as server:
+            api = self._api(server)
+            api.disk_cache = None
+            helpers.get_current_experiment(api)
+            with helpers.shared_current_experiment():
+                helpers.get_current_experiment(api)
+                helpers.get_current_experiment(api)
+                self.assertEqual(2, self._lookups(server))
+                api.stop_experiment(123)
+                helpers.get_current_experiment(api)
+            self.assertEqual(3, self._lookups(server))
+
+
+class TestDownload(unittest.TestCase):
+    """Test streamed downloads to files"""
+
+    archive = bytes(range(256)) * 10
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()  # pylint:disable=consider-using-with
+        self.path = os.path.join(self.tmp.name, "123.tar.gz")
+        self.routes = {"/experiments/123/data": self.archive}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _api(self, server):
+        api = rest.Api("user", "password", pool_size=1)
+        api.url = server.url
+        api.chunk_size = 1024
+        return api
+
+    def _read(self, path):
+        with open(path, "rb") as archive:
+            return archive.read()
+
+    def _write_part(self, content, validator=None):
+        with open(self.path + ".part", "wb") as part:
+            part.write(content)
+        if validator is not None:
+            with open(self.path + ".part.validator", "w", encoding="utf-8") as _fd:
+                _fd.write(validator)
+
+    def test_download(self):
+        """Archive is written by chunks with progress"""
+        progress = Mock()
+        with stub_server(self.routes, ("ETag",)) as server:
+            self._api(server).get_experiment_archive(123, self.path, progress)
+
+        self.assertEqual(self.archive, self._read(self.path))
+        self.assertEqual([os.path.basename(self.path)], os.listdir(self.tmp.name))
+        progress.assert_has_calls([call(1024, 2560), call(2048, 2560)])
+        progress.assert_called_with(2560, 2560)
+
+    def test_resume(self):
+        """A partial download is resumed with a Range request"""
+        etag = f'"{helpers.md5(self.archive)}"'
+        for validators, validator in (
+            (("ETag",), etag),
+            (("Last-Modified",), StubServer.LAST_MODIFIED),
+        ):
+            self._write_part(self.archive[:1000], validator)
+
+            progress = Mock()
+            with stub_server(self.routes, validators) as server:
+                self._api(server).get_experiment_archive(123, self.path, progress)
+
+            self.assertEqual(self.archive, self._read(self.path))
+            progress.assert_has_calls([call(2024, 2560), call(2560, 2560)])
+            self.assertEqual([os.path.basename(self.path)], os.listdir(self.tmp.name))
+
+    def test_resume_other_content(self):
+        """A partial download of another content is downloaded again"""
+        # stale validator, the server sends the whole new content
+        self._write_part(b"garbage", '"stale"')
+        with stub_server(self.routes, ("ETag",)) as server:
+            self._api(server).get_experiment_archive(123, self.path)
+            self.assertEqual(1, len(server.requests))
+        self.assertEqual(self.archive, self._read(self.path))
+
+        # no validator, the part is not resumed
+        self._write_part(b"garbage")
+        with stub_server(self.routes) as server:
+            self._api(server).get_experiment_archive(123, self.path)
+        self.assertEqual(self.archive, self._read(self.path))
+
+    def test_interrupted_validator(self):
+        """Validator of the downloaded content is kept with its part"""
+        with stub_server(self.routes, ("ETag", "Last-Modified")) as server:
+            api = self._api(server)
+            with patch("os.replace", side_effect=OSError("interrupted")):
+                self.assertRaises(OSError, api.get_experiment_archive, 123, self.path)
+        with open(self.path + ".part.validator", encoding="utf-8") as _fd:
+            self.assertEqual(f'"{helpers.md5(self.archive)}"', _fd.read())
+
+    def test_resume_not_satisfiable(self):
+        """A partial download that cannot be resumed is downloaded again"""
+        self._write_part(self.archive + b"garbage", StubServer.LAST_MODIFIED)
+
+        with stub_server(self.routes, ("Last-Modified",)) as server:
+            self._api(server).get_experiment_archive(123, self.path)
+            self.assertEqual(2, len(server.requests))
+
+        self.assertEqual(self.archive, self._read(self.path))
+
+    def test_download_error(self):
+        """Errors are raised and nothing is written"""
+        with stub_server({}) as server:
+            api = self._api(server)
+            self.assertRaises(HTTPError, api.get_experiment_archive, 123, self.path)
+
+        self.assertEqual([], os.listdir(self.tmp.name))
+
+
+class TestMultipartBody(unittest.TestCase):
+    """Test streamed multipart bodies"""
+
+    def setUp(self):
+        self.files = helpers.FilesDict()
+        self.files["nodes.json"] = '["m3-1"]'
+        self.files["raw"] = b"\x00\x01"
+        self.files.add_file(tests.resource_file("firmware.elf"))
+
+    def test_encoding(self):
+        """Body is encoded as requests encodes files"""
+        loaded = {
+            key: value.read() if isinstance(value, helpers.FileRef) else value
+            for key, value in self.files.items()
+        }
+        with patch("urllib3.filepost.choose_boundary", return_value="boundary"):
+            body = rest.MultipartBody(self.files)
+            # pylint:disable=protected-access
+            encoded = requests.models.RequestEncodingMixin._encode_files(loaded, {})
+
+        self.assertEqual(encoded, (b"".join(body), body.content_type))
+        self.assertEqual(len(encoded[0]), len(body))
+        # can be iterated again on retries
+        self.assertEqual(encoded[0], b"".join(body))
+
+    def test_upload(self):
+        """Firmware is streamed with its Content-Length"""
+        with stub_server({}) as server:
+            api = rest.Api("user", "password", pool_size=1)
+            api.url = server.url
+            self.assertEqual({}, api.node_update(123, self.files))
+
+        path, headers, body = server.posted[0]
+        self.assertEqual("/experiments/123/nodes/flash", path)
+        self.assertEqual(str(len(body)), headers["Content-Length"])
+        self.assertIn(self.files["firmware.elf"].read(), body)
+
+
 class TestGetCircuitsSelection(unittest.TestCase):
     """Test get_circuits selection."""
 
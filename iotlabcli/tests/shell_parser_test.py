@@ -0,0 +1,96 @@
+# -*- coding:utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Test the iotlabcli.parser.shell module"""
+
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+
+from iotlabcli.parser import shell as shell_parser
+
+RUNNING = "/experiments?state=Running&limit=0&offset=0"
+ROUTES = {
+    "/sites": {"items": [{"site": "grenoble"}]},
+    "/nodes": {
+        "items": [
+            {"network_address": "m3-1.grenoble.iot-lab.info", "site": "grenoble"},
+            {"network_address": "m3-2.grenoble.iot-lab.info", "site": "grenoble"},
+            {"network_address": "a8-1.saclay.iot-lab.info", "site": "saclay"},
+        ]
+    },
+    RUNNING: {"items": [{"id": 123, "state": "Running"}]},
+}
+
+
+def test_shell(api_server, capsys):
+    """Commands share the current experiment lookup"""
+    commands = [
+        "node --reset -l grenoble,m3,1",
+        "",
+        "node --reset -l grenoble,m3,2",
+        "status --unknown",
+        "help node",
+        "exit",
+    ]
+    with patch("sys.stdin", io.StringIO("\n".join(commands))):
+        shell_parser.main(["--no-cache"])
+
+    out, err = capsys.readouterr()
+    assert out.count("iotlab> ") == len(commands)
+    assert "usage: iotlab node" in out
+    assert "usage: iotlab status" in err
+    assert api_server.requests.count(RUNNING) == 1
+    assert len(api_server.posted) == 2
+
+
+@pytest.mark.usefixtures("api_server")
+def test_shell_results(capsys):
+    """Commands results are printed, the shell exits on end of file"""
+    with patch("sys.stdin", io.StringIO("experiment --jmespath Running get -e")):
+        shell_parser.main(["--no-cache"])
+    out = capsys.readouterr().out
+    assert json.loads(out.split("iotlab> ")[1]) == [123]
+
+
+def test_completion(api_server):
+    """Complete commands, options and nodes lists"""
+    shell = shell_parser.Shell(None, None)
+
+    assert shell.completenames("st") == ["status"]
+    assert shell.complete_help("ro", "help ro", 5, 7) == ["robot"]
+
+    def _complete(line):
+        text = line.split(" ")[-1]
+        return shell.completedefault(text, line, len(line) - len(text), len(line))
+
+    assert _complete("node --res") == ["--reset"]
+    assert _complete("experiment sub") == ["submit"]
+    assert "--id" in _complete("experiment get --")
+    assert {"-l", "--exclude", "-i"} <= set(_complete("robot status -"))
+    assert _complete("unknown -") == []
+
+    assert _complete("node --reset -l ") == ["grenoble,m3,", "saclay,a8,"]
+    assert _complete("node --reset -e sa") == ["saclay,a8,"]
+    assert api_server.requests.count("/nodes") == 1
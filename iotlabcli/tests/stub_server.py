@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Local HTTP server stubbing the REST API for tests and benchmarks"""
+
+import contextlib
+import hashlib
+import json
+import re
+import threading
+from collections.abc import Generator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer GET requests with the JSON registered for the request path
+
+    Conditional requests are answered with a 304 if content did not change.
+    Raw bytes content is sent as is and supports Range requests.
+    POST and DELETE requests are recorded and answered with an empty JSON
+    object.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep connections alive
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):  # pylint:disable=invalid-name
+        """Send the route JSON content, a 304 if not modified, or a 404"""
+        self.server.requests.append(self.path)
+        if self.path not in self.server.routes:
+            self._send(404, b"Not Found")
+            return
+
+        content = self.server.routes[self.path]
+        if isinstance(content, bytes):
+            self._send_range(content)
+            return
+
+        body = json.dumps(content).encode("utf-8")
+        validators = self.server.validators_headers(body)
+        if self._not_modified(validators):
+            self.server.not_modified += 1
+            self._send(304, b"", validators)
+        else:
+            self._send(200, body, validators)
+
+    def do_POST(self):  # pylint:disable=invalid-name
+        """Record the posted body and answer an empty JSON object"""
+        length = int(self.headers.get("Content-Length", 0))
+        self.server.posted.append((self.path, self.headers, self.rfile.read(length)))
+        self._send(200, b"{}")
+
+    do_DELETE = do_POST  # pylint:disable=invalid-name
+
+    def _send_range(self, body: bytes) -> None:
+        """Send raw `body`, or only its 'bytes=start-' requested Range
+
+        The Range is ignored if the If-Range validator does not match.
+        """
+        validators = self.server.validators_headers(body)
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match is None or (if_range and if_range not in validators.values()):
+            self._send(200, body, validators)
+            return
+        start = int(match.group(1))
+        if start >= len(body):
+            self._send(416, b"")
+            return
+        content_range = f"bytes {start}-{len(body) - 1}/{len(body)}"
+        self._send(206, body[start:], {"Content-Range": content_range, **validators})
+
+    def _not_modified(self, validators: dict[str, str]) -> bool:
+        """Check conditional request headers against content `validators`"""
+        if "If-None-Match" in self.headers:
+            return self.headers["If-None-Match"] == validators.get("ETag")
+        modified_since = self.headers.get("If-Modified-Since")
+        return modified_since is not None and modified_since == validators.get(
+            "Last-Modified"
+        )
+
+    def _send(self, code: int, body: bytes, headers: dict[str, str] | None = None):
+        self.send_response(code)
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        if code != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):  # pylint:disable=arguments-differ
+        """Keep tests output clean"""
+
+
+class StubServer(ThreadingHTTPServer):
+    """Server on a random localhost port counting connections and requests"""
+
+    daemon_threads = True
+    LAST_MODIFIED = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+    def __init__(
+        self, routes: dict[str, Any], validators: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.routes = routes
+        self.validators = validators
+        self.connections = 0
+        self.not_modified = 0
+        self.requests: list[str] = []
+        self.posted: list[tuple[str, Any, bytes]] = []
+
+    def validators_headers(self, body: bytes) -> dict[str, str]:
+        """Return `validators` headers for `body`"""
+        values = {
+            "ETag": f'"{hashlib.md5(body).hexdigest()}"',
+            "Last-Modified": self.LAST_MODIFIED,
+        }
+        return {header: values[header] for header in self.validators}
+
+    @property
+    def url(self) -> str:
+        """Base url to use as `Api.url`"""
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+
+@contextlib.contextmanager
+def stub_server(
+    routes: dict[str, Any], validators: tuple[str, ...] = ()
+) -> Generator[StubServer, None, None]:
+    """Run a StubServer answering `routes` in a background thread
+
+    :param routes: {'/path?query': json_content or raw bytes}
+    :param validators: send 'ETag' and/or 'Last-Modified' headers
+    """
+    server = StubServer(routes, validators)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+
+# This file is a part of IoT-LAB cli-tools
+# Copyright (C) 2015 INRIA (Contact: admin@iot-lab.info)
+# Contributor(s) : see AUTHORS file
+#
+# This software is governed by the CeCILL license under French law
+# and abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# http://www.cecill.info.
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Benchmarks of iotlabcli performance sensitive paths
+
+Run them all, or only the given ones, with:
+
+    python tests_utils/benchmarks.py [name ...]
+
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+
+import requests
+
+from iotlabcli import associations, cache, daemon, elf, helpers, intervals, rest
+from iotlabcli.tests.elf_test import make_elf
+from iotlabcli.tests.main_parser_test import _import_times
+from iotlabcli.tests.stub_server import stub_server
+
+
+def _per_call(function: Callable[[], Any], calls: int) -> float:
+    """Return `function` mean duration in milliseconds over `calls` runs"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) * 1000 / calls
+
+
+def bench_session(calls: int = 500) -> None:
+    """Per-call latency with a new connection per call vs keep-alive session
+
+    The stub server is plain HTTP on localhost, with TLS the handshake
+    saved by the keep-alive session is much more expensive.
+    """
+    routes = {"/experiments/123": {"id": 123, "state": "Running"}}
+    with stub_server(routes) as server:
+        api = rest.Api("user", "password")
+        api.url = server.url
+        url = api.url + "experiments/123"
+
+        new_conn = _per_call(lambda: requests.request("get", url, timeout=10), calls)
+        keep_alive = _per_call(lambda: api.get_experiment_info(123), calls)
+
+    print(f"new connection per call: {new_conn:.3f} ms/call")
+    print(f"keep-alive session:      {keep_alive:.3f} ms/call")
+
+
+def bench_files_dict(files: int = 10, references: int = 200) -> None:
+    """Assemble a submission with `references` to `files` distinct firmwares
+
+    Firmwares share their basename, so their contents must be compared.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for num in range(files):
+            os.mkdir(os.path.join(tmp, str(num)))
+            paths.append(os.path.join(tmp, str(num), "firmware.elf"))
+            with open(paths[-1], "wb") as firmware:
+                firmware.write(os.urandom(1024 * 1024))
+
+        def _assemble():
+            files_dict = helpers.FilesDict()
+            for num in range(references):
+                files_dict.add_file(paths[num % files])
+
+        first = _per_call(_assemble, 1)
+        cached = _per_call(_assemble, 10)
+
+    print(f"{references} references, {files} x 1MiB files: {first:.1f} ms")
+    print(f"same files already hashed:          {cached:.1f} ms")
+
+
+def _python_run(code: str) -> None:
+    """Run `code` in a new python interpreter"""
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+
+
+def bench_import(calls: int = 20) -> None:
+    """Duration of 'import iotlabcli.rest' in a new interpreter
+
+    Resolving the api url and setting up the TLS backend were done on import,
+    they are now only done on first use, as shown by the second line.
+    """
+    eager = "from iotlabcli import rest; rest.Api.url; rest.new_session()"
+    python = _per_call(lambda: _python_run("pass"), calls)
+    lazy = _per_call(lambda: _python_run("import iotlabcli.rest"), calls)
+    first_use = _per_call(lambda: _python_run(eager), calls)
+
+    print(f"import iotlabcli.rest:           {lazy - python:.1f} ms")
+    print(f"import, resolve url and session: {first_use - python:.1f} ms")
+
+
+def bench_startup(calls: int = 20) -> None:
+    """Import time of the 'iotlab' entry point, compared to 'requests'
+
+    Subcommands modules, and requests with them, are only imported when
+    their subcommand is run.
+    """
+    code = "from iotlabcli.parser import main; main.main(['help'])"
+    entry = [_import_times(code)["iotlabcli.parser.main"] for _ in range(calls)]
+    lib = [_import_times("import requests")["requests"] for _ in range(calls)]
+
+    print(f"import iotlabcli.parser.main: {min(entry) / 1000:.1f} ms")
+    print(f"import requests:              {min(lib) / 1000:.1f} ms")
+
+
+def _iotlab(*args: str) -> list[str]:
+    """Return command running 'iotlab *args' with this interpreter"""
+    code = "import sys; from iotlabcli.parser import main; sys.exit(main.main())"
+    return [sys.executable, "-c", code, *args]
+
+
+def bench_daemon(calls: int = 50) -> None:
+    """Latency of an 'iotlab status' command run without and with daemon"""
+    routes = {"/experiments/running": {"items": []}}
+    with tempfile.TemporaryDirectory() as tmp, stub_server(routes) as server:
+        os.environ["IOTLAB_API_URL"] = server.url
+        os.environ["IOTLAB_DAEMON_SOCKET"] = os.path.join(tmp, "daemon.sock")
+        command = _iotlab("status", "--experiments-running")
+
+        def _status():
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+
+        in_process = _per_call(_status, calls)
+        with subprocess.Popen(_iotlab("daemon", "start")) as process:
+            while daemon.connect() is None:
+                time.sleep(0.05)
+            forwarded = _per_call(_status, calls)
+            subprocess.run(_iotlab("daemon", "stop"), check=True, capture_output=True)
+            process.wait()
+
+    print(f"iotlab status, in process: {in_process:.1f} ms/call")
+    print(f"iotlab status, daemon:     {forwarded:.1f} ms/call")
+
+
+def bench_associations(count: int = 10000) -> None:
+    """Build an associations map with one mobility per node for `count` nodes
+
+    New keys were appended then the whole map sorted again, they are now
+    inserted in place, or sorted once when building from items.
+    """
+    nodes = [f"m3-{num}.grenoble.iot-lab.info" for num in range(count)]
+    items = [(f"mobility-{num}", [node]) for num, node in enumerate(nodes)]
+
+    def _extendvalues():
+        assocs = associations.AssociationsMap(
+            "mobility", "nodes", helpers.node_url_sort_key
+        )
+        for key, values in items:
+            assocs.extendvalues(key, values)
+
+    def _from_items():
+        associations.AssociationsMap.from_items(
+            items, "mobility", "nodes", helpers.node_url_sort_key
+        )
+
+    print(f"{count} associations, extendvalues: {_per_call(_extendvalues, 1):.1f} ms")
+    print(f"{count} associations, from_items:   {_per_call(_from_items, 1):.1f} ms")
+
+
+def bench_firmware_association(count: int = 5000) -> None:
+    """Add `count` nodes one by one to a single firmware association
+
+    Values were sorted again on each access, now only when they changed,
+    and a few new values are inserted in place.
+    """
+    nodes = [f"m3-{num}.grenoble.iot-lab.info" for num in range(count)]
+    for size in (count // 4, count // 2, count):
+
+        def _extendvalues(size=size):
+            assocs = associations.AssociationsMap(
+                "firmware", "nodes", helpers.node_url_sort_key
+            )
+            for node in nodes[:size]:
+                assocs.extendvalues("firmware.elf", [node])
+
+        print(f"{size} nodes: {_per_call(_extendvalues, 1):.1f} ms")
+
+
+def _tuple_sort_key(node_url: str) -> int | tuple[str, str, int]:
+    """Previous `helpers.node_url_sort_key`, parsing urls on each call"""
+    if node_url.isdigit():
+        return int(node_url)
+    _node, _, domain = node_url.partition(".")
+    site = domain.split(".")[0]
+    node_type, num_str = _node.rsplit("-", 1)
+    return site, node_type, int(num_str)
+
+
+def bench_sort_nodes(count: int = 10000, calls: int = 10) -> None:
+    """Sort a shuffled list of `count` nodes urls
+
+    Urls were parsed again to a tuple key for each sort, they are now
+    parsed to a string key, faster to compare. NodeId, used for nodes
+    sorted several times, parse them once.
+    """
+    sites = ["grenoble", "lille", "paris", "saclay", "strasbourg"]
+    urls = [
+        f"{archi}-{num}.{site}.iot-lab.info"
+        for site in sites
+        for archi in ("m3", "a8")
+        for num in range(count // 10)
+    ]
+    random.Random(0).shuffle(urls)
+    nodes = [helpers.NodeId(url) for url in urls]
+
+    tuples = _per_call(lambda: sorted(urls, key=_tuple_sort_key), calls)
+    strings = _per_call(lambda: helpers.sorted_nodes(urls), calls)
+    interned = _per_call(lambda: helpers.sorted_nodes(nodes), calls)
+
+    print(f"{len(urls)} nodes, tuples sort key:  {tuples:.1f} ms")
+    print(f"{len(urls)} nodes, string sort key:  {strings:.1f} ms")
+    print(f"{len(urls)} NodeId, parsed once:     {interned:.1f} ms")
+
+
+def bench_nodes_set(count: int = 10000, calls: int = 10) -> None:
+    """Exclude a few nodes from a `count` nodes selection
+
+    Selections were expanded to urls and excluded with sets of urls, they
+    are now kept as ids ranges until expanded.
+    """
+    nodes_str, excluded = f"1-{count}", ["m3-10.grenoble.iot-lab.info"] * 10
+
+    def _urls_sets():
+        urls = set(intervals.NodesSet.from_info("grenoble", "m3", nodes_str).urls())
+        return helpers.sorted_nodes(urls - set(excluded))
+
+    def _nodes_set():
+        nodes = intervals.NodesSet.from_info("grenoble", "m3", nodes_str)
+        return (nodes - intervals.NodesSet.from_urls(excluded)).short_lists()
+
+    print(f"{count} nodes, urls sets:  {_per_call(_urls_sets, calls):.1f} ms")
+    print(f"{count} nodes, nodes sets: {_per_call(_nodes_set, calls):.3f} ms")
+
+
+def bench_strip_elf(code: int = 256 * 1024, debug: int = 4 * 1024 * 1024) -> None:
+    """Upload size and conversion duration of an ELF firmware with `--strip-elf`
+
+    The ELF has `code` bytes of loaded content and `debug` bytes of debug
+    sections, only the first ones are uploaded after conversion.
+    """
+    sections = [(0x08000000, 0x08000000, os.urandom(code))]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "firmware.elf")
+        with open(path, "wb") as firmware:
+            firmware.write(make_elf(sections) + os.urandom(debug))
+        disk_cache = cache.DiskCache(os.path.join(tmp, "cache"))
+
+        size = helpers.FileRef(path).size
+        first = _per_call(lambda: elf.BinaryFirmware(path, disk_cache), 1)
+        cached = _per_call(lambda: elf.BinaryFirmware(path, disk_cache), 10)
+        binary_size = elf.BinaryFirmware(path, disk_cache).size
+
+    print(f"ELF upload:    {size // 1024} KiB")
+    print(f"binary upload: {binary_size // 1024} KiB")
+    print(f"conversion: {first:.1f} ms, cached: {cached:.1f} ms")
+
+
+BENCHMARKS = {
+    "session": bench_session,
+    "files_dict": bench_files_dict,
+    "import": bench_import,
+    "startup": bench_startup,
+    "daemon": bench_daemon,
+    "associations": bench_associations,
+    "firmware_association": bench_firmware_association,
+    "sort_nodes": bench_sort_nodes,
+    "nodes_set": bench_nodes_set,
+    "strip_elf": bench_strip_elf,
+}
+
+
+def main() -> None:
+    """Run selected benchmarks"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("names", nargs="*", metavar="name", help=", ".join(BENCHMARKS))
+    opts = parser.parse_args()
+    unknown = set(opts.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks {sorted(unknown)}")
+    for name in opts.names or BENCHMARKS:
+        print(f"# {name}")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()